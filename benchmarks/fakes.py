@@ -0,0 +1,294 @@
+"""Local stand-ins for the Anthropic, GitHub and Railway APIs.
+
+Each fake is a small FastAPI app that simulates latency and, for Anthropic,
+rate limits, so the orchestrator can be load-tested without live services.
+"""
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import re
+import time
+from typing import Dict
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# A whole file as rendered by ContextBuilder
+FILE_CONTEXT = re.compile(r"\nFile: (\S+)\nContent:\n(.*)\n")
+# Files the fake repository starts with, so edits have something to change
+SEED_FILES = {f"src/module_{i}.py": f"def module_{i}():\n    return {i}\n" for i in range(50)}
+
+class TokenBucket:
+    """Requests-per-minute limiter; `rpm` of 0 disables limiting"""
+
+    def __init__(self, rpm: int):
+        self.rate = rpm / 60.0
+        self.capacity = max(rpm / 60.0, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+def anthropic_app(
+    latency: float = 0.5,
+    token_delay: float = 0.01,
+    output_tokens: int = 100,
+    rpm: int = 0,
+    items: int = 1
+) -> FastAPI:
+    """Fake messages API: `latency` before the first token, then `token_delay` per token.
+
+    Prompts that ask for a JSON array get one with `items` objects, naming the
+    first file in the prompt. Prompts that ask for SEARCH/REPLACE edits get a
+    block that edits the first line of the first file shown with content, or
+    creates a new file named after the prompt. Both are spread over the same
+    number of output tokens.
+    Prefixes ending in a `cache_control` block are remembered and reported
+    as prompt cache writes, then reads.
+    """
+    app = FastAPI()
+    bucket = TokenBucket(rpm)
+    ids = itertools.count()
+    app.state.requests = 0
+    app.state.rate_limited = 0
+    app.state.cache_read_tokens = 0
+    app.state.cache_write_tokens = 0
+    cached_prefixes = set()
+
+    def prompt_text(body: Dict) -> str:
+        blocks = list(body.get("system") or [])
+        for message in body["messages"]:
+            content = message["content"]
+            blocks.extend([{"text": content}] if isinstance(content, str) else content)
+        return "\n".join(block.get("text", "") for block in blocks)
+
+    def prompt_usage(body: Dict) -> Dict[str, int]:
+        blocks = list(body.get("system") or [])
+        for message in body["messages"]:
+            content = message["content"]
+            blocks.extend([{"type": "text", "text": content}] if isinstance(content, str) else content)
+        size, read, written = 0, 0, 0
+        prefix = hashlib.sha1()
+        for block in blocks:
+            text = json.dumps({k: v for k, v in block.items() if k != "cache_control"}, sort_keys=True)
+            prefix.update(text.encode())
+            size += len(text)
+            if "cache_control" in block:
+                if prefix.hexdigest() in cached_prefixes:
+                    read = size
+                else:
+                    cached_prefixes.add(prefix.hexdigest())
+                    written = size
+        written = max(written - read, 0)
+        app.state.cache_read_tokens += read // 4
+        app.state.cache_write_tokens += written // 4
+        return {
+            "input_tokens": (size - read - written) // 4,
+            "cache_read_input_tokens": read // 4,
+            "cache_creation_input_tokens": written // 4
+        }
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if not bucket.take():
+            app.state.rate_limited += 1
+            return JSONResponse(
+                {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited"}},
+                status_code=429,
+                headers={"retry-after": "1"}
+            )
+
+        message_id = f"msg_{next(ids)}"
+        usage = prompt_usage(body)
+        tokens = min(output_tokens, body.get("max_tokens", output_tokens))
+        words = [f"token{i} " for i in range(tokens)]
+        prompt = prompt_text(body)
+        text = None
+        if "SEARCH/REPLACE" in prompt:
+            lines = ["".join(words[i:i + 8]).strip() for i in range(0, tokens, 8)]
+            existing = FILE_CONTEXT.search(prompt)
+            if existing:
+                path, first_line = existing.groups()
+                search = [first_line]
+                lines = [first_line] + [f"# {line}" for line in lines]
+            else:
+                path = f"bench/{hashlib.sha1(prompt.encode()).hexdigest()[:12]}.py"
+                search = []
+            text = "\n".join([path, "<<<<<<< SEARCH", *search, "=======", *lines, ">>>>>>> REPLACE"])
+        elif "JSON array" in prompt:
+            per_item = max(1, tokens // items)
+            named = re.search(r"\nFile: (\S+)\n", prompt)
+            text = json.dumps([
+                {
+                    "description": "".join(words[i * per_item:(i + 1) * per_item]).strip(),
+                    **({"file_path": named.group(1)} if named else {})
+                }
+                for i in range(items)
+            ])
+        if text is not None:
+            size = -(-len(text) // tokens)
+            words = [text[i:i + size] for i in range(0, len(text), size)]
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + token_delay * tokens)
+            return {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": body["model"],
+                "content": [{"type": "text", "text": "".join(words)}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {**usage, "output_tokens": tokens}
+            }
+
+        async def events():
+            def event(name: str, data: Dict) -> str:
+                return f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n"
+
+            await asyncio.sleep(latency)
+            yield event("message_start", {"message": {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": body["model"],
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {**usage, "output_tokens": 0}
+            }})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            for word in words:
+                await asyncio.sleep(token_delay)
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": word}})
+            yield event("content_block_stop", {"index": 0})
+            yield event("message_delta", {
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": tokens}
+            })
+            yield event("message_stop", {})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def github_app(latency: float = 0.05) -> FastAPI:
+    """Fake git data and contents endpoints used by GitHubClient, seeded with SEED_FILES"""
+    app = FastAPI()
+    state = {"head": hashlib.sha1(b"root").hexdigest(), "blobs": {}, "files": {}}
+    app.state.requests = 0
+
+    def sha(data: str) -> str:
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    for path, content in SEED_FILES.items():
+        state["blobs"][sha(content)] = content
+        state["files"][path] = sha(content)
+
+    @app.middleware("http")
+    async def simulate_latency(request: Request, call_next):
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        return await call_next(request)
+
+    @app.get("/repos/{owner}/{repo}/git/ref/heads/{branch}")
+    async def get_ref(owner: str, repo: str, branch: str):
+        return {"object": {"sha": state["head"]}}
+
+    @app.post("/repos/{owner}/{repo}/git/blobs", status_code=201)
+    async def create_blob(owner: str, repo: str, request: Request):
+        content = (await request.json())["content"]
+        blob_sha = sha(content)
+        state["blobs"][blob_sha] = content
+        return {"sha": blob_sha}
+
+    @app.get("/repos/{owner}/{repo}/git/blobs/{blob_sha}")
+    async def get_blob(owner: str, repo: str, blob_sha: str):
+        content = state["blobs"].get(blob_sha, "")
+        return {"sha": blob_sha, "content": base64.b64encode(content.encode()).decode()}
+
+    @app.post("/repos/{owner}/{repo}/git/trees", status_code=201)
+    async def create_tree(owner: str, repo: str, request: Request):
+        body = await request.json()
+        for item in body["tree"]:
+            state["files"][item["path"]] = item["sha"]
+        return {"sha": sha(json.dumps(body, sort_keys=True))}
+
+    @app.get("/repos/{owner}/{repo}/git/trees/{ref}")
+    async def get_tree(owner: str, repo: str, ref: str):
+        return {"tree": [
+            {"path": path, "type": "blob", "sha": blob_sha, "size": len(state["blobs"].get(blob_sha, ""))}
+            for path, blob_sha in state["files"].items()
+        ]}
+
+    @app.post("/repos/{owner}/{repo}/git/commits", status_code=201)
+    async def create_commit(owner: str, repo: str, request: Request):
+        body = await request.json()
+        return {"sha": sha(json.dumps(body, sort_keys=True))}
+
+    @app.patch("/repos/{owner}/{repo}/git/refs/heads/{branch}")
+    async def update_ref(owner: str, repo: str, branch: str, request: Request):
+        state["head"] = (await request.json())["sha"]
+        return {"object": {"sha": state["head"]}}
+
+    @app.get("/repos/{owner}/{repo}/contents/{path:path}")
+    async def get_contents(owner: str, repo: str, path: str, request: Request):
+        blob_sha = state["files"].get(path)
+        if blob_sha is None:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        etag = f'"{blob_sha}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        content = state["blobs"][blob_sha]
+        return JSONResponse(
+            {"sha": blob_sha, "content": base64.b64encode(content.encode()).decode()},
+            headers={"ETag": etag}
+        )
+
+    return app
+
+def railway_app(latency: float = 0.05, log_lines: int = 50000, error_every: int = 20000) -> FastAPI:
+    """Fake build log and deployment endpoints; logs are streamed line by line"""
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.get("/builds/{build_id}/logs")
+    async def build_logs(build_id: str):
+        app.state.requests += 1
+
+        async def lines():
+            await asyncio.sleep(latency)
+            chunk = []
+            for i in range(log_lines):
+                if error_every and i % error_every == error_every - 1:
+                    chunk.append(f"Traceback (most recent call last):\nValueError: build {build_id} step {i}\n")
+                else:
+                    chunk.append(f"[{i}] compiling module_{i % 97}.py ok\n")
+                if len(chunk) >= 1000:
+                    yield "".join(chunk)
+                    chunk = []
+            chunk.append("Process exited with code 1\n")
+            yield "".join(chunk)
+
+        return StreamingResponse(lines(), media_type="text/plain")
+
+    @app.get("/deployments/{deployment_id}")
+    async def deployment(deployment_id: str):
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        return {"id": deployment_id, "status": "FAILED"}
+
+    return app
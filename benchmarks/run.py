@@ -0,0 +1,366 @@
+"""Load-test the orchestrator against local fakes.
+
+Starts the Anthropic, GitHub and Railway fakes in-process, runs the app in a
+uvicorn subprocess pointed at them, and drives one scenario at a fixed
+request rate (open loop, so a slow server doesn't slow the load down):
+
+    tasks     POST /tasks/ with review tasks (review -> code -> commit)
+    fix       POST /tasks/ with fix tasks (stream build log -> fix -> commit)
+    webhooks  POST /webhooks/railway with failed builds, half of them redeliveries
+
+Usage:
+
+    python -m benchmarks.run --scenario tasks --rps 20 --duration 30 --output out.json
+    python -m benchmarks.run --scenario tasks --baseline out.json --tolerance 0.2
+
+With --baseline the run exits non-zero if latency, throughput or memory
+regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from benchmarks import fakes
+
+ROOT = Path(__file__).resolve().parent.parent
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+# Metric path -> True if higher is better
+COMPARED = {
+    ("submit_latency", "p95"): False,
+    ("completion_latency", "p50"): False,
+    ("completion_latency", "p95"): False,
+    ("completion_latency", "p99"): False,
+    ("throughput",): True,
+    ("memory", "peak_mb"): False
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def summarize(samples: List[float]) -> Dict:
+    """Percentiles (nearest rank) and mean of latency samples, in seconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 4)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "max": round(ordered[-1], 4)
+    }
+
+def read_memory(pid: int) -> Dict[str, float]:
+    """Current (VmRSS) and peak (VmHWM) resident memory in MB; empty off Linux"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if ":" in line)
+    except OSError:
+        return {}
+    return {
+        key: int(fields[name].split()[0]) / 1024
+        for key, name in (("rss_mb", "VmRSS"), ("peak_mb", "VmHWM"))
+        if name in fields
+    }
+
+class Fake:
+    """An in-process uvicorn server for one fake API"""
+
+    def __init__(self, app):
+        self.app = app
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False
+        ))
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            await asyncio.sleep(0.01)
+
+    async def stop(self):
+        self.server.should_exit = True
+        await self._task
+
+def build_payload(scenario: str, run_id: str, i: int) -> Dict:
+    if scenario == "tasks":
+        # Unique descriptions so the response cache never short-circuits Claude
+        return {
+            "id": f"bench_{run_id}_{i}",
+            "type": "review",
+            "description": f"Benchmark review {run_id} #{i}",
+            "context": [{"file_path": f"src/module_{i % 50}.py", "error_message": f"NameError: name 'x{i}' is not defined"}]
+        }
+    if scenario == "fix":
+        return {
+            "id": f"bench_{run_id}_{i}",
+            "type": "fix",
+            "description": f"Benchmark build failure {run_id} #{i}",
+            "context": [],
+            "metadata": {"build_id": f"build_{run_id}_{i}"}
+        }
+    # Every other delivery is a redelivery of the previous one, exercising dedupe.
+    # Module names are letters only so error normalization keeps them distinct.
+    build = i // 2
+    name = "".join(chr(ord("a") + int(digit)) for digit in str(build))
+    return {
+        "id": f"{run_id}_{build}",
+        "status": "failed",
+        "build_id": f"build_{run_id}_{build}",
+        "error": f"ModuleNotFoundError: No module named 'pkg_{name}'"
+    }
+
+class LoadRun:
+    def __init__(self, args: argparse.Namespace, app_url: str, pid: int):
+        self.args = args
+        self.app_url = app_url
+        self.pid = pid
+        self.run_id = uuid.uuid4().hex[:8]
+        self.submit_latency: List[float] = []
+        self.completion_latency: List[float] = []
+        self.submit_errors: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {}
+        self.outstanding: Dict[str, float] = {}
+        self.memory_samples: List[Dict[str, float]] = []
+        self.done_submitting = False
+
+    async def run(self) -> Dict:
+        path = "/webhooks/railway" if self.args.scenario == "webhooks" else "/tasks/"
+        limits = httpx.Limits(max_connections=self.args.connections)
+        async with httpx.AsyncClient(base_url=self.app_url, limits=limits, timeout=30) as client:
+            poller = asyncio.create_task(self._poll(client))
+            sampler = asyncio.create_task(self._sample_memory())
+            total = int(self.args.rps * self.args.duration)
+            start = time.perf_counter()
+            requests = []
+            for i in range(total):
+                delay = start + i / self.args.rps - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                requests.append(asyncio.create_task(self._submit(client, path, i)))
+            await asyncio.gather(*requests)
+            self.done_submitting = True
+            await poller
+            elapsed = time.perf_counter() - start
+            sampler.cancel()
+
+        memory = read_memory(self.pid)
+        if self.memory_samples:
+            memory["rss_max_mb"] = max(sample.get("rss_mb", 0) for sample in self.memory_samples)
+        return {
+            "scenario": self.args.scenario,
+            "config": {
+                key: value for key, value in vars(self.args).items()
+                if key not in ("output", "baseline")
+            },
+            "requests": total,
+            "submit_errors": self.submit_errors,
+            "submit_latency": summarize(self.submit_latency),
+            "completion_latency": summarize(self.completion_latency),
+            "outcomes": self.outcomes,
+            "elapsed": round(elapsed, 3),
+            "throughput": round(len(self.completion_latency) / elapsed, 3),
+            "memory": {key: round(value, 1) for key, value in memory.items()}
+        }
+
+    async def _submit(self, client: httpx.AsyncClient, path: str, i: int):
+        payload = build_payload(self.args.scenario, self.run_id, i)
+        sent = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload)
+        except httpx.HTTPError as e:
+            key = type(e).__name__
+            self.submit_errors[key] = self.submit_errors.get(key, 0) + 1
+            return
+        self.submit_latency.append(time.perf_counter() - sent)
+        if response.status_code >= 400:
+            key = str(response.status_code)
+            self.submit_errors[key] = self.submit_errors.get(key, 0) + 1
+            return
+        if self.args.scenario == "webhooks":
+            status = response.json()["status"]
+            self.outcomes[status] = self.outcomes.get(status, 0) + 1
+            if status != "accepted":
+                return
+            task_id = f"fix_{payload['id']}"
+        else:
+            task_id = payload["id"]
+        self.outstanding[task_id] = sent
+
+    async def _poll(self, client: httpx.AsyncClient):
+        """Track tasks through GET /tasks/?ids= until all finish or the timeout passes"""
+        deadline = None
+        while True:
+            ids = list(self.outstanding)
+            for i in range(0, len(ids), 100):
+                chunk = ids[i:i + 100]
+                try:
+                    response = await client.get("/tasks/", params={"ids": ",".join(chunk)})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    continue
+                now = time.perf_counter()
+                for task in response.json():
+                    if task["status"] in TERMINAL_STATUSES:
+                        sent = self.outstanding.pop(task["id"])
+                        self.completion_latency.append(now - sent)
+                        self.outcomes[task["status"]] = self.outcomes.get(task["status"], 0) + 1
+            if self.done_submitting:
+                if not self.outstanding:
+                    return
+                deadline = deadline or time.perf_counter() + self.args.timeout
+                if time.perf_counter() > deadline:
+                    self.outcomes["timed_out"] = len(self.outstanding)
+                    return
+            await asyncio.sleep(self.args.poll_interval)
+
+    async def _sample_memory(self):
+        while True:
+            self.memory_samples.append(read_memory(self.pid))
+            await asyncio.sleep(0.5)
+
+def compare(result: Dict, baseline: Dict, tolerance: float, compared: Dict = None) -> List[str]:
+    """Describe each compared metric that is worse than the baseline by more than `tolerance`"""
+    regressions = []
+    for path, higher_is_better in (compared or COMPARED).items():
+        current, previous = result, baseline
+        for key in path:
+            current = current.get(key) if isinstance(current, dict) else None
+            previous = previous.get(key) if isinstance(previous, dict) else None
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{'.'.join(path)}: {previous} -> {current} ({change:+.1%})")
+    return regressions
+
+def app_env(claude: Fake, github: Fake, railway: Fake, overrides: Dict[str, str]) -> Dict[str, str]:
+    """Environment for an app subprocess that talks to the given fakes"""
+    return {
+        **os.environ,
+        "CLAUDE_API_URL": claude.url,
+        "GITHUB_API_URL": github.url,
+        "RAILWAY_API_URL": railway.url,
+        "CLAUDE_API_KEY": "bench",
+        "GITHUB_TOKEN": "bench",
+        "RAILWAY_API_KEY": "bench",
+        "REPO_OWNER": "bench",
+        "REPO_NAME": "bench",
+        **overrides
+    }
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30, interval: float = 0.1):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"App exited with code {process.returncode}")
+            try:
+                if (await client.get(f"{url}/metrics")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(interval)
+    raise RuntimeError("App did not start in time")
+
+async def main(args: argparse.Namespace) -> int:
+    claude = Fake(fakes.anthropic_app(
+        latency=args.claude_latency,
+        token_delay=args.claude_token_delay,
+        output_tokens=args.claude_tokens,
+        rpm=args.claude_rpm,
+        items=args.claude_items
+    ))
+    github = Fake(fakes.github_app(latency=args.github_latency))
+    railway = Fake(fakes.railway_app(latency=args.railway_latency, log_lines=args.log_lines))
+    for fake in (claude, github, railway):
+        await fake.start()
+
+    port = free_port()
+    env = app_env(claude, github, railway, {
+        "WEBHOOK_DEBOUNCE_WINDOW": str(args.debounce),
+        **dict(item.split("=", 1) for item in args.env)
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env
+    )
+    try:
+        app_url = f"http://127.0.0.1:{port}"
+        await wait_ready(app_url, process)
+        result = await LoadRun(args, app_url, process.pid).run()
+    finally:
+        process.terminate()
+        process.wait()
+        for fake in (claude, github, railway):
+            await fake.stop()
+
+    result["upstream"] = {
+        "claude_requests": claude.app.state.requests,
+        "claude_rate_limited": claude.app.state.rate_limited,
+        "claude_cache_read_tokens": claude.app.state.cache_read_tokens,
+        "claude_cache_write_tokens": claude.app.state.cache_write_tokens,
+        "github_requests": github.app.state.requests,
+        "railway_requests": railway.app.state.requests
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the orchestrator against local fakes")
+    parser.add_argument("--scenario", choices=["tasks", "fix", "webhooks"], default="tasks")
+    parser.add_argument("--rps", type=float, default=10, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load")
+    parser.add_argument("--connections", type=int, default=100, help="Client connection pool size")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for tasks after the load ends")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--claude-latency", type=float, default=0.5, help="Seconds to first token")
+    parser.add_argument("--claude-token-delay", type=float, default=0.005)
+    parser.add_argument("--claude-tokens", type=int, default=100, help="Output tokens per response")
+    parser.add_argument("--claude-rpm", type=int, default=0, help="Rate limit; 0 disables it")
+    parser.add_argument("--claude-items", type=int, default=1, help="Subtasks or suggestions per plan/review")
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--railway-latency", type=float, default=0.05)
+    parser.add_argument("--log-lines", type=int, default=50000, help="Lines per fake build log")
+    parser.add_argument("--debounce", type=float, default=0.5, help="WEBHOOK_DEBOUNCE_WINDOW for the app")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra app setting, e.g. --env MEMORY_BACKEND=sqlite")
+    parser.add_argument("--output", help="Write the JSON result here")
+    parser.add_argument("--baseline", help="Earlier JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,143 @@
+"""Measure how quickly the orchestrator starts, serves its first task and stops.
+
+Each run starts a fresh interpreter so nothing is cached between runs:
+
+    import      seconds to `import src.main`
+    ready       seconds from process start until GET /metrics answers
+    first_task  seconds from ready until a first review task completes
+                (includes building the agents unless WARM_UP is set)
+    shutdown    seconds from SIGTERM until the process has exited
+
+Usage:
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --runs 5 --baseline startup.json --env WARM_UP=true
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from benchmarks import fakes
+from benchmarks.run import (
+    ROOT, TERMINAL_STATUSES, Fake, app_env, build_payload, compare, free_port,
+    read_memory, summarize, wait_ready
+)
+
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import src.main; print(time.perf_counter() - t)"
+
+COMPARED = {
+    ("import", "p50"): False,
+    ("ready", "p50"): False,
+    ("first_task", "p50"): False,
+    ("shutdown", "p50"): False,
+    ("memory", "rss_mb"): False
+}
+
+def measure_import(env: Dict[str, str]) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=env,
+        check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+async def first_task(url: str, timeout: float) -> float:
+    payload = build_payload("tasks", uuid.uuid4().hex[:8], 0)
+    start = time.monotonic()
+    async with httpx.AsyncClient(base_url=url) as client:
+        (await client.post("/tasks/", json=payload)).raise_for_status()
+        while time.monotonic() - start < timeout:
+            status = (await client.get(f"/tasks/{payload['id']}")).json()["status"]
+            if status in TERMINAL_STATUSES:
+                if status != "completed":
+                    raise RuntimeError(f"First task ended {status}")
+                return time.monotonic() - start
+            await asyncio.sleep(0.01)
+    raise RuntimeError("First task did not finish in time")
+
+async def measure_server(env: Dict[str, str], timeout: float) -> Dict[str, float]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env
+    )
+    try:
+        await wait_ready(url, process, interval=0.005)
+        sample = {"ready": time.monotonic() - start}
+        sample["rss_mb"] = read_memory(process.pid).get("rss_mb", 0.0)
+        sample["first_task"] = await first_task(url, timeout)
+    finally:
+        stopping = time.monotonic()
+        process.terminate()
+        process.wait()
+    sample["shutdown"] = time.monotonic() - stopping
+    return sample
+
+async def main(args: argparse.Namespace) -> int:
+    claude = Fake(fakes.anthropic_app(
+        latency=args.claude_latency, token_delay=0.0, output_tokens=50, rpm=0
+    ))
+    github = Fake(fakes.github_app(latency=0.0))
+    railway = Fake(fakes.railway_app(latency=0.0, log_lines=10))
+    for fake in (claude, github, railway):
+        await fake.start()
+
+    # No commit window, so the first task measures the app rather than batching
+    env = app_env(claude, github, railway, {
+        "GITHUB_COMMIT_WINDOW": "0",
+        **dict(item.split("=", 1) for item in args.env)
+    })
+    samples: Dict[str, List[float]] = {
+        name: [] for name in ("import", "ready", "first_task", "shutdown", "rss_mb")
+    }
+    try:
+        for _ in range(args.runs):
+            samples["import"].append(await asyncio.to_thread(measure_import, env))
+            for name, value in (await measure_server(env, args.timeout)).items():
+                samples[name].append(value)
+    finally:
+        for fake in (claude, github, railway):
+            await fake.stop()
+
+    result = {
+        "runs": args.runs,
+        **{name: summarize(samples[name]) for name in ("import", "ready", "first_task", "shutdown")},
+        "memory": {"rss_mb": round(max(samples["rss_mb"]), 1)}
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(result, baseline, args.tolerance, COMPARED)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure orchestrator startup and shutdown time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds to wait for the first task")
+    parser.add_argument("--claude-latency", type=float, default=0.0, help="Seconds to first token")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra app setting, e.g. --env WARM_UP=true")
+    parser.add_argument("--output", help="Write the JSON result here")
+    parser.add_argument("--baseline", help="Earlier JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -1,6 +1,14 @@
-from typing import List, Dict
+from typing import Dict, List, Union
+from pydantic import BaseModel
 from src.agents.base import BaseAgent
-from src.core.memory import Task
+from src.core.memory import CodeContext, Task
+from src.core.structured import JsonArrayParser, validate_items
+
+class SubtaskSpec(BaseModel):
+    """One element of the architect's JSON plan"""
+    description: str
+    context: List[CodeContext] = []
+    depends_on: List[Union[int, str]] = []  # Indexes of earlier subtasks, or task ids
 
 class ArchitectAgent(BaseAgent):
     async def handle_task(self, task: Task) -> Dict:
@@ -14,39 +22,56 @@ class ArchitectAgent(BaseAgent):
                 "role": "user",
                 "content": f"""
                 Task: {task.description}
-                Context: {self.format_context(task)}
                 
                 Please break this task into smaller subtasks and provide architectural guidance.
+                Respond with only a JSON array of subtasks in the order they should be done:
+                [{{"description": "...", "context": [{{"file_path": "..."}}], "depends_on": [0]}}]
+                `depends_on` lists the indexes of earlier subtasks that must finish first.
                 """
             }
         ]
         
-        response = await self.call_claude(messages)
+        # Each subtask is stored and started as soon as its object is complete,
+        # so coding overlaps with the rest of the plan being generated
+        parser = JsonArrayParser()
+        
+        def on_text(text: str):
+            for index, spec in validate_items(parser.feed(text), SubtaskSpec):
+                self.add_subtask(task, self._build_subtask(task, index, spec))
+        
+        def validate(text: str) -> bool:
+            if task.subtasks:
+                return True
+            parser.reset()
+            return False
         
-        # Parse response and create subtasks
-        subtasks = self._parse_subtasks(response)
-        for subtask in subtasks:
-            task_id = f"{task.id}_subtask_{len(task.subtasks)}"
-            new_task = Task(
-                id=task_id,
-                type="code",
-                description=subtask["description"],
-                context=subtask.get("context", []),
-                parent_task_id=task.id
-            )
-            self.memory.add_task(new_task)
-            task.subtasks.append(task_id)
+        await self.call_claude(
+            messages,
+            task_id=task.id,
+            route=task.type,
+            validate=validate,
+            on_text=on_text,
+            context=f"Context: {self.format_context(task)}"
+        )
         
-        self.memory.update_task_status(task.id, "completed")
+        # The scheduler completes this task once its subtasks finish
+        if not task.subtasks:
+            self.memory.update_task_status(task.id, "completed")
+        else:
+            self.memory.save_task(task)
         return {"status": "success", "subtasks": task.subtasks}
     
-    def _parse_subtasks(self, response: str) -> List[Dict]:
-        """Parse Claude's response into structured subtasks"""
-        # Implement parsing logic here
-        # For now, return a simple example
-        return [
-            {
-                "description": "Example subtask",
-                "context": []
-            }
-        ]
\ No newline at end of file
+    def _build_subtask(self, task: Task, index: int, spec: SubtaskSpec) -> Task:
+        # Ids follow positions in the plan, as `depends_on` indexes do, so a
+        # dropped element leaves a gap rather than renumbering later subtasks
+        return Task(
+            id=f"{task.id}_subtask_{index}",
+            type="code",
+            description=spec.description,
+            context=spec.context,
+            metadata={"depends_on": [
+                f"{task.id}_subtask_{dep}" if isinstance(dep, int) else dep
+                for dep in spec.depends_on
+            ]},
+            parent_task_id=task.id
+        )
@@ -1,22 +1,70 @@
-from typing import Dict, List
-import anthropic
-from src.core.memory import Task, SharedMemory
+from typing import Callable, Dict, List, Tuple
+from src.core.cache import ResponseCache, get_response_cache
+from src.core.claude import ClaudeClient, get_claude_client
 from src.core.config import settings
+from src.core.context import CHARS_PER_TOKEN, ContextBuilder, estimate_tokens
+from src.core.memory import CodeContext, Task, SharedMemory
+from src.core.metrics import ROUTE_ESCALATIONS, ROUTE_LATENCY
+from src.core.routing import TIER_MIN_CACHE_TOKENS, Route, get_model_router
+from src.core.scheduler import DagScheduler
 
 class BaseAgent:
-    def __init__(self, memory: SharedMemory):
+    def __init__(
+        self,
+        memory: SharedMemory,
+        client: ClaudeClient = None,
+        cache: ResponseCache = None,
+        scheduler: DagScheduler = None
+    ):
         self.memory = memory
-        self.client = anthropic.Client(api_key=settings.CLAUDE_API_KEY)
+        self.client = client or get_claude_client()
+        self.cache = cache or get_response_cache()
+        self.router = get_model_router()
+        self.scheduler = scheduler
         
-    async def call_claude(self, messages: List[Dict], max_tokens: int = 1000):
-        """Make an API call to Claude"""
+    async def call_claude(
+        self,
+        messages: List[Dict],
+        max_tokens: int = None,
+        use_cache: bool = True,
+        task_id: str = None,
+        route: str = "default",
+        validate: Callable[[str], bool] = None,
+        on_text: Callable[[str], None] = None,
+        context: str = None
+    ):
+        """Make an API call to Claude, answering repeated prompts from the response cache.
+
+        The model and, unless given, max_tokens come from the router policy for
+        `route`. If `validate` rejects a response, the call is repeated on the
+        next larger model. When a task_id is given the response is streamed and
+        each text delta is published as a "token" event for that task.
+        `on_text` receives the same deltas as they arrive (a cached or
+        non-streamed response arrives as one delta).
+
+        System messages are sent as the system prompt, after the repository
+        overview; see `_system_blocks`. `context` (usually `format_context`
+        output) goes in its own block ahead of the first user message, so
+        calls sharing the same files share a cacheable prefix even though
+        their instructions differ; see `_cache_breakpoints`.
+        """
         formatted_messages = []
+        system_prompts = []
+        has_context = False
         
         for msg in messages:
-            if msg["role"] == "user":
+            if msg["role"] == "system":
+                system_prompts.append(msg["content"])
+            elif msg["role"] == "user":
+                content = msg["content"]
+                if context and not formatted_messages:
+                    if isinstance(content, str):
+                        content = [{"type": "text", "text": content}]
+                    content = [{"type": "text", "text": context}] + content
+                    has_context = True
                 formatted_messages.append({
                     "role": "user",
-                    "content": msg["content"]
+                    "content": content
                 })
             elif msg["role"] == "assistant":
                 formatted_messages.append({
@@ -24,21 +72,152 @@ class BaseAgent:
                     "content": msg["content"]
                 })
         
-        response = await self.client.messages.create(
-            messages=formatted_messages,
-            model="claude-3-opus-20240229",
-            max_tokens=max_tokens
-        )
-        return response.content[0].text
+        system = self._system_blocks(system_prompts)
+        # Routing looks at the messages only; the system prefix is the same for every call
+        plan = self.router.route(route, formatted_messages, max_tokens)
+        while True:
+            # Models differ in the shortest prefix they cache, so breakpoints follow the tier
+            request_system, request_messages = self._cache_breakpoints(
+                plan, system, formatted_messages, has_context
+            )
+            response = await self._request(
+                plan, request_messages, request_system, use_cache, task_id, on_text, validate
+            )
+            if validate is None or validate(response):
+                return response
+            escalated = self.router.escalate(plan)
+            if escalated is None:
+                return response
+            ROUTE_ESCALATIONS.inc(route=plan.name, tier=plan.tier)
+            if task_id is not None:
+                self.memory.events.publish(task_id, "reset", {"model": escalated.model})
+            plan = escalated
     
-    def format_context(self, task: Task) -> str:
-        """Format task context for Claude prompt"""
-        context = ""
-        for ctx in task.context:
-            if ctx.file_path:
-                context += f"\nFile: {ctx.file_path}\n"
-                if ctx.content:
-                    context += f"Content:\n{ctx.content}\n"
-                if ctx.error_message:
-                    context += f"Error:\n{ctx.error_message}\n"
-        return context
\ No newline at end of file
+    async def _request(
+        self,
+        plan: Route,
+        messages: List[Dict],
+        system: List[Dict],
+        use_cache: bool,
+        task_id: str = None,
+        on_text: Callable[[str], None] = None,
+        validate: Callable[[str], bool] = None
+    ) -> str:
+        delivered = False
+        params = {"system": system} if system else {}
+        
+        async def request() -> str:
+            nonlocal delivered
+            delivered = True
+            with ROUTE_LATENCY.time(route=plan.name, tier=plan.tier, outcome="ok"):
+                if task_id is None:
+                    response = await self.client.create_message(
+                        route=plan.name,
+                        messages=messages,
+                        model=plan.model,
+                        max_tokens=plan.max_tokens,
+                        **params
+                    )
+                    text = response.content[0].text
+                    if on_text is not None:
+                        on_text(text)
+                    return text
+                
+                chunks = []
+                async for text in self.client.stream_message(
+                    route=plan.name,
+                    messages=messages,
+                    model=plan.model,
+                    max_tokens=plan.max_tokens,
+                    **params
+                ):
+                    chunks.append(text)
+                    self.memory.events.publish(task_id, "token", {"text": text})
+                    if on_text is not None:
+                        on_text(text)
+                return "".join(chunks)
+        
+        if not (use_cache and settings.RESPONSE_CACHE_ENABLED):
+            return await request()
+        key = ResponseCache.make_key(plan.model, plan.max_tokens, messages, **params)
+        # A response that fails validation is escalated, not cached
+        response = await self.cache.get_or_create(key, request, validate)
+        if not delivered:
+            # Answered from the cache or by a concurrent identical request
+            if task_id is not None:
+                self.memory.events.publish(task_id, "token", {"text": response})
+            if on_text is not None:
+                on_text(response)
+        return response
+    
+    def _system_blocks(self, prompts: List[str]) -> List[Dict]:
+        """System prompt blocks, most widely shared first.
+
+        The repository overview is identical for every agent and the role
+        prompt for every call an agent makes, so later calls can reuse the
+        processed prefix.
+        """
+        blocks = []
+        if self.memory.index is not None and settings.PROMPT_OVERVIEW_TOKENS > 0:
+            overview = self.memory.index.overview(settings.PROMPT_OVERVIEW_TOKENS * CHARS_PER_TOKEN)
+            if overview:
+                blocks.append({"type": "text", "text": overview})
+        if prompts:
+            blocks.append({"type": "text", "text": "\n\n".join(prompts)})
+        return blocks
+    
+    def _cache_breakpoints(
+        self,
+        plan: Route,
+        system: List[Dict],
+        messages: List[Dict],
+        has_context: bool
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """Copies of `system` and `messages` with prompt-cache breakpoints.
+
+        Candidates are the end of each system block and of the context block.
+        A breakpoint is only added once the prefix up to it reaches the
+        model's minimum cacheable length; the API ignores shorter ones.
+        """
+        if not settings.PROMPT_CACHE_ENABLED:
+            return system, messages
+        minimum = TIER_MIN_CACHE_TOKENS.get(plan.tier, 0)
+        breakpoint = {"cache_control": {"type": "ephemeral"}}
+        prefix = 0
+        marked = []
+        for block in system:
+            prefix += estimate_tokens(block["text"])
+            marked.append({**block, **breakpoint} if prefix >= minimum else block)
+        if not has_context:
+            return marked, messages
+        first, *rest = messages
+        context, *blocks = first["content"]
+        prefix += estimate_tokens(context["text"])
+        if prefix < minimum:
+            return marked, messages
+        return marked, [{**first, "content": [{**context, **breakpoint}, *blocks]}, *rest]
+    
+    def add_subtask(self, parent: Task, child: Task):
+        """Store a subtask of `parent` and start it right away if a scheduler is attached.
+
+        Without a scheduler, subtasks run once the parent's handler returns.
+        """
+        self.memory.add_task(child)
+        parent.subtasks.append(child.id)
+        if self.scheduler is not None:
+            self.scheduler.open(parent).add(child)
+    
+    def format_context(
+        self,
+        task: Task,
+        budget: int = None,
+        contexts: List[CodeContext] = None
+    ) -> str:
+        """Format task context, plus related repository chunks, within a token budget.
+
+        `contexts` replaces the task's own, e.g. with file content loaded for the prompt.
+        """
+        contexts = task.context if contexts is None else contexts
+        return ContextBuilder(budget).build(
+            contexts, self.memory.get_related_context(task.id, contexts=contexts)
+        )
\ No newline at end of file
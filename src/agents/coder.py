@@ -1,16 +1,41 @@
-import os
-from typing import Dict
+import asyncio
+from typing import Dict, Optional
 from src.agents.base import BaseAgent
-from src.core.memory import Task
+from src.core.memory import CodeContext, Task
+from src.core.patching import PatchConflict, apply_patch, parse_patch
 from src.integrations.github import GitHubClient
 
+PUSH_ATTEMPTS = 2
+
+EDIT_FORMAT = """
+Reply with edits only, one SEARCH/REPLACE block per change:
+
+path/to/file.py
+<<<<<<< SEARCH
+lines copied exactly from the current file
+=======
+the lines that replace them
+>>>>>>> REPLACE
+
+Keep each SEARCH short but unique within its file. Use an empty SEARCH
+to create a new file. Unified diffs are also accepted.
+"""
+
 class CoderAgent(BaseAgent):
-    def __init__(self, memory):
-        super().__init__(memory)
-        self.github = GitHubClient()
+    def __init__(self, memory, github: GitHubClient = None, **clients):
+        super().__init__(memory, **clients)
+        self.github = github or GitHubClient()
     
     async def handle_task(self, task: Task) -> Dict:
         """Handle code generation and modification tasks"""
+        # SEARCH blocks must quote the current file, so files the task names
+        # without content are fetched now and shown in the prompt
+        files = await self._load_files(task)
+        contexts = [
+            CodeContext(**ctx.model_dump(exclude={"content_id"}), content=files[ctx.file_path])
+            if ctx.file_path in files else ctx
+            for ctx in task.context
+        ]
         messages = [
             {
                 "role": "system",
@@ -20,39 +45,88 @@ class CoderAgent(BaseAgent):
                 "role": "user",
                 "content": f"""
                 Task: {task.description}
-                Context: {self.format_context(task)}
                 
-                Please provide the implementation or code changes needed.
+                Please provide the code changes needed.
+                {EDIT_FORMAT}
                 """
             }
         ]
         
-        response = await self.call_claude(messages)
+        # Edits rather than whole files, so output scales with the change;
+        # a response without any parseable edit is retried on a larger model
+        response = await self.call_claude(
+            messages,
+            task_id=task.id,
+            route=task.type,
+            validate=lambda text: bool(parse_patch(text)),
+            context=f"Context: {self.format_context(task, contexts=contexts)}"
+        )
         
-        # Apply code changes
-        success = await self._apply_changes(task, response)
-        
-        if success:
-            # Commit and push changes
-            await self.github.commit_and_push(
-                files=[ctx.file_path for ctx in task.context if ctx.file_path],
+        # A push is refused if the branch changed the same files meanwhile;
+        # the edits are then applied again to the new content
+        for _ in range(PUSH_ATTEMPTS):
+            changes = await self._apply_changes(task, response, files)
+            # A retry follows a refused push, so it reads the files again
+            files = {}
+            if changes is None:
+                self.memory.update_task_status(task.id, "failed")
+                return {"status": "failed", "error": "Failed to apply changes"}
+            
+            # Commit and push only the files that changed
+            if not changes or await self.github.commit_and_push(
+                files=changes,
                 message=f"feat: {task.description}"
-            )
-            self.memory.update_task_status(task.id, "completed")
-            return {"status": "success"}
+            ):
+                self.memory.update_task_status(task.id, "completed")
+                return {"status": "success", "files": sorted(changes)}
         
         self.memory.update_task_status(task.id, "failed")
-        return {"status": "failed", "error": "Failed to apply changes"}
+        return {"status": "failed", "error": "Failed to push changes"}
+    
+    async def _load_files(self, task: Task) -> Dict[str, str]:
+        """Current content of each file the task names without attaching it"""
+        paths = sorted({ctx.file_path for ctx in task.context if ctx.file_path and not ctx.content_id})
+        contents = await asyncio.gather(*(self.github.get_file_content(path) for path in paths))
+        return dict(zip(paths, contents))
     
-    async def _apply_changes(self, task: Task, changes: str) -> bool:
-        """Apply code changes to files"""
+    async def _apply_changes(
+        self,
+        task: Task,
+        changes: str,
+        files: Dict[str, str] = None
+    ) -> Optional[Dict[str, str]]:
+        """Apply the response's edits in memory; returns the new content of changed files.
+
+        `files` holds content already fetched for the prompt, so edits apply
+        to what Claude was shown unless another task has committed since.
+        """
         try:
-            # Implement code change logic here
-            return True
-        except Exception as e:
+            patches = parse_patch(changes)
+            if not patches:
+                raise ValueError("Response contained no edits")
+            current = dict(files or {})
+            paths = [patch.path for patch in patches]
+            missing = [path for path in paths if path not in current]
+            contents = await asyncio.gather(*(self._current_content(task, path) for path in missing))
+            current.update(zip(missing, contents))
+            # Another task may have committed one of these files while we fetched;
+            # from here to the commit nothing awaits, so edits can't interleave
+            files = {path: self.github.pending_content(path) or current[path] for path in paths}
+            return apply_patch(patches, files)
+        except (PatchConflict, ValueError) as e:
             self.memory.add_error({
                 "task_id": task.id,
                 "error": str(e),
                 "type": "code_change_error"
             })
-            return False
\ No newline at end of file
+            return None
+    
+    async def _current_content(self, task: Task, path: str) -> str:
+        """A file from the main branch, or as attached to the task if it isn't there"""
+        content = await self.github.get_file_content(path)
+        if content:
+            return content
+        for ctx in task.context:
+            if ctx.file_path == path and ctx.start_line is None and ctx.end_line is None:
+                return ctx.content
+        return ""
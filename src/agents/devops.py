@@ -1,12 +1,14 @@
 from typing import Dict, List
 from src.agents.base import BaseAgent
-from src.core.memory import Task
+from src.core.fingerprint import KnownError
+from src.core.logs import LogErrorExtractor
+from src.core.memory import CodeContext, Task
 from src.integrations.railway import RailwayClient
 
 class DevOpsAgent(BaseAgent):
-    def __init__(self, memory):
-        super().__init__(memory)
-        self.railway = RailwayClient()
+    def __init__(self, memory, railway: RailwayClient = None, **clients):
+        super().__init__(memory, **clients)
+        self.railway = railway or RailwayClient()
     
     async def handle_task(self, task: Task) -> Dict:
         """Handle deployment and infrastructure tasks"""
@@ -22,14 +24,18 @@ class DevOpsAgent(BaseAgent):
                 "role": "user",
                 "content": f"""
                 Task: {task.description}
-                Context: {self.format_context(task)}
                 
                 Please analyze the deployment issue and suggest fixes.
                 """
             }
         ]
         
-        response = await self.call_claude(messages)
+        response = await self.call_claude(
+            messages,
+            task_id=task.id,
+            route=task.type,
+            context=f"Context: {self.format_context(task)}"
+        )
         
         # Create review task for suggested fixes
         review_task = Task(
@@ -41,18 +47,38 @@ class DevOpsAgent(BaseAgent):
         )
         self.memory.add_task(review_task)
         
-        self.memory.update_task_status(task.id, "completed")
+        # Completed by the scheduler once the review finishes
+        task.subtasks.append(review_task.id)
+        self.memory.save_task(task)
         return {"status": "success", "review_task": review_task.id}
     
     async def _handle_build_failure(self, task: Task) -> Dict:
         """Handle Railway build failures"""
-        build_logs = await self.railway.get_build_logs(task.metadata.get("build_id"))
+        extractor = LogErrorExtractor()
+        async for line in self.railway.iter_build_log_lines(task.metadata.get("build_id")):
+            extractor.feed(line)
+        build_errors = extractor.format()
+        
+        # Keep only the error regions, not the whole log, in the task context
+        task.context.append(CodeContext(
+            content=build_errors,
+            error_message=extractor.summary()
+        ))
+        self.memory.save_task(task)
         
-        # Create context with build logs
-        task.context.append({
-            "content": build_logs,
-            "error_message": "Build failed"
-        })
+        # A build failing like an earlier one that was fixed gets the same fix
+        error = self.memory.errors.record(build_errors)
+        known = self.memory.errors.known_fixes(error)
+        if known:
+            fix_task = Task(
+                id=f"{task.id}_fix",
+                type="code",
+                description=known[0].description,
+                context=known[0].context,
+                metadata={"reused_fix": known[0].task_id},
+                parent_task_id=task.id
+            )
+            return self._add_fix_task(task, fix_task, error)
         
         messages = [
             {
@@ -62,13 +88,16 @@ class DevOpsAgent(BaseAgent):
             {
                 "role": "user",
                 "content": f"""
-                Build Logs: {build_logs}
+                Build Errors: {build_errors}
                 Please analyze the build failure and suggest specific fixes.
                 """
             }
         ]
         
-        response = await self.call_claude(messages)
+        # A cached answer to an error that came back after its fix is the fix that failed
+        response = await self.call_claude(
+            messages, task_id=task.id, route=task.type, use_cache=not error.failed
+        )
         
         # Create fix task
         fix_task = Task(
@@ -78,7 +107,13 @@ class DevOpsAgent(BaseAgent):
             context=[{"content": response}],
             parent_task_id=task.id
         )
+        return self._add_fix_task(task, fix_task, error)
+    
+    def _add_fix_task(self, task: Task, fix_task: Task, error: KnownError) -> Dict:
+        self.memory.link_fix(error, fix_task)
         self.memory.add_task(fix_task)
         
-        self.memory.update_task_status(task.id, "completed")
+        # Completed by the scheduler once the fix is applied
+        task.subtasks.append(fix_task.id)
+        self.memory.save_task(task)
         return {"status": "success", "fix_task": fix_task.id}
\ No newline at end of file
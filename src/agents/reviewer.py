@@ -1,15 +1,45 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
+from pydantic import BaseModel
 from src.agents.base import BaseAgent
-from src.core.memory import Task
+from src.core.memory import CodeContext, Task
+from src.core.structured import JsonArrayParser, validate_items
 from src.integrations.github import GitHubClient
 
+class Suggestion(BaseModel):
+    """One element of the reviewer's JSON list of fixes"""
+    description: str
+    file_path: Optional[str] = None
+    context: List[CodeContext] = []
+
 class ReviewerAgent(BaseAgent):
-    def __init__(self, memory):
-        super().__init__(memory)
-        self.github = GitHubClient()
+    def __init__(self, memory, github: GitHubClient = None, **clients):
+        super().__init__(memory, **clients)
+        self.github = github or GitHubClient()
     
     async def handle_task(self, task: Task) -> Dict:
         """Handle code review and analysis tasks"""
+        if task.metadata.get("pull_request"):
+            return await self._review_pull_request(task)
+        
+        # Errors like ones fixed before get the same fixes, without a review
+        error_text = "\n".join(ctx.error_message for ctx in task.context if ctx.error_message)
+        error = self.memory.errors.record(error_text) if error_text else None
+        known = self.memory.errors.known_fixes(error) if error else []
+        for proposal in known:
+            fix_task = Task(
+                id=f"{task.id}_fix_{len(task.subtasks)}",
+                type="code",
+                description=proposal.description,
+                context=proposal.context,
+                metadata={"reused_fix": proposal.task_id},
+                parent_task_id=task.id
+            )
+            self.memory.link_fix(error, fix_task)
+            self.add_subtask(task, fix_task)
+        if known:
+            self.memory.save_task(task)
+            return {"status": "success", "fix_tasks": task.subtasks}
+        
         messages = [
             {
                 "role": "system",
@@ -19,44 +49,100 @@ class ReviewerAgent(BaseAgent):
                 "role": "user",
                 "content": f"""
                 Task: {task.description}
-                Context: {self.format_context(task)}
                 
                 Please review the code/error and suggest specific improvements or fixes.
+                Respond with only a JSON array with one object per independent fix:
+                [{{"description": "...", "file_path": "...", "context": [{{"file_path": "..."}}]}}]
                 """
             }
         ]
         
-        response = await self.call_claude(messages)
-        suggestions = self._parse_suggestions(response)
-        
-        if suggestions:
-            # Create fix tasks for each suggestion
-            fix_tasks = []
-            for suggestion in suggestions:
-                task_id = f"{task.id}_fix_{len(fix_tasks)}"
-                fix_task = Task(
-                    id=task_id,
-                    type="code",
-                    description=suggestion["description"],
-                    context=suggestion.get("context", []),
-                    parent_task_id=task.id
-                )
-                self.memory.add_task(fix_task)
-                fix_tasks.append(task_id)
-            
-            self.memory.update_task_status(task.id, "completed")
-            return {"status": "success", "fix_tasks": fix_tasks}
+        # Fix tasks start as soon as each suggestion is complete, while the
+        # rest of the review is still being generated
+        parser = JsonArrayParser()
+        
+        def on_text(text: str):
+            for _, suggestion in validate_items(parser.feed(text), Suggestion):
+                fix_task = self._build_fix_task(task, suggestion)
+                if error:
+                    self.memory.link_fix(error, fix_task)
+                self.add_subtask(task, fix_task)
+        
+        def validate(text: str) -> bool:
+            if task.subtasks:
+                return True
+            parser.reset()
+            return False
+        
+        # A cached review of an error that came back after its fixes would repeat them
+        await self.call_claude(
+            messages,
+            task_id=task.id,
+            route=task.type,
+            use_cache=not (error and error.failed),
+            validate=validate,
+            on_text=on_text,
+            context=f"Context: {self.format_context(task)}"
+        )
+        
+        if task.subtasks:
+            # Completed by the scheduler once the fix tasks finish
+            self.memory.save_task(task)
+            return {"status": "success", "fix_tasks": task.subtasks}
         
         self.memory.update_task_status(task.id, "failed")
         return {"status": "failed", "error": "No actionable suggestions found"}
     
-    def _parse_suggestions(self, response: str) -> List[Dict]:
-        """Parse Claude's response into structured suggestions"""
-        # Implement parsing logic here
-        # For now, return a simple example
-        return [
+    async def _review_pull_request(self, task: Task) -> Dict:
+        """Review a pull request's diff without creating fix tasks.
+        
+        Fixes would be committed to MAIN_BRANCH rather than the pull request's
+        branch, so the review is only reported in the task result.
+        """
+        files = await self.github.get_pull_request_files(task.metadata["pull_request"])
+        if not files:
+            self.memory.update_task_status(task.id, "failed")
+            return {"status": "failed", "error": "Pull request changes unavailable"}
+        # Binary and very large files come without a patch
+        task.context.extend(
+            CodeContext(file_path=f["filename"], content=f.get("patch") or f"({f.get('status')}, no diff)")
+            for f in files
+        )
+        self.memory.save_task(task)
+        
+        messages = [
+            {
+                "role": "system",
+                "content": "You are an expert code reviewer. Analyze code changes and suggest improvements."
+            },
             {
-                "description": "Example fix suggestion",
-                "context": []
+                "role": "user",
+                "content": f"""
+                Task: {task.description}
+                
+                Please review these changes. List bugs, risks and suggested improvements,
+                each with the file it concerns.
+                """
             }
-        ]
\ No newline at end of file
+        ]
+        
+        response = await self.call_claude(
+            messages,
+            task_id=task.id,
+            route=task.type,
+            context=f"Changes (unified diffs per file): {self.format_context(task)}"
+        )
+        self.memory.update_task_status(task.id, "completed")
+        return {"status": "success", "review": response}
+    
+    def _build_fix_task(self, task: Task, suggestion: Suggestion) -> Task:
+        context = list(suggestion.context)
+        if suggestion.file_path and all(ctx.file_path != suggestion.file_path for ctx in context):
+            context.insert(0, CodeContext(file_path=suggestion.file_path))
+        return Task(
+            id=f"{task.id}_fix_{len(task.subtasks)}",
+            type="code",
+            description=suggestion.description,
+            context=context,
+            parent_task_id=task.id
+        )
\ No newline at end of file
@@ -0,0 +1,100 @@
+import hashlib
+import sqlite3
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+from src.core.config import settings
+
+class BlobStore:
+    """Content-addressed store for file contents, logs and responses.
+
+    Tasks reference content by id, so identical content shared by many tasks
+    and subtasks is held once. Without a path everything stays in memory; with
+    one, blobs live in SQLite and only a byte-bounded LRU of recently used
+    content is kept in memory. In memory only, blobs are reference counted so
+    content that is replaced, like an old version of an indexed file, can be
+    released.
+    """
+
+    def __init__(self, path: Optional[str] = None, cache_bytes: int = None):
+        self.cache_bytes = cache_bytes or settings.BLOB_CACHE_BYTES
+        self._blobs: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._refs: Counter = Counter()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (id TEXT PRIMARY KEY, content TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def blob_id(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+    def put(self, content: str) -> str:
+        blob_id = self.blob_id(content)
+        if self._db is None:
+            self._refs[blob_id] += 1
+        if blob_id in self._blobs:
+            self._blobs.move_to_end(blob_id)
+            return blob_id
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR IGNORE INTO blobs (id, content) VALUES (?, ?)", (blob_id, content)
+            )
+        self._remember(blob_id, content)
+        return blob_id
+
+    def get(self, blob_id: str) -> str:
+        content = self._blobs.get(blob_id)
+        if content is not None:
+            self._blobs.move_to_end(blob_id)
+            return content
+        if self._db is None:
+            return ""
+        row = self._db.execute("SELECT content FROM blobs WHERE id = ?", (blob_id,)).fetchone()
+        if row is None:
+            return ""
+        self._remember(blob_id, row[0])
+        return row[0]
+
+    def release(self, blob_id: str):
+        """Drop one reference taken by `put`; in memory, content goes with the last one"""
+        if self._db is not None or blob_id not in self._refs:
+            return
+        self._refs[blob_id] -= 1
+        if self._refs[blob_id] <= 0:
+            del self._refs[blob_id]
+            content = self._blobs.pop(blob_id, None)
+            if content is not None:
+                self._bytes -= len(content)
+
+    def stats(self) -> Dict:
+        return {"cached_blobs": len(self._blobs), "cached_bytes": self._bytes}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, blob_id: str, content: str):
+        self._blobs[blob_id] = content
+        self._bytes += len(content)
+        # Without a database the memory tier is the only copy, so never evict
+        while self._db is not None and self._bytes > self.cache_bytes and len(self._blobs) > 1:
+            _, evicted = self._blobs.popitem(last=False)
+            self._bytes -= len(evicted)
+
+_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store, creating it on first use"""
+    global _store
+    if _store is None:
+        path = settings.BLOB_STORE_PATH
+        if path is None and settings.MEMORY_BACKEND == "sqlite":
+            path = settings.MEMORY_DB_PATH
+        _store = BlobStore(path)
+    return _store
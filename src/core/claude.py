@@ -0,0 +1,163 @@
+import asyncio
+import random
+from typing import AsyncIterator, Dict, Optional
+
+import anthropic
+import httpx
+
+from src.core.config import settings
+from src.core.metrics import CLAUDE_COST, CLAUDE_ERRORS, CLAUDE_LATENCY, CLAUDE_TOKENS
+from src.core.routing import estimate_cost
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class ClaudeClient:
+    """Async Claude client shared by all agents.
+
+    Requests go through one pooled HTTP transport and are capped by a global
+    semaphore plus one semaphore per model. Rate limits, overloads and server
+    errors are retried with jittered exponential backoff up to MAX_RETRIES.
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        max_concurrency: int = None,
+        max_concurrency_per_model: int = None,
+        max_retries: int = None
+    ):
+        self.max_concurrency = max_concurrency or settings.CLAUDE_MAX_CONCURRENCY
+        self.max_concurrency_per_model = (
+            max_concurrency_per_model or settings.CLAUDE_MAX_CONCURRENCY_PER_MODEL
+        )
+        self.max_retries = settings.MAX_RETRIES if max_retries is None else max_retries
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            ),
+            timeout=httpx.Timeout(settings.CLAUDE_TIMEOUT, connect=10.0)
+        )
+        # Retries are handled here so they share the concurrency limits
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key or settings.CLAUDE_API_KEY,
+            base_url=settings.CLAUDE_API_URL,
+            http_client=self.http_client,
+            max_retries=0
+        )
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._model_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _limits(self, model: str):
+        """The semaphores for a call, in the order they must be acquired.
+
+        The model's comes first: waiting for a busy model while holding a
+        global slot would let one model's queue block every other model.
+        """
+        # Semaphores are created lazily so they bind to the running event loop
+        if self._global_limit is None:
+            self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        if model not in self._model_limits:
+            self._model_limits[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+        return self._model_limits[model], self._global_limit
+
+    async def create_message(self, route: str = "default", **kwargs):
+        """Call the messages API, retrying transient failures; `route` labels cost metrics"""
+        model = kwargs["model"]
+        model_limit, global_limit = self._limits(model)
+        attempt = 0
+        while True:
+            try:
+                async with model_limit, global_limit:
+                    with CLAUDE_LATENCY.time(model=model, outcome="ok"):
+                        response = await self.client.messages.create(**kwargs)
+                self._record_usage(route, model, response.usage)
+                return response
+            except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+                CLAUDE_ERRORS.inc(model=model, status=str(getattr(e, "status_code", "connection")))
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+    async def stream_message(self, route: str = "default", **kwargs) -> AsyncIterator[str]:
+        """Stream text deltas from the messages API; `route` labels cost metrics.
+
+        Failures are retried only until the first delta arrives; after that the
+        caller has already seen partial output and the error is raised.
+        """
+        model = kwargs["model"]
+        model_limit, global_limit = self._limits(model)
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with model_limit, global_limit:
+                    with CLAUDE_LATENCY.time(model=model, outcome="ok"):
+                        async with self.client.messages.stream(**kwargs) as stream:
+                            async for text in stream.text_stream:
+                                started = True
+                                yield text
+                            message = await stream.get_final_message()
+                self._record_usage(route, model, message.usage)
+                return
+            except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+                CLAUDE_ERRORS.inc(model=model, status=str(getattr(e, "status_code", "connection")))
+                if started or attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+    def _record_usage(self, route: str, model: str, usage):
+        # input_tokens excludes prompt-cache reads and writes, which are reported separately
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        CLAUDE_TOKENS.inc(usage.input_tokens, model=model, direction="input")
+        CLAUDE_TOKENS.inc(usage.output_tokens, model=model, direction="output")
+        CLAUDE_TOKENS.inc(cache_read, model=model, direction="cache_read")
+        CLAUDE_TOKENS.inc(cache_write, model=model, direction="cache_write")
+        CLAUDE_COST.inc(
+            estimate_cost(model, usage.input_tokens, usage.output_tokens, cache_read, cache_write),
+            route=route,
+            model=model
+        )
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, anthropic.APIConnectionError):
+            return True
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than a server-sent Retry-After"""
+        delay = min(
+            settings.CLAUDE_RETRY_MAX_DELAY,
+            settings.CLAUDE_RETRY_BASE_DELAY * (2 ** attempt)
+        )
+        delay = random.uniform(0, delay)
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    async def connect(self):
+        """Open a pooled connection ahead of the first request (DNS, TCP and TLS)"""
+        try:
+            await self.http_client.head(str(self.client.base_url))
+        except httpx.HTTPError as e:
+            print(f"Error connecting to Claude API: {str(e)}")
+    
+    async def close(self):
+        await self.client.close()
+        await self.http_client.aclose()
+
+_client: Optional[ClaudeClient] = None
+
+def get_claude_client() -> ClaudeClient:
+    """Return the process-wide Claude client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = ClaudeClient()
+    return _client
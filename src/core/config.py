@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import Field
 
 class Settings(BaseSettings):
@@ -11,11 +11,109 @@ class Settings(BaseSettings):
     # Service URLs
     GITHUB_API_URL: str = Field("https://api.github.com", env='GITHUB_API_URL')
     RAILWAY_API_URL: str = Field("https://railway.app/api/v2", env='RAILWAY_API_URL')
+    CLAUDE_API_URL: Optional[str] = Field(None, env='CLAUDE_API_URL')  # Defaults to the Anthropic API
     
     # Agent Configuration
     MAX_RETRIES: int = Field(3, env='MAX_RETRIES')
     TOKEN_LIMIT: int = Field(100000, env='TOKEN_LIMIT')  # Claude context window limit
-    TASK_QUEUE_SIZE: int = Field(100, env='TASK_QUEUE_SIZE')
+    CLAUDE_MAX_CONCURRENCY: int = Field(16, env='CLAUDE_MAX_CONCURRENCY')  # In-flight requests overall
+    CLAUDE_MAX_CONCURRENCY_PER_MODEL: int = Field(8, env='CLAUDE_MAX_CONCURRENCY_PER_MODEL')
+    CLAUDE_TIMEOUT: float = Field(600.0, env='CLAUDE_TIMEOUT')
+    CLAUDE_RETRY_BASE_DELAY: float = Field(1.0, env='CLAUDE_RETRY_BASE_DELAY')
+    CLAUDE_RETRY_MAX_DELAY: float = Field(30.0, env='CLAUDE_RETRY_MAX_DELAY')
+    CONTEXT_TOKEN_BUDGET: int = Field(20000, env='CONTEXT_TOKEN_BUDGET')  # Tokens of file context per prompt
+    CONTEXT_WINDOW_PADDING: int = Field(20, env='CONTEXT_WINDOW_PADDING')  # Lines around start_line/end_line
+    RESPONSE_CACHE_ENABLED: bool = Field(True, env='RESPONSE_CACHE_ENABLED')
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(1024, env='RESPONSE_CACHE_MAX_ENTRIES')
+    RESPONSE_CACHE_MAX_BYTES: int = Field(64 * 1024 * 1024, env='RESPONSE_CACHE_MAX_BYTES')
+    RESPONSE_CACHE_TTL: float = Field(24 * 3600, env='RESPONSE_CACHE_TTL')  # Seconds
+    RESPONSE_CACHE_PATH: Optional[str] = Field(None, env='RESPONSE_CACHE_PATH')  # SQLite file for the disk tier
+    RESPONSE_CACHE_DISK_MAX_BYTES: int = Field(512 * 1024 * 1024, env='RESPONSE_CACHE_DISK_MAX_BYTES')
+    SUBTASK_CONCURRENCY: int = Field(8, env='SUBTASK_CONCURRENCY')  # Subtasks executing at once
+    MEMORY_BACKEND: str = Field("memory", env='MEMORY_BACKEND')  # "memory" or "sqlite"
+    MEMORY_DB_PATH: str = Field("codertool.db", env='MEMORY_DB_PATH')
+    MEMORY_BATCH_SIZE: int = Field(64, env='MEMORY_BATCH_SIZE')  # Writes buffered per SQLite transaction
+    MEMORY_FLUSH_INTERVAL: float = Field(0.5, env='MEMORY_FLUSH_INTERVAL')  # Seconds
+    BLOB_STORE_PATH: Optional[str] = Field(None, env='BLOB_STORE_PATH')  # Defaults to MEMORY_DB_PATH for sqlite
+    BLOB_CACHE_BYTES: int = Field(64 * 1024 * 1024, env='BLOB_CACHE_BYTES')  # In-memory blobs when backed by SQLite
+    ERROR_HISTORY_SIZE: int = Field(1000, env='ERROR_HISTORY_SIZE')
+    ERROR_INDEX_SIZE: int = Field(5000, env='ERROR_INDEX_SIZE')  # Distinct errors remembered with their fixes
+    ERROR_MATCH_DISTANCE: int = Field(6, env='ERROR_MATCH_DISTANCE')  # SimHash bits two similar errors may differ by (up to 7)
+    TASK_QUEUE_SIZE: int = Field(100, env='TASK_QUEUE_SIZE')  # Per-agent queue capacity
+    TASK_QUEUE_BACKEND: str = Field("memory", env='TASK_QUEUE_BACKEND')  # "memory" or "sqlite" (shared by processes)
+    TASK_LEASE_SECONDS: float = Field(60.0, env='TASK_LEASE_SECONDS')  # Claims expire unless renewed
+    TASK_HEARTBEAT_INTERVAL: float = Field(15.0, env='TASK_HEARTBEAT_INTERVAL')  # Seconds between lease renewals
+    TASK_POLL_INTERVAL: float = Field(0.2, env='TASK_POLL_INTERVAL')  # Idle workers' wait between claim attempts
+    TASK_MAX_ATTEMPTS: int = Field(3, env='TASK_MAX_ATTEMPTS')  # Claims before a task is marked failed
+    AGENT_WORKERS: Dict[str, int] = Field(
+        {"architect": 2, "coder": 4, "reviewer": 2, "devops": 2},
+        env='AGENT_WORKERS'
+    )
+    
+    # Model Routing
+    CLAUDE_MODELS: Dict[str, str] = Field(
+        {
+            "haiku": "claude-haiku-4-5",
+            "sonnet": "claude-sonnet-4-5",
+            "opus": "claude-opus-4-5"
+        },
+        env='CLAUDE_MODELS'
+    )  # Tier -> model id
+    CLAUDE_PRICES: Dict[str, List[float]] = Field(
+        {"haiku": [1.0, 5.0], "sonnet": [3.0, 15.0], "opus": [5.0, 25.0]},
+        env='CLAUDE_PRICES'
+    )  # Tier -> USD per million input and output tokens
+    ROUTING_POLICY: Dict[str, Dict] = Field(
+        {
+            "default": {"tier": "sonnet", "max_tokens": 1000},
+            "architecture": {"tier": "sonnet", "max_tokens": 2000},
+            "code": {
+                "tier": "sonnet",
+                "max_tier": "opus",
+                "max_tokens": 2000,
+                "output_ratio": 1.0,
+                "max_tokens_cap": 8192
+            },
+            "review": {"tier": "haiku", "max_tokens": 1000},
+            "fix": {"tier": "haiku", "max_tokens": 1000}
+        },
+        env='ROUTING_POLICY'
+    )  # Route (task type) -> tier, max_tokens, output_ratio, max_tokens_cap, max_tier
+    ROUTING_LARGE_CONTEXT: int = Field(8000, env='ROUTING_LARGE_CONTEXT')  # Prompt tokens that move a route up a tier
+    
+    # Prompt Caching
+    PROMPT_CACHE_ENABLED: bool = Field(True, env='PROMPT_CACHE_ENABLED')  # Mark stable prompt prefixes cacheable
+    PROMPT_OVERVIEW_TOKENS: int = Field(2000, env='PROMPT_OVERVIEW_TOKENS')  # Repository file list in system prompts; 0 disables
+    
+    # Repository Index
+    REPO_INDEX_ENABLED: bool = Field(False, env='REPO_INDEX_ENABLED')  # Without a root, indexes MAIN_BRANCH through the GitHub API
+    REPO_INDEX_ROOT: Optional[str] = Field(None, env='REPO_INDEX_ROOT')  # Local checkout; MAIN_BRANCH on GitHub if unset
+    REPO_INDEX_REFRESH_INTERVAL: float = Field(60.0, env='REPO_INDEX_REFRESH_INTERVAL')  # Seconds between updates
+    REPO_INDEX_CHUNK_LINES: int = Field(40, env='REPO_INDEX_CHUNK_LINES')
+    REPO_INDEX_TOP_K: int = Field(5, env='REPO_INDEX_TOP_K')  # Related chunks added to prompts
+    REPO_INDEX_MAX_FILE_BYTES: int = Field(512 * 1024, env='REPO_INDEX_MAX_FILE_BYTES')
+    REPO_INDEX_EXTENSIONS: List[str] = Field(
+        [".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".rb", ".sh",
+         ".md", ".toml", ".yaml", ".yml", ".json", ".cfg", ".ini"],
+        env='REPO_INDEX_EXTENSIONS'
+    )
+    
+    # GitHub Configuration
+    GITHUB_COMMIT_WINDOW: float = Field(2.0, env='GITHUB_COMMIT_WINDOW')  # Seconds to coalesce pushes
+    GITHUB_MAX_CONCURRENCY: int = Field(8, env='GITHUB_MAX_CONCURRENCY')  # Parallel API requests
+    GITHUB_FILE_CACHE_BYTES: int = Field(32 * 1024 * 1024, env='GITHUB_FILE_CACHE_BYTES')
+    GITHUB_FILE_CACHE_MAX_AGE: float = Field(10.0, env='GITHUB_FILE_CACHE_MAX_AGE')  # Seconds before revalidating
+    
+    # Build Log Analysis
+    LOG_CONTEXT_BEFORE: int = Field(10, env='LOG_CONTEXT_BEFORE')  # Lines kept before an error
+    LOG_CONTEXT_AFTER: int = Field(20, env='LOG_CONTEXT_AFTER')  # Lines kept after an error
+    LOG_MAX_REGIONS: int = Field(10, env='LOG_MAX_REGIONS')
+    LOG_MAX_REGION_LINES: int = Field(200, env='LOG_MAX_REGION_LINES')
+    
+    # Webhook Ingestion
+    WEBHOOK_DEBOUNCE_WINDOW: float = Field(5.0, env='WEBHOOK_DEBOUNCE_WINDOW')  # Seconds to coalesce bursts
+    WEBHOOK_DEDUPE_TTL: float = Field(3600.0, env='WEBHOOK_DEDUPE_TTL')  # Seconds to remember delivery ids
+    WEBHOOK_DEDUPE_SIZE: int = Field(10000, env='WEBHOOK_DEDUPE_SIZE')
     
     # Project Settings
     REPO_OWNER: str = Field(..., env='REPO_OWNER')
@@ -26,6 +124,7 @@ class Settings(BaseSettings):
     HOST: str = Field("127.0.0.1", env='HOST')
     PORT: int = Field(8000, env='PORT')
     DEBUG: bool = Field(True, env='DEBUG')
+    WARM_UP: bool = Field(False, env='WARM_UP')  # Build agents and pre-connect to APIs at startup
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,87 @@
+from typing import List
+
+from src.core.config import settings
+from src.core.memory import CodeContext
+
+# Rough average for English prose and source code with Claude's tokenizer
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "... (truncated)\n"
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate that avoids running a tokenizer"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class ContextBuilder:
+    """Assemble task contexts into a prompt section that fits a token budget.
+
+    Contexts carrying an error come first, then those with an explicit line
+    window, then whole files. Windows are sliced with `padding` lines on
+    either side; anything that would overflow the budget is truncated.
+    """
+
+    def __init__(self, budget: int = None, padding: int = None):
+        self.budget = min(budget or settings.CONTEXT_TOKEN_BUDGET, settings.TOKEN_LIMIT)
+        self.padding = settings.CONTEXT_WINDOW_PADDING if padding is None else padding
+
+    def build(self, contexts: List[CodeContext], related: List[CodeContext] = ()) -> str:
+        """Render `contexts` by rank, then `related` (already ordered by relevance) in what's left"""
+        parts = []
+        remaining = self.budget
+        for ctx in sorted(contexts, key=self._rank) + list(related):
+            header = self._header(ctx)
+            cost = estimate_tokens(header)
+            if cost >= remaining:
+                break
+            parts.append(header)
+            remaining -= cost
+
+            body = self._body(ctx)
+            cost = estimate_tokens(body)
+            if cost > remaining:
+                parts.append(self._truncate(body, remaining))
+                break
+            parts.append(body)
+            remaining -= cost
+        return "".join(parts)
+
+    @staticmethod
+    def _rank(ctx: CodeContext) -> int:
+        if ctx.error_message:
+            return 0
+        if ctx.start_line is not None or ctx.end_line is not None:
+            return 1
+        return 2
+
+    def _header(self, ctx: CodeContext) -> str:
+        if not ctx.file_path:
+            return "\nContext:\n"
+        if ctx.start_line is not None or ctx.end_line is not None:
+            start, end = self._window(ctx)
+            return f"\nFile: {ctx.file_path} (lines {start + 1}-{end})\n"
+        return f"\nFile: {ctx.file_path}\n"
+
+    def _window(self, ctx: CodeContext):
+        """Zero-based, end-exclusive line range to include for a context"""
+        total = ctx.content.count("\n") + 1
+        start = min(max((ctx.start_line or 1) - 1 - self.padding, 0), total)
+        if ctx.end_line is None:
+            return start, total
+        return start, min(ctx.end_line + self.padding, total)
+
+    def _body(self, ctx: CodeContext) -> str:
+        parts = []
+        content = ctx.content
+        if content:
+            if ctx.start_line is not None or ctx.end_line is not None:
+                start, end = self._window(ctx)
+                content = "\n".join(content.splitlines()[start:end])
+            parts.append(f"Content:\n{content}\n")
+        if ctx.error_message:
+            parts.append(f"Error:\n{ctx.error_message}\n")
+        return "".join(parts)
+
+    @staticmethod
+    def _truncate(text: str, tokens: int) -> str:
+        limit = max(tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER), 0)
+        cut = text.rfind("\n", 0, limit)
+        return text[:cut + 1 if cut >= 0 else limit] + TRUNCATION_MARKER
@@ -0,0 +1,43 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Set
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+class EventBus:
+    """In-process publish/subscribe of task events for the streaming endpoint.
+
+    Events are dicts with an "event" name ("status", "token" or "reset") and a
+    "data" payload. Text generated so far for an unfinished task is kept so
+    that a subscriber joining mid-generation first receives everything it
+    missed; "reset" discards it when a response is regenerated.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._partial_text: Dict[str, List[str]] = {}
+
+    def publish(self, task_id: str, event: str, data: Dict):
+        if event == "token":
+            self._partial_text.setdefault(task_id, []).append(data["text"])
+        elif event == "reset" or (event == "status" and data.get("status") in TERMINAL_STATUSES):
+            self._partial_text.pop(task_id, None)
+
+        for queue in self._subscribers.get(task_id, ()):
+            queue.put_nowait({"event": event, "data": data})
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        partial = self._partial_text.get(task_id)
+        if partial:
+            queue.put_nowait({"event": "token", "data": {"text": "".join(partial)}})
+        self._subscribers[task_id].add(queue)
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(task_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[task_id]
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import re
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+from src.core.config import settings
+from src.core.metrics import KNOWN_FIX_LOOKUPS
+
+SIMHASH_BITS = 64
+LSH_BANDS = 8  # Hashes within LSH_BANDS - 1 bits always share a band
+SIMHASH_MAX_CHARS = 8192  # Normalized text hashed; the start of a log identifies it best
+
+# Volatile fragments that differ between otherwise identical failures
+_NORMALIZERS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<time>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"\b(?:0x)?(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{6,}\b", re.I), "<hash>"),
+    # Keep only the file name of absolute or nested paths
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\w.@~-]*[\\/])+([\w.@-]+)"), r"\1"),
+    (re.compile(r"\d+"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+def normalize_error(text: str) -> str:
+    """Strip timestamps, ids, hashes, directories and numbers from an error text"""
+    for pattern, replacement in _NORMALIZERS:
+        text = pattern.sub(replacement, text)
+    return text.strip().lower()
+
+def fingerprint_error(text: str) -> str:
+    """Stable short hash of the normalized error text"""
+    return hashlib.sha1(normalize_error(text).encode("utf-8")).hexdigest()[:16]
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the normalized error's words, weighted by count.
+
+    Errors that differ in a few words get hashes a few bits apart, unlike
+    fingerprint_error where any difference changes the whole hash.
+    """
+    words = Counter(normalize_error(text)[:SIMHASH_MAX_CHARS].split())
+    weights = [0] * SIMHASH_BITS
+    for word, count in words.items():
+        value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+@dataclass
+class FixProposal:
+    """A fix task's description and context, kept so it can be proposed again"""
+    task_id: str
+    description: str
+    context: List[Dict]  # CodeContext fields, content by blob id
+
+    @property
+    def key(self) -> str:
+        """Identifies the fix by content, so the same fix made by two tasks is one fix"""
+        data = json.dumps([self.description, self.context], sort_keys=True, default=str)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+@dataclass
+class KnownError:
+    fingerprint: str
+    simhash: int
+    summary: str
+    occurrences: int = 0
+    fixes: List[FixProposal] = field(default_factory=list)  # Proposals whose task completed
+    failed: Set[str] = field(default_factory=set)  # Keys of proposals that didn't fix it
+
+class ErrorIndex:
+    """Recurring errors and the fixes that resolved them.
+
+    Errors are keyed by fingerprint_error, and near-duplicates are found by
+    SimHash: the 64 bits are split into LSH_BANDS bands, so any two errors
+    within LSH_BANDS - 1 bits share a band and meet as candidates. A fix is
+    linked to an error when its task is created and becomes reusable once
+    that task completes. Fixes are only proposed for similar errors: an
+    error that comes back after its own fix was applied wasn't fixed by it.
+    The index is per process and keeps the most recently seen
+    ERROR_INDEX_SIZE errors.
+    """
+
+    def __init__(self, max_entries: int = None, max_distance: int = None):
+        self.max_entries = max_entries or settings.ERROR_INDEX_SIZE
+        self.max_distance = settings.ERROR_MATCH_DISTANCE if max_distance is None else max_distance
+        self._entries: "OrderedDict[str, KnownError]" = OrderedDict()
+        self._bands: List[Dict[int, Set[str]]] = [defaultdict(set) for _ in range(LSH_BANDS)]
+        self._pending: Dict[str, Tuple[str, FixProposal]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, text: str) -> KnownError:
+        """Count an occurrence of an error and return its entry"""
+        fingerprint = fingerprint_error(text)
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            entry = KnownError(fingerprint, simhash(text), " ".join(text.split())[:200])
+            self._entries[fingerprint] = entry
+            for band, bucket in zip(self._band_keys(entry.simhash), self._bands):
+                bucket[band].add(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+        self._entries.move_to_end(fingerprint)
+        entry.occurrences += 1
+        return entry
+
+    def known_fixes(self, entry: KnownError) -> List[FixProposal]:
+        """Fixes from the nearest similar error that may also fix this one.
+
+        If this error already has fixes, they were applied and it recurred
+        anyway, so they are marked failed and nothing is proposed.
+        """
+        if entry.fixes:
+            entry.failed.update(fix.key for fix in entry.fixes)
+            entry.fixes = []
+            KNOWN_FIX_LOOKUPS.inc(outcome="recurred")
+            return []
+        best, best_distance = [], self.max_distance + 1
+        for fingerprint in self._candidates(entry.simhash):
+            candidate = self._entries[fingerprint]
+            distance = hamming(entry.simhash, candidate.simhash)
+            fixes = [fix for fix in candidate.fixes if fix.key not in entry.failed]
+            if fixes and distance < best_distance:
+                best, best_distance = fixes, distance
+        KNOWN_FIX_LOOKUPS.inc(outcome="near" if best else "miss")
+        return best
+
+    def link(self, entry: KnownError, proposal: FixProposal):
+        """Remember that `proposal` was made for `entry`; it counts once its task completes"""
+        self._pending[proposal.task_id] = (entry.fingerprint, proposal)
+
+    def resolve(self, task_id: str):
+        """Mark a linked fix task as having resolved its error"""
+        fingerprint, proposal = self._pending.pop(task_id, (None, None))
+        entry = self._entries.get(fingerprint) if fingerprint else None
+        if entry is not None and all(fix.key != proposal.key for fix in entry.fixes):
+            entry.fixes.append(proposal)
+
+    def discard(self, task_id: str, failed: bool = True):
+        """Forget a linked fix task that didn't complete; a fix that failed isn't proposed again"""
+        fingerprint, proposal = self._pending.pop(task_id, (None, None))
+        entry = self._entries.get(fingerprint) if fingerprint else None
+        if entry is not None and failed:
+            entry.failed.add(proposal.key)
+            entry.fixes = [fix for fix in entry.fixes if fix.key != proposal.key]
+
+    def _band_keys(self, value: int) -> List[int]:
+        width = SIMHASH_BITS // LSH_BANDS
+        mask = (1 << width) - 1
+        return [value >> (band * width) & mask for band in range(LSH_BANDS)]
+
+    def _candidates(self, value: int) -> Set[str]:
+        candidates = set()
+        for band, bucket in zip(self._band_keys(value), self._bands):
+            candidates.update(bucket.get(band, ()))
+        return candidates
+
+    def _evict(self, fingerprint: str):
+        entry = self._entries.pop(fingerprint)
+        for band, bucket in zip(self._band_keys(entry.simhash), self._bands):
+            bucket[band].discard(fingerprint)
+            if not bucket[band]:
+                del bucket[band]
@@ -0,0 +1,384 @@
+import asyncio
+import functools
+import hashlib
+import heapq
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.core.blobs import get_blob_store
+from src.core.config import settings
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Extra score, in units of the term's IDF, for the chunk defining a queried symbol
+DEFINITION_BOOST = 2.0
+
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", "dist", "build", ".mypy_cache"}
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+SUBWORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+DEFINITION = re.compile(
+    r"^\s*(?:export\s+)?(?:async\s+)?"
+    r"(?:def|class|function|func|fn|interface|struct|enum|type|const|let|var)\s+([A-Za-z_]\w*)",
+    re.MULTILINE
+)
+STOPWORDS = {
+    "self", "def", "class", "return", "import", "from", "if", "else", "elif", "for", "in",
+    "while", "not", "and", "or", "is", "none", "true", "false", "the", "a", "an", "of", "to",
+    "const", "let", "var", "function", "this", "new", "await", "async", "with", "as", "try",
+    "except", "raise", "pass", "str", "int", "dict", "list", "optional"
+}
+
+@functools.lru_cache(maxsize=65536)
+def _identifier_terms(identifier: str) -> Tuple[str, ...]:
+    """The lowercased identifier plus its snake_case and camelCase parts"""
+    lowered = identifier.lower()
+    terms = [] if lowered in STOPWORDS else [lowered]
+    parts = [part.lower() for part in SUBWORD.findall(identifier)]
+    if len(parts) > 1:
+        terms.extend(part for part in parts if len(part) > 1 and part not in STOPWORDS)
+    return tuple(terms)
+
+def tokenize(text: str) -> List[str]:
+    return [term for identifier in IDENTIFIER.findall(text) for term in _identifier_terms(identifier)]
+
+def count_terms(text: str) -> Counter:
+    """Term frequencies of `text`; identifiers are split once however often they occur"""
+    counts = Counter()
+    for identifier, count in Counter(IDENTIFIER.findall(text)).items():
+        for term in _identifier_terms(identifier):
+            counts[term] += count
+    return counts
+
+def git_blob_sha(content: str) -> str:
+    """The SHA GitHub reports for a blob with this content"""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+@dataclass
+class Chunk:
+    path: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    content_id: str
+    terms: Counter
+    length: int
+
+@dataclass
+class SearchHit:
+    path: str
+    start_line: int
+    end_line: int
+    content_id: str
+    score: float
+
+@dataclass
+class FileAnalysis:
+    """Everything indexing needs from one file, computed without touching the index"""
+    path: str
+    version: str
+    content: str
+    chunks: List[Tuple[int, int, Counter]]
+    definitions: Dict[str, List[int]]
+    references: Set[str]
+
+def analyze(path: str, content: str, version: str = None, chunk_lines: int = None) -> FileAnalysis:
+    """Chunk and tokenize a file and find its symbols; safe to run in a worker thread"""
+    chunk_lines = chunk_lines or settings.REPO_INDEX_CHUNK_LINES
+    lines = content.splitlines()
+    chunks = []
+    for start in range(0, len(lines), chunk_lines):
+        terms = count_terms("\n".join(lines[start:start + chunk_lines]))
+        if terms:
+            chunks.append((start + 1, min(start + chunk_lines, len(lines)), terms))
+
+    definitions = defaultdict(list)
+    line, position = 1, 0
+    for match in DEFINITION.finditer(content):
+        line += content.count("\n", position, match.start(1))
+        position = match.start(1)
+        definitions[match.group(1).lower()].append(line)
+    references = {identifier.lower() for identifier in IDENTIFIER.findall(content)} - set(definitions)
+    return FileAnalysis(
+        path, version or git_blob_sha(content), content, chunks, dict(definitions), references
+    )
+
+class RepoIndex:
+    """BM25 index over fixed-size line chunks of the repository, plus a symbol table.
+
+    Each file is stored with a version (a git blob SHA or a local mtime/size
+    stamp), and updates re-index only files whose version changed. File
+    content goes to the blob store, and a file's old content is released when
+    it is re-indexed or removed; chunks keep only term counts and line
+    ranges. The symbol table maps names to the lines that define them and to
+    the files that reference them.
+    """
+
+    def __init__(self, chunk_lines: int = None):
+        self.chunk_lines = chunk_lines or settings.REPO_INDEX_CHUNK_LINES
+        self._versions: Dict[str, str] = {}
+        self._content_ids: Dict[str, str] = {}
+        self._chunks: Dict[int, Chunk] = {}
+        self._file_chunks: Dict[str, List[int]] = {}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._total_length = 0
+        self._next_id = 0
+        self._definitions: Dict[str, Set[Tuple[str, int]]] = defaultdict(set)
+        self._references: Dict[str, Set[str]] = defaultdict(set)
+        self._file_symbols: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        self._overview: Optional[Tuple[int, str]] = None
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def version(self, path: str) -> Optional[str]:
+        return self._versions.get(path)
+
+    def update_file(self, path: str, content: str, version: str = None):
+        """Index (or re-index) one file; a no-op if `version` is unchanged"""
+        version = version or git_blob_sha(content)
+        if self._versions.get(path) != version:
+            self.add(analyze(path, content, version, self.chunk_lines))
+
+    def add(self, analysis: FileAnalysis):
+        """Insert an analyzed file, replacing any earlier version"""
+        path = analysis.path
+        if not self._drop(path):
+            self._overview = None
+        self._versions[path] = analysis.version
+        content_id = get_blob_store().put(analysis.content)
+        self._content_ids[path] = content_id
+
+        ids = []
+        for start_line, end_line, terms in analysis.chunks:
+            chunk_id = self._next_id
+            self._next_id += 1
+            chunk = Chunk(path, start_line, end_line, content_id, terms, sum(terms.values()))
+            self._chunks[chunk_id] = chunk
+            for term, count in terms.items():
+                self._postings[term][chunk_id] = count
+            self._total_length += chunk.length
+            ids.append(chunk_id)
+        self._file_chunks[path] = ids
+
+        for name, lines in analysis.definitions.items():
+            self._definitions[name].update((path, line) for line in lines)
+        for name in analysis.references:
+            self._references[name].add(path)
+        self._file_symbols[path] = (set(analysis.definitions), analysis.references)
+
+    def remove_file(self, path: str):
+        if self._drop(path):
+            self._overview = None
+
+    def _drop(self, path: str) -> bool:
+        if self._versions.pop(path, None) is None:
+            return False
+        get_blob_store().release(self._content_ids.pop(path))
+        for chunk_id in self._file_chunks.pop(path, []):
+            chunk = self._chunks.pop(chunk_id)
+            for term in chunk.terms:
+                postings = self._postings[term]
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= chunk.length
+        defined, referenced = self._file_symbols.pop(path, (set(), set()))
+        for name in defined:
+            self._definitions[name] = {d for d in self._definitions[name] if d[0] != path}
+            if not self._definitions[name]:
+                del self._definitions[name]
+        for name in referenced:
+            self._references[name].discard(path)
+            if not self._references[name]:
+                del self._references[name]
+        return True
+
+    def overview(self, max_chars: int) -> str:
+        """Sorted list of indexed paths, cut to `max_chars`.
+
+        It only changes when files are added or removed, not when they are
+        edited, so prompts can keep it in a cached prefix.
+        """
+        if self._overview is None or self._overview[0] != max_chars:
+            lines = ["Repository files:"]
+            size = len(lines[0])
+            paths = sorted(self._versions)
+            for shown, path in enumerate(paths):
+                if size + len(path) + 1 > max_chars:
+                    lines.append(f"... and {len(paths) - shown} more")
+                    break
+                lines.append(path)
+                size += len(path) + 1
+            self._overview = (max_chars, "\n".join(lines) if paths else "")
+        return self._overview[1]
+
+    def definitions(self, name: str) -> List[Tuple[str, int]]:
+        """(path, line) of each definition of `name`"""
+        return sorted(self._definitions.get(name.lower(), ()))
+
+    def references(self, name: str) -> List[str]:
+        """Paths of files that use `name` without defining it"""
+        return sorted(self._references.get(name.lower(), ()))
+
+    def search(self, query: str, k: int = None, exclude: Iterable[str] = ()) -> List[SearchHit]:
+        """Top `k` chunks for `query` by BM25, boosting chunks that define a queried symbol"""
+        k = k or settings.REPO_INDEX_TOP_K
+        if not self._chunks:
+            return []
+        excluded = set(exclude)
+        n = len(self._chunks)
+        average = self._total_length / n
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, count in postings.items():
+                length = self._chunks[chunk_id].length
+                scores[chunk_id] += idf * count * (K1 + 1) / (
+                    count + K1 * (1 - B + B * length / average)
+                )
+            for path, line in self._definitions.get(term, ()):
+                chunk_id = self._chunk_at(path, line)
+                if chunk_id is not None:
+                    scores[chunk_id] += DEFINITION_BOOST * idf
+
+        best = heapq.nlargest(
+            k,
+            ((score, chunk_id) for chunk_id, score in scores.items()
+             if self._chunks[chunk_id].path not in excluded)
+        )
+        return [
+            SearchHit(
+                chunk.path, chunk.start_line, chunk.end_line, chunk.content_id, round(score, 4)
+            )
+            for score, chunk in ((score, self._chunks[chunk_id]) for score, chunk_id in best)
+        ]
+
+    def _chunk_at(self, path: str, line: int) -> Optional[int]:
+        for chunk_id in self._file_chunks.get(path, ()):
+            chunk = self._chunks[chunk_id]
+            if chunk.start_line <= line <= chunk.end_line:
+                return chunk_id
+        return None
+
+    def update_directory(self, root: str) -> int:
+        """Re-index files under `root` whose mtime or size changed; returns files indexed"""
+        return self._apply(_scan_changed(root, self._versions, self.chunk_lines))
+
+    def _apply(self, changes: Dict[str, Optional[FileAnalysis]]) -> int:
+        """Apply analyzed files; None marks a deleted file"""
+        for path, analysis in changes.items():
+            if analysis is None:
+                self.remove_file(path)
+            else:
+                self.add(analysis)
+        return sum(analysis is not None for analysis in changes.values())
+
+    async def update_from_github(self, github, ref: str = None) -> int:
+        """Re-index files on GitHub whose blob SHA changed; returns files indexed.
+
+        Content comes through the client's file cache, so files agents have
+        already read, or that a prefetch loaded, are not downloaded again.
+        """
+        tree = await github.list_tree(ref)
+        wanted = {
+            path: item for path, item in tree.items()
+            if _indexable(path) and item.get("size", 0) <= settings.REPO_INDEX_MAX_FILE_BYTES
+        }
+        changed = [item for path, item in wanted.items() if self._versions.get(path) != item["sha"]]
+        limit = asyncio.Semaphore(settings.GITHUB_MAX_CONCURRENCY)
+
+        async def fetch(item: Dict) -> Tuple[Dict, Optional[str]]:
+            async with limit:
+                try:
+                    return item, await github.get_tree_file(item, ref)
+                except Exception as e:
+                    print(f"Error indexing {item['path']}: {str(e)}")
+                    return item, None
+
+        fetched = await asyncio.gather(*(fetch(item) for item in changed))
+        analyses = await asyncio.to_thread(lambda: [
+            analyze(item["path"], content, item["sha"], self.chunk_lines)
+            for item, content in fetched if content is not None
+        ])
+        changes: Dict[str, Optional[FileAnalysis]] = {a.path: a for a in analyses}
+        changes.update((path, None) for path in set(self._versions) - set(wanted))
+        return self._apply(changes)
+
+    async def autorefresh(self, github=None, interval: float = None):
+        """Keep the index current with REPO_INDEX_ROOT, or with GitHub if no root is set"""
+        interval = interval or settings.REPO_INDEX_REFRESH_INTERVAL
+        while True:
+            try:
+                if settings.REPO_INDEX_ROOT:
+                    # Reading and tokenizing happen off the event loop; only the
+                    # index updates, which searches must not interleave with, run on it
+                    changes = await asyncio.to_thread(
+                        _scan_changed, settings.REPO_INDEX_ROOT, dict(self._versions), self.chunk_lines
+                    )
+                    self._apply(changes)
+                elif github is not None:
+                    await self.update_from_github(github)
+            except Exception as e:
+                print(f"Error refreshing repository index: {str(e)}")
+            await asyncio.sleep(interval)
+
+def _indexable(path: str) -> bool:
+    return (
+        os.path.splitext(path)[1] in settings.REPO_INDEX_EXTENSIONS
+        and not SKIP_DIRS.intersection(path.split("/")[:-1])
+    )
+
+def _scan(root: str) -> Iterable[Tuple[str, str, str]]:
+    """(repository path, filesystem path, mtime/size stamp) of each indexable file"""
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            full_path = os.path.join(directory, name)
+            path = os.path.relpath(full_path, root).replace(os.sep, "/")
+            if not _indexable(path):
+                continue
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            if stat.st_size <= settings.REPO_INDEX_MAX_FILE_BYTES:
+                yield path, full_path, f"{stat.st_mtime_ns}:{stat.st_size}"
+
+def _scan_changed(
+    root: str,
+    versions: Dict[str, str],
+    chunk_lines: int
+) -> Dict[str, Optional[FileAnalysis]]:
+    """Analyses of files that changed since `versions`, and None for deleted ones"""
+    changes = {}
+    seen = set()
+    for path, full_path, stamp in _scan(root):
+        seen.add(path)
+        if versions.get(path) == stamp:
+            continue
+        try:
+            with open(full_path, "r", encoding="utf-8") as f:
+                changes[path] = analyze(path, f.read(), stamp, chunk_lines)
+        except (OSError, UnicodeDecodeError):
+            continue
+    for path in set(versions) - seen:
+        changes[path] = None
+    return changes
+
+_index: Optional[RepoIndex] = None
+
+def get_repo_index() -> RepoIndex:
+    """Return the process-wide repository index, creating it on first use"""
+    global _index
+    if _index is None:
+        _index = RepoIndex()
+    return _index
@@ -0,0 +1,113 @@
+import re
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+
+# Literal fragments of every ERROR_PATTERN branch; the regex engine scans for
+# these far faster than for the full pattern, so most lines are rejected early
+ERROR_HINT = re.compile(r"rror|RROR|xception|raceback|ATAL|atal|AILED|anic:|ERR!|xit")
+ERROR_PATTERN = re.compile(
+    r"Traceback \(most recent call last\)"
+    r"|(?:Error|Exception)\b"
+    r"|\b(?:ERROR|FATAL|FAILED|fatal|error)\b"
+    r"|\berror(?:\[E\d+\]| TS\d+)"
+    r"|\bpanic:"
+    r"|npm ERR!"
+    r"|[Ee]xit(?:ed)?(?: with)? (?:code|status):? *[1-9]\d*"
+    r"|non-zero exit"
+)
+MAX_LINE_LENGTH = 2000
+TAIL_LINES = 20
+
+class LogErrorExtractor:
+    """Streaming pass over build log lines that keeps only the error regions.
+
+    Each line matching ERROR_PATTERN opens (or extends) a region that includes
+    `before` lines of leading context and `after` lines of trailing context.
+    Only those windows, the last few lines of the log and some counters are
+    kept, so memory stays flat however long the log is.
+    """
+
+    def __init__(
+        self,
+        before: int = None,
+        after: int = None,
+        max_regions: int = None,
+        max_region_lines: int = None
+    ):
+        self.after = settings.LOG_CONTEXT_AFTER if after is None else after
+        self.max_regions = max_regions or settings.LOG_MAX_REGIONS
+        self.max_region_lines = max_region_lines or settings.LOG_MAX_REGION_LINES
+        self._before: Deque[Tuple[int, str]] = deque(
+            maxlen=settings.LOG_CONTEXT_BEFORE if before is None else before
+        )
+        self._tail: Deque[str] = deque(maxlen=TAIL_LINES)
+        self._current: Optional[Dict] = None
+        self._after_remaining = 0
+        self.regions: List[Dict] = []
+        self.line_count = 0
+        self.error_lines = 0
+        self.first_error: Optional[str] = None
+
+    def feed(self, line: str):
+        self.line_count += 1
+        line = line.rstrip("\r\n")[:MAX_LINE_LENGTH]
+        self._tail.append(line)
+
+        if ERROR_HINT.search(line) and ERROR_PATTERN.search(line):
+            self.error_lines += 1
+            if self.first_error is None:
+                self.first_error = line.strip()
+            if self._current is None and len(self.regions) < self.max_regions:
+                self._current = {
+                    "start": self._before[0][0] if self._before else self.line_count,
+                    "lines": [text for _, text in self._before]
+                }
+                self.regions.append(self._current)
+                self._before.clear()
+            if self._current is not None:
+                self._append(line)
+                self._after_remaining = self.after
+                return
+        elif self._current is not None:
+            self._append(line)
+            self._after_remaining -= 1
+            if self._after_remaining <= 0:
+                self._current = None
+            return
+
+        self._before.append((self.line_count, line))
+
+    def summary(self) -> str:
+        summary = (
+            f"{self.line_count} log lines, {self.error_lines} matching error patterns "
+            f"in {len(self.regions)} region(s)"
+        )
+        if self.first_error:
+            summary += f"; first error: {self.first_error}"
+        return summary
+
+    def format(self) -> str:
+        """Render the summary and error regions for a prompt"""
+        parts = [self.summary(), "\n"]
+        for region in self.regions:
+            end = region["start"] + region.get("count", len(region["lines"])) - 1
+            parts.append(f"\n--- lines {region['start']}-{end} ---\n")
+            parts.append("\n".join(region["lines"]))
+            if region.get("truncated"):
+                parts.append(f"\n... ({region['truncated']} more lines)")
+            parts.append("\n")
+        if not self.regions and self._tail:
+            parts.append(f"\n--- last {len(self._tail)} lines ---\n")
+            parts.append("\n".join(self._tail))
+            parts.append("\n")
+        return "".join(parts)
+
+    def _append(self, line: str):
+        region = self._current
+        region["count"] = region.get("count", len(region["lines"])) + 1
+        if len(region["lines"]) < self.max_region_lines:
+            region["lines"].append(line)
+        else:
+            region["truncated"] = region.get("truncated", 0) + 1
@@ -1,12 +1,39 @@
-from typing import Dict, List, Optional
-from pydantic import BaseModel
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from pydantic import BaseModel, model_validator
+from src.core.blobs import get_blob_store
+from src.core.config import settings
+from src.core.events import EventBus
+from src.core.fingerprint import ErrorIndex, FixProposal, KnownError
+from src.core.index import RepoIndex, get_repo_index
+from src.core.storage import TaskStore, create_task_store
 
 class CodeContext(BaseModel):
-    file_path: str
-    content: str
+    """A file, window or log excerpt attached to a task.
+
+    Content lives in the blob store and is referenced by `content_id`; passing
+    `content=...` stores it there, and the `content` property loads it back.
+    """
+    file_path: Optional[str] = None
+    content_id: Optional[str] = None
     start_line: Optional[int] = None
     end_line: Optional[int] = None
     error_message: Optional[str] = None
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _store_content(cls, data):
+        if isinstance(data, dict) and "content" in data:
+            data = dict(data)
+            content = data.pop("content")
+            if content:
+                data["content_id"] = get_blob_store().put(content)
+        return data
+    
+    @property
+    def content(self) -> str:
+        return get_blob_store().get(self.content_id) if self.content_id else ""
 
 class Task(BaseModel):
     id: str
@@ -16,26 +43,126 @@ class Task(BaseModel):
     metadata: Dict = {}
     parent_task_id: Optional[str] = None
     subtasks: List[str] = []
-    status: str = "pending"  # pending, in_progress, completed, failed
+    status: str = "pending"  # pending, in_progress, completed, failed, cancelled
+    
+    def dump(self, include_content: bool = False) -> Dict:
+        """Serialize the task, optionally resolving context content from the blob store"""
+        data = self.model_dump()
+        if include_content:
+            for ctx, ctx_data in zip(self.context, data["context"]):
+                ctx_data["content"] = ctx.content
+        return data
 
 class SharedMemory:
-    def __init__(self):
-        self.tasks: Dict[str, Task] = {}
-        self.context_cache: Dict[str, Dict] = {}
-        self.error_history: List[Dict] = []
+    def __init__(self, store: TaskStore = None, index: RepoIndex = None):
+        self.store = store or create_task_store(Task)
+        self.events = EventBus()
+        if index is None and settings.REPO_INDEX_ENABLED:
+            index = get_repo_index()
+        self.index = index
+        self.error_history: Deque[Dict] = deque(maxlen=settings.ERROR_HISTORY_SIZE)
+        self.errors = ErrorIndex()
         
     def add_task(self, task: Task):
-        self.tasks[task.id] = task
+        self.store.put(task)
+    
+    def add_tasks(self, tasks: List[Task]):
+        """Insert several tasks in one store operation"""
+        self.store.put_many(tasks)
+    
+    def save_task(self, task: Task):
+        """Persist changes made to a task outside of update_task_status"""
+        self.store.put(task)
+    
+    def append_task_metadata(self, task_id: str, key: str, value):
+        """Append to a list in a task's metadata without saving the whole task.
+
+        Safe while another process runs the task: unlike `save_task`, it
+        can't overwrite that process's status or result.
+        """
+        self.store.append_metadata(task_id, key, value)
     
     def get_task(self, task_id: str) -> Optional[Task]:
-        return self.tasks.get(task_id)
+        return self.store.get(task_id)
+    
+    def get_tasks(self, task_ids: List[str]) -> Dict[str, Task]:
+        return self.store.get_many(task_ids)
+    
+    def get_task_status(self, task_id: str) -> Optional[str]:
+        return self.store.get_status(task_id)
     
     def update_task_status(self, task_id: str, status: str):
-        if task_id in self.tasks:
-            self.tasks[task_id].status = status
+        self.store.update_status(task_id, status)
+        self.events.publish(task_id, "status", {"status": status})
+        if status == "completed":
+            self.errors.resolve(task_id)
+        elif status in ("failed", "cancelled"):
+            self.errors.discard(task_id, failed=status == "failed")
+    
+    def find_tasks(
+        self,
+        status: str = None,
+        type: str = None,
+        parent_task_id: str = None,
+        limit: int = None
+    ) -> List[Task]:
+        """Look up tasks through the store's status/type/parent indexes"""
+        filters = {"status": status, "type": type, "parent_task_id": parent_task_id}
+        return self.store.find(limit=limit, **{k: v for k, v in filters.items() if v is not None})
+    
+    def get_children(self, task_id: str) -> List[Task]:
+        return self.store.find(parent_task_id=task_id)
     
     def add_error(self, error_data: Dict):
         self.error_history.append(error_data)
     
-    def get_related_context(self, task_id: str) -> Dict:
-        return self.context_cache.get(task_id, {})
\ No newline at end of file
+    def link_fix(self, error: KnownError, fix_task: Task):
+        """Remember `fix_task` as a fix for `error`, reusable once it completes"""
+        self.errors.link(error, FixProposal(
+            task_id=fix_task.id,
+            description=fix_task.description,
+            context=[ctx.model_dump() for ctx in fix_task.context]
+        ))
+    
+    def get_related_context(
+        self,
+        task_id: str,
+        k: int = None,
+        contexts: List[CodeContext] = None
+    ) -> List[CodeContext]:
+        """Repository chunks most relevant to a task's description, errors and files.
+
+        Files the task (or `contexts`, when the caller loaded content for it)
+        already carries in full are skipped; files named only by path are
+        not, since their content is exactly what is missing.
+        """
+        task = self.get_task(task_id)
+        if task is None or self.index is None:
+            return []
+        contexts = task.context if contexts is None else contexts
+        query = "\n".join([task.description] + [
+            part for ctx in task.context for part in (ctx.file_path, ctx.error_message) if part
+        ])
+        whole_files = [
+            ctx.file_path for ctx in contexts
+            if ctx.file_path and ctx.content_id and ctx.start_line is None and ctx.end_line is None
+        ]
+        return [
+            CodeContext(
+                file_path=hit.path,
+                content_id=hit.content_id,
+                start_line=hit.start_line,
+                end_line=hit.end_line
+            )
+            for hit in self.index.search(query, k, exclude=whole_files)
+        ]
+    
+    async def autoflush(self, interval: float = None):
+        """Periodically flush batched writes so an idle server doesn't hold them"""
+        interval = interval or settings.MEMORY_FLUSH_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            self.store.flush()
+    
+    def close(self):
+        self.store.close()
\ No newline at end of file
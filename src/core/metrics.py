@@ -0,0 +1,279 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base for metrics rendered in the Prometheus text exposition format"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def set_function(self, function: Callable[[], Dict[LabelValues, float]]):
+        """Compute values at scrape time; `function` maps label value tuples to values"""
+        self._function = function
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, value in sorted(self._samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+    def _samples(self) -> Dict[LabelValues, float]:
+        if self._function is None:
+            return {}
+        try:
+            return dict(self._function())
+        except Exception:
+            return {}
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            samples = dict(self._values)
+        samples.update(super()._samples())
+        return samples
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels) -> "Timer":
+        return Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Timer:
+    """Times a block or function into a histogram.
+
+    Usable as `with histogram.time(stage="x"):` or as a decorator on sync and
+    async functions. If `labels` contains "outcome", it is set to "error" when
+    the block raises.
+    """
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels)
+        if exc_type is not None and "outcome" in self.histogram.labelnames:
+            labels["outcome"] = "error"
+        self.histogram.observe(time.perf_counter() - self._start, **labels)
+        return False
+
+    def __call__(self, function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with Timer(self.histogram, self.labels):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Timer(self.histogram, self.labels):
+                return function(*args, **kwargs)
+        return wrapper
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def counter(name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+    return registry.register(Counter(name, help, labelnames))
+
+def gauge(name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, help, labelnames))
+
+def histogram(
+    name: str,
+    help: str,
+    labelnames: Iterable[str] = (),
+    buckets: Iterable[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return registry.register(Histogram(name, help, labelnames, buckets))
+
+def timed(metric: Histogram, **labels) -> Timer:
+    """Shorthand for `metric.time(**labels)`"""
+    return metric.time(**labels)
+
+# Metrics shared across modules
+TASK_QUEUE_WAIT = histogram(
+    "codertool_task_queue_wait_seconds", "Time tasks spend queued before a worker starts them", ["agent"]
+)
+TASK_DURATION = histogram(
+    "codertool_task_duration_seconds", "Time agents spend handling a task", ["agent", "status"]
+)
+TASK_LATENCY = histogram(
+    "codertool_task_latency_seconds", "Time from submission until the handler returns", ["agent", "status"]
+)
+QUEUE_DEPTH = gauge("codertool_queue_depth", "Tasks waiting in each agent queue", ["agent"])
+CLAUDE_LATENCY = histogram(
+    "codertool_claude_request_duration_seconds", "Claude API request latency", ["model", "outcome"]
+)
+CLAUDE_TOKENS = counter(
+    "codertool_claude_tokens_total", "Claude tokens consumed", ["model", "direction"]
+)
+CLAUDE_ERRORS = counter(
+    "codertool_claude_errors_total", "Failed Claude API attempts", ["model", "status"]
+)
+CLAUDE_COST = counter(
+    "codertool_claude_cost_dollars_total", "Estimated Claude spend in USD", ["route", "model"]
+)
+ROUTE_LATENCY = histogram(
+    "codertool_route_duration_seconds", "Uncached Claude call latency per route and tier", ["route", "tier", "outcome"]
+)
+ROUTE_ESCALATIONS = counter(
+    "codertool_route_escalations_total", "Responses that failed validation and moved up a tier", ["route", "tier"]
+)
+HTTP_LATENCY = histogram(
+    "codertool_http_request_duration_seconds",
+    "Integration API latency until response headers arrive",
+    ["service", "operation", "method"]
+)
+HTTP_ERRORS = counter(
+    "codertool_http_errors_total", "Integration API errors", ["service", "operation", "status"]
+)
+CACHE_HITS = counter("codertool_cache_hits_total", "Cache lookups served from cache", ["cache"])
+CACHE_MISSES = counter("codertool_cache_misses_total", "Cache lookups that missed", ["cache"])
+KNOWN_FIX_LOOKUPS = counter(
+    "codertool_known_fix_lookups_total", "Error lookups in the fix index by match type", ["outcome"]
+)
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records latency and errors for an integration.
+
+    `operation` maps a request path to a low-cardinality name (for example
+    "git/blobs" rather than the blob SHA).
+    """
+
+    def __init__(
+        self,
+        service: str,
+        operation: Callable[[str], str],
+        transport: httpx.AsyncBaseTransport = None
+    ):
+        self.service = service
+        self.operation = operation
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        operation = self.operation(request.url.path)
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            HTTP_ERRORS.inc(service=self.service, operation=operation, status="error")
+            raise
+        finally:
+            HTTP_LATENCY.observe(
+                time.perf_counter() - start,
+                service=self.service,
+                operation=operation,
+                method=request.method
+            )
+        if response.status_code >= 400:
+            HTTP_ERRORS.inc(service=self.service, operation=operation, status=str(response.status_code))
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
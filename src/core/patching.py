@@ -0,0 +1,297 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+MAX_FUZZ = 2  # Context lines a unified diff hunk may lose at each end and still apply
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@")
+SEARCH_MARKER = re.compile(r"^<{5,9} ?SEARCH\b")
+DIVIDER_MARKER = re.compile(r"^={5,9}\s*$")
+REPLACE_MARKER = re.compile(r"^>{5,9} ?REPLACE\b")
+
+_REASONS = {
+    "missing": "lines to replace were not found",
+    "ambiguous": "lines to replace match more than once"
+}
+
+class PatchConflict(Exception):
+    """Raised when edits don't apply cleanly; no file is changed"""
+
+    def __init__(self, conflicts: List[str]):
+        super().__init__("; ".join(conflicts))
+        self.conflicts = conflicts
+
+@dataclass
+class Hunk:
+    before: List[str]
+    after: List[str]
+    line: Optional[int] = None  # Original start line from a unified diff header
+    leading: int = 0  # Unchanged context lines at the start of before/after
+    trailing: int = 0  # ... and at the end
+
+@dataclass
+class FilePatch:
+    path: str
+    hunks: List[Hunk] = field(default_factory=list)
+    delete: bool = False
+
+def parse_patch(text: str) -> List[FilePatch]:
+    """Edits in a response, from SEARCH/REPLACE blocks and unified diffs, grouped by file"""
+    patches: Dict[str, FilePatch] = {}
+    for path, hunk, delete in _search_replace_hunks(text) + _unified_diff_hunks(text):
+        patch = patches.setdefault(path, FilePatch(path))
+        patch.delete = patch.delete or delete
+        if hunk is not None:
+            patch.hunks.append(hunk)
+    return list(patches.values())
+
+def _search_replace_hunks(text: str) -> List[Tuple[str, Hunk, bool]]:
+    """Blocks of the form `path`, `<<<<<<< SEARCH`, old lines, `=======`, new lines, `>>>>>>> REPLACE`"""
+    hunks = []
+    lines = text.splitlines()
+    path = None
+    i = 0
+    while i < len(lines):
+        if not SEARCH_MARKER.match(lines[i].strip()):
+            i += 1
+            continue
+        # The path is the nearest line above that isn't a code fence; blocks
+        # directly following another block reuse its path
+        for k in range(i - 1, -1, -1):
+            previous = lines[k].strip()
+            if REPLACE_MARKER.match(previous):
+                break
+            if previous and not previous.startswith("```"):
+                path = _clean_path(previous.strip("`*"))
+                break
+        search, replace = [], []
+        j = i + 1
+        while j < len(lines) and not DIVIDER_MARKER.match(lines[j]):
+            search.append(lines[j])
+            j += 1
+        j += 1
+        while j < len(lines) and not REPLACE_MARKER.match(lines[j].strip()):
+            replace.append(lines[j])
+            j += 1
+        if path and j < len(lines):
+            hunks.append((path, Hunk(search, replace), False))
+        i = j + 1
+    return hunks
+
+def _unified_diff_hunks(text: str) -> List[Tuple[str, Optional[Hunk], bool]]:
+    hunks = []
+    lines = text.splitlines()
+    path = None
+    delete = False
+    hunk: Optional[Hunk] = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_path = _diff_path(line[4:])
+            new_path = _diff_path(lines[i + 1][4:])
+            delete = new_path is None
+            path = old_path if delete else new_path
+            hunk = None
+            if delete:
+                hunks.append((path, None, True))
+            i += 2
+            continue
+        header = HUNK_HEADER.match(line)
+        if header and path:
+            start, length = int(header.group(1)), header.group(2)
+            # A zero-length old range inserts after its start line
+            hunk = Hunk([], [], line=start + 1 if length == "0" else start)
+            hunks.append((path, hunk, delete))
+        elif hunk is not None and (line[:1] in (" ", "-", "+", "\\") or line == ""):
+            if line.startswith("-"):
+                hunk.before.append(line[1:])
+            elif line.startswith("+"):
+                hunk.after.append(line[1:])
+            elif not line.startswith("\\"):
+                hunk.before.append(line[1:])
+                hunk.after.append(line[1:])
+        else:
+            hunk = None
+        i += 1
+    for _, hunk, _ in hunks:
+        if hunk is not None:
+            # Blank lines after a hunk are more likely prose spacing than context
+            while hunk.before[-1:] == [""] and hunk.after[-1:] == [""]:
+                hunk.before.pop()
+                hunk.after.pop()
+            hunk.leading, hunk.trailing = _context_lengths(hunk)
+    return hunks
+
+def _context_lengths(hunk: Hunk) -> Tuple[int, int]:
+    leading = 0
+    for old, new in zip(hunk.before, hunk.after):
+        if old != new:
+            break
+        leading += 1
+    trailing = 0
+    for old, new in zip(reversed(hunk.before[leading:]), reversed(hunk.after[leading:])):
+        if old != new:
+            break
+        trailing += 1
+    return leading, trailing
+
+def _diff_path(header: str) -> Optional[str]:
+    path = header.split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return _clean_path(path)
+
+def _clean_path(path: str) -> str:
+    path = path.strip()
+    if path.lower().startswith("file:"):
+        path = path[5:].strip()
+    return path[2:] if path.startswith("./") else path
+
+def _exact(line: str) -> str:
+    return line
+
+def _loose(line: str) -> str:
+    return " ".join(line.split())
+
+def _find(lines: List[str], block: List[str], key: Callable[[str], str]) -> List[int]:
+    if not block or len(block) > len(lines):
+        return []
+    target = [key(line) for line in block]
+    first = target[0]
+    keyed = [key(line) for line in lines]
+    return [
+        i for i in range(len(lines) - len(block) + 1)
+        if keyed[i] == first and keyed[i:i + len(block)] == target
+    ]
+
+def _variants(hunk: Hunk):
+    """Before/after pairs to try: the whole hunk, then with context trimmed"""
+    yield hunk.before, hunk.after, 0
+    for fuzz in range(1, MAX_FUZZ + 1):
+        lead, trail = min(fuzz, hunk.leading), min(fuzz, hunk.trailing)
+        if lead == 0 and trail == 0:
+            break
+        before = hunk.before[lead:len(hunk.before) - trail]
+        after = hunk.after[lead:len(hunk.after) - trail]
+        if before:
+            yield before, after, lead
+
+def apply_hunks(path: str, content: Optional[str], hunks: List[Hunk]) -> str:
+    """Apply a file's hunks in order and return its new content.
+
+    Each hunk is located exactly, then ignoring whitespace, then (for diff
+    hunks) with up to MAX_FUZZ context lines dropped from either end. A hunk
+    whose result is already present along with its context is skipped.
+    Hunks that can't be found, match in more than one place without a line
+    number to choose by, or overlap an earlier hunk are conflicts.
+    """
+    conflicts = []
+    original = content or ""
+    lines = original.splitlines()
+    touched: List[Tuple[int, int]] = []
+    offset = 0
+    for number, hunk in enumerate(hunks, 1):
+        label = f"{path} hunk {number}"
+        if not hunk.before:
+            if hunk.line is not None and lines:
+                start = min(max(hunk.line - 1 + offset, 0), len(lines))
+                lines[start:start] = hunk.after
+                touched = _shift(touched, start, 0, len(hunk.after))
+                offset += len(hunk.after)
+            elif not lines:
+                lines = list(hunk.after)
+                touched = [(0, len(lines))]
+            elif _loose_equal(lines, hunk.after):
+                continue
+            else:
+                conflicts.append(f"{label}: {path} already exists")
+            continue
+        match = _locate(lines, hunk, offset)
+        if isinstance(match, str):
+            if match == "missing" and _already_applied(lines, hunk):
+                continue
+            conflicts.append(f"{label}: {_REASONS[match]}")
+            continue
+        start, length, after = match
+        if after != lines[start:start + length] and _loose_equal(lines[start:start + len(after)], after):
+            # An insertion whose lines are already in place
+            continue
+        if any(start < end and begin < start + length for begin, end in touched):
+            conflicts.append(f"{label}: overlaps an earlier edit")
+            continue
+        lines[start:start + length] = after
+        touched = _shift(touched, start, length, len(after))
+        offset += len(after) - length
+    if conflicts:
+        raise PatchConflict(conflicts)
+    if not lines:
+        return ""
+    return "\n".join(lines) + ("\n" if original.endswith("\n") or not original else "")
+
+def _locate(lines: List[str], hunk: Hunk, offset: int):
+    """(start, length, replacement) for a hunk, or "missing" / "ambiguous" """
+    for key in (_exact, _loose):
+        for before, after, trimmed in _variants(hunk):
+            positions = _find(lines, before, key)
+            if not positions:
+                continue
+            if len(positions) > 1:
+                if hunk.line is None:
+                    return "ambiguous"
+                expected = hunk.line - 1 + offset + trimmed
+                positions.sort(key=lambda position: abs(position - expected))
+            return positions[0], len(before), after
+    return "missing"
+
+def _already_applied(lines: List[str], hunk: Hunk) -> bool:
+    """Whether the hunk's replacement is present together with its unchanged context.
+
+    Without context there is nothing to say the lines are where the hunk
+    would have put them rather than elsewhere in the file.
+    """
+    if hunk.after == hunk.before:
+        return False
+    leading, trailing = _context_lengths(hunk)
+    context = hunk.before[:leading] + hunk.before[len(hunk.before) - trailing:]
+    return any(line.strip() for line in context) and bool(_find(lines, hunk.after, _loose))
+
+def _loose_equal(lines: List[str], other: List[str]) -> bool:
+    return [_loose(line) for line in lines] == [_loose(line) for line in other]
+
+def _shift(ranges: List[Tuple[int, int]], start: int, removed: int, added: int) -> List[Tuple[int, int]]:
+    """Move recorded edit ranges after a replacement and record the new one"""
+    delta = added - removed
+    shifted = [
+        (begin + delta, end + delta) if begin >= start + removed else (begin, end)
+        for begin, end in ranges
+    ]
+    shifted.append((start, start + added))
+    return shifted
+
+def apply_patch(patches: List[FilePatch], files: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Apply edits to several files at once, all or nothing.
+
+    `files` maps each patched path to its current content (None or "" for a
+    new file). Returns the new content of every file that changed; if any
+    hunk conflicts, raises PatchConflict listing all of them instead.
+    """
+    conflicts = []
+    changed = {}
+    for patch in patches:
+        if patch.delete:
+            conflicts.append(f"{patch.path}: deleting files is not supported")
+            continue
+        current = files.get(patch.path)
+        try:
+            updated = apply_hunks(patch.path, current, patch.hunks)
+        except PatchConflict as e:
+            conflicts.extend(e.conflicts)
+            continue
+        if updated != (current or ""):
+            changed[patch.path] = updated
+    if conflicts:
+        raise PatchConflict(conflicts)
+    return changed
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.core.config import settings
+from src.core.events import TERMINAL_STATUSES
+from src.core.memory import SharedMemory, Task
+from src.core.metrics import TASK_DURATION, TASK_LATENCY, TASK_QUEUE_WAIT
+from src.core.scheduler import DagScheduler
+from src.core.workqueue import QueueFullError, WorkQueue, create_work_queue
+
+Handler = Callable[[Task], Awaitable[Dict]]
+
+class TaskQueue:
+    """Bounded per-agent task queues drained by a pool of background workers.
+
+    Queued task ids travel through a WorkQueue chosen by TASK_QUEUE_BACKEND;
+    with a shared backend, workers in every process claim from the same
+    queues.
+    """
+
+    def __init__(self, memory: SharedMemory, backend: str = None):
+        self.memory = memory
+        self.backend = backend
+        self.work: Optional[WorkQueue] = None
+        self._handlers: Dict[str, Handler] = {}
+        self._routes: Dict[str, str] = {}
+        self._workers: List[asyncio.Task] = []
+        self.scheduler = DagScheduler(memory, self.execute)
+
+    def register(self, agent: str, task_types: List[str], handler: Handler):
+        """Route the given task types to an agent's handler"""
+        self._handlers[agent] = handler
+        for task_type in task_types:
+            self._routes[task_type] = agent
+
+    def accepts(self, task_type: str) -> bool:
+        return task_type in self._routes
+
+    @property
+    def shared(self) -> bool:
+        """Whether other processes may be running the queued tasks"""
+        return self.work is not None and self.work.shared
+
+    def start(self):
+        """Create the queues and spawn the worker pool for every agent"""
+        if self._workers:
+            return
+        self.work = create_work_queue(list(self._handlers), self.backend)
+        self.work.start()
+        for agent in self._handlers:
+            for _ in range(max(1, settings.AGENT_WORKERS.get(agent, 1))):
+                self._workers.append(asyncio.create_task(self._worker(agent)))
+
+    async def stop(self):
+        """Cancel all workers and subtask runs and wait for them to exit"""
+        await self.scheduler.stop()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.work is not None:
+            await self.work.close()
+
+    def submit(self, task: Task):
+        """Enqueue a task without waiting; raises QueueFullError on backpressure"""
+        if self.shared:
+            # Workers elsewhere load the task from the store, so it must be written first
+            self.memory.store.flush()
+        self.work.put(self._routes[task.type], task.id)
+
+    def depth(self) -> Dict[str, int]:
+        return self.work.depth() if self.work is not None else {}
+
+    async def _worker(self, agent: str):
+        while True:
+            claim = await self.work.claim(agent)
+            held = False
+            try:
+                TASK_QUEUE_WAIT.observe(claim.waited, agent=agent)
+                task = self.memory.get_task(claim.task_id)
+                if task is None or task.status in TERMINAL_STATUSES:
+                    continue
+                if claim.attempts > settings.TASK_MAX_ATTEMPTS:
+                    # Its earlier claims expired, most likely because it took the worker down
+                    self.memory.add_error({
+                        "task_id": task.id,
+                        "error": f"Abandoned after {claim.attempts - 1} attempts",
+                        "type": "task_error"
+                    })
+                    self.memory.update_task_status(task.id, "failed")
+                    continue
+                if task.status == "in_progress" and task.subtasks and "result" in task.metadata:
+                    # Its handler finished in a worker that died while the subtasks ran
+                    self.scheduler.spawn(task, on_done=lambda claim=claim: self.work.done(agent, claim))
+                    held = True
+                    continue
+                started = time.monotonic()
+                await self._run(agent, task)
+                TASK_LATENCY.observe(
+                    claim.waited + time.monotonic() - started, agent=agent, status=task.status
+                )
+                if task.subtasks and task.status not in TERMINAL_STATUSES:
+                    # The claim, and its lease, are held until the subtasks finish,
+                    # so if this process dies another worker resumes them
+                    if self.shared:
+                        self.memory.store.flush()
+                    self.scheduler.spawn(task, on_done=lambda claim=claim: self.work.done(agent, claim))
+                    held = True
+            finally:
+                if not held:
+                    self.work.done(agent, claim)
+
+    async def execute(self, task: Task):
+        """Run a task's handler immediately, bypassing the queue"""
+        await self._run(self._routes[task.type], task)
+
+    async def _run(self, agent: str, task: Task):
+        self.memory.update_task_status(task.id, "in_progress")
+        started = time.monotonic()
+        try:
+            result = await self._handlers[agent](task)
+        except Exception as e:
+            self.memory.add_error({
+                "task_id": task.id,
+                "error": str(e),
+                "type": "task_error"
+            })
+            self.scheduler.discard(task)
+            self.memory.update_task_status(task.id, "failed")
+            result = {"status": "failed", "error": str(e)}
+        TASK_DURATION.observe(time.monotonic() - started, agent=agent, status=task.status)
+        task.metadata["result"] = result
+        self.memory.save_task(task)
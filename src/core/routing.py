@@ -0,0 +1,104 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+from src.core.config import settings
+from src.core.context import estimate_tokens
+
+# Cheapest first; escalation moves one step to the right
+TIERS = ["haiku", "sonnet", "opus"]
+# Largest max_tokens each tier's default model in CLAUDE_MODELS accepts
+TIER_MAX_OUTPUT = {"haiku": 64000, "sonnet": 64000, "opus": 64000}
+# Shortest prompt prefix, in tokens, each tier's default model will cache
+TIER_MIN_CACHE_TOKENS = {"haiku": 4096, "sonnet": 1024, "opus": 4096}
+# Prompt cache pricing relative to the model's input price
+CACHE_WRITE_PRICE_RATIO = 1.25
+CACHE_READ_PRICE_RATIO = 0.1
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    tier: str
+    model: str
+    max_tokens: int
+    max_tier: str = TIERS[-1]
+
+class ModelRouter:
+    """Pick the model tier and max_tokens for a Claude call.
+
+    Each route (usually the task type) has a policy in ROUTING_POLICY giving
+    its starting tier and max_tokens. Prompts larger than
+    ROUTING_LARGE_CONTEXT start one tier higher, and with an `output_ratio`
+    max_tokens grows with the prompt (e.g. rewriting the files it contains)
+    up to `max_tokens_cap`. Callers escalate a route when the cheaper
+    model's response fails validation.
+    """
+
+    def __init__(self, policy: Dict[str, Dict] = None, models: Dict[str, str] = None):
+        self.policy = policy or settings.ROUTING_POLICY
+        self.models = models or settings.CLAUDE_MODELS
+
+    def route(self, name: str, messages: List[Dict], max_tokens: int = None) -> Route:
+        policy = self.policy.get(name) or self.policy["default"]
+        prompt_tokens = sum(estimate_tokens(_text(msg["content"])) for msg in messages)
+
+        tier = policy["tier"]
+        max_tier = policy.get("max_tier", TIERS[-1])
+        if prompt_tokens > settings.ROUTING_LARGE_CONTEXT:
+            tier = TIERS[min(TIERS.index(tier) + 1, TIERS.index(max_tier))]
+
+        if max_tokens is None:
+            max_tokens = max(policy["max_tokens"], int(prompt_tokens * policy.get("output_ratio", 0)))
+            max_tokens = min(max_tokens, policy.get("max_tokens_cap", max_tokens))
+        return Route(
+            name=name,
+            tier=tier,
+            model=self.models[tier],
+            max_tokens=min(max_tokens, TIER_MAX_OUTPUT[tier]),
+            max_tier=max_tier
+        )
+
+    def escalate(self, route: Route) -> Optional[Route]:
+        """The same route on the next larger tier, or None if there is none"""
+        index = TIERS.index(route.tier)
+        if index >= TIERS.index(route.max_tier):
+            return None
+        tier = TIERS[index + 1]
+        return replace(
+            route,
+            tier=tier,
+            model=self.models[tier],
+            max_tokens=min(route.max_tokens, TIER_MAX_OUTPUT[tier])
+        )
+
+def estimate_cost(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0
+) -> float:
+    """Approximate USD cost of a call from CLAUDE_PRICES; 0 for unknown models"""
+    for tier, tier_model in settings.CLAUDE_MODELS.items():
+        if tier_model == model and tier in settings.CLAUDE_PRICES:
+            input_price, output_price = settings.CLAUDE_PRICES[tier]
+            input_cost = input_price * (
+                input_tokens
+                + cache_read_tokens * CACHE_READ_PRICE_RATIO
+                + cache_write_tokens * CACHE_WRITE_PRICE_RATIO
+            )
+            return (input_cost + output_tokens * output_price) / 1_000_000
+    return 0.0
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+_router: Optional[ModelRouter] = None
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router, creating it on first use"""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
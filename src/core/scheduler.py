@@ -0,0 +1,186 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from src.core.config import settings
+from src.core.events import TERMINAL_STATUSES
+from src.core.memory import SharedMemory, Task
+
+class DagRun:
+    """Execution of one parent task's subtasks as a dependency DAG.
+
+    A subtask lists the sibling ids it needs in `metadata["depends_on"]` and
+    starts as soon as all of them have completed. When a dependency fails or
+    is cancelled its dependents are cancelled; independent branches keep
+    running. Subtasks may be added until the run is sealed, after which the
+    parent completes once every child has finished.
+    """
+
+    def __init__(self, scheduler: "DagScheduler", parent: Task):
+        self.scheduler = scheduler
+        self.parent = parent
+        self.children: Dict[str, Task] = {}
+        self._waiting: Set[str] = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._sealed = False
+        self._done = asyncio.Event()
+
+    def add(self, child: Task):
+        if child.id in self.children or self._done.is_set():
+            return
+        self.children[child.id] = child
+        # A resumed run keeps the results of subtasks that already finished
+        if child.status not in TERMINAL_STATUSES:
+            self._waiting.add(child.id)
+        self._schedule()
+
+    def seal(self):
+        """Declare that no more subtasks will be added"""
+        self._sealed = True
+        self._schedule()
+
+    async def wait(self):
+        await self._done.wait()
+
+    def cancel(self):
+        for running in self._running.values():
+            running.cancel()
+        for child_id in list(self._waiting) + list(self._running):
+            self.scheduler.memory.update_task_status(child_id, "cancelled")
+        self._waiting.clear()
+        self._running.clear()
+        if not self._done.is_set():
+            self.scheduler.memory.update_task_status(self.parent.id, "cancelled")
+            self._done.set()
+
+    def _dependency_state(self, child: Task) -> str:
+        state = "ready"
+        for dep_id in child.metadata.get("depends_on", []):
+            dep = self.children.get(dep_id)
+            if dep is None:
+                if self._sealed:
+                    return "blocked"
+                state = "waiting"
+            elif dep.status == "completed" and dep_id not in self._running:
+                continue
+            elif dep.status in TERMINAL_STATUSES and dep_id not in self._running:
+                return "blocked"
+            else:
+                state = "waiting"
+        return state
+
+    def _schedule(self):
+        if self._done.is_set():
+            return
+        changed = True
+        while changed:
+            changed = False
+            for child_id in list(self._waiting):
+                state = self._dependency_state(self.children[child_id])
+                if state == "ready":
+                    self._waiting.discard(child_id)
+                    self._running[child_id] = asyncio.create_task(self._execute(child_id))
+                elif state == "blocked":
+                    self._waiting.discard(child_id)
+                    self.scheduler.memory.update_task_status(child_id, "cancelled")
+                    changed = True
+
+        if self._sealed and not self._running:
+            # Anything still waiting now is part of a dependency cycle
+            for child_id in self._waiting:
+                self.scheduler.memory.update_task_status(child_id, "cancelled")
+            self._waiting.clear()
+            self._finish()
+
+    async def _execute(self, child_id: str):
+        try:
+            await self.scheduler.execute(self.children[child_id])
+        finally:
+            self._running.pop(child_id, None)
+            self._schedule()
+
+    def _finish(self):
+        succeeded = all(child.status == "completed" for child in self.children.values())
+        self.scheduler.memory.update_task_status(
+            self.parent.id, "completed" if succeeded else "failed"
+        )
+        self._done.set()
+
+class DagScheduler:
+    """Runs subtasks concurrently, up to SUBTASK_CONCURRENCY at once.
+
+    Agents may `open` a parent's run and add subtasks while the parent is
+    still being handled; the run is sealed once the handler returns.
+    """
+
+    def __init__(
+        self,
+        memory: SharedMemory,
+        execute: Callable[[Task], Awaitable[None]],
+        limit: int = None
+    ):
+        self.memory = memory
+        self._execute = execute
+        self.limit = limit or settings.SUBTASK_CONCURRENCY
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._runs: Dict[str, DagRun] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def open(self, parent: Task) -> DagRun:
+        """Return the run for a parent, creating it if needed"""
+        if parent.id not in self._runs:
+            self._runs[parent.id] = DagRun(self, parent)
+        return self._runs[parent.id]
+
+    def discard(self, parent: Task):
+        """Cancel subtasks started while `parent` ran, if it failed before finishing"""
+        run = self._runs.pop(parent.id, None)
+        if run is not None:
+            run.cancel()
+    
+    async def execute(self, task: Task):
+        """Run a task's handler, then its own subtasks if it created any"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        # Only the handler holds a slot, so nested runs can't starve each other
+        async with self._semaphore:
+            await self._execute(task)
+        if task.subtasks and task.status not in TERMINAL_STATUSES:
+            await self.run_children(task)
+
+    async def run_children(self, parent: Task):
+        run = self.open(parent)
+        for child_id in list(parent.subtasks):
+            child = self.memory.get_task(child_id)
+            if child is None:
+                self.memory.add_error({
+                    "task_id": parent.id,
+                    "error": f"Subtask {child_id} not found",
+                    "type": "scheduler_error"
+                })
+                continue
+            run.add(child)
+        run.seal()
+        try:
+            await run.wait()
+        except asyncio.CancelledError:
+            run.cancel()
+            raise
+        finally:
+            self._runs.pop(parent.id, None)
+
+    def spawn(self, parent: Task, on_done: Callable[[], None] = None):
+        """Run a parent's subtasks in the background, then call `on_done`"""
+        background = asyncio.create_task(self.run_children(parent))
+        self._background.add(background)
+        background.add_done_callback(self._background.discard)
+        if on_done is not None:
+            background.add_done_callback(lambda _: on_done())
+
+    async def stop(self):
+        for background in list(self._background):
+            background.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        # Runs whose parents were still being handled
+        for run in list(self._runs.values()):
+            run.cancel()
+        self._runs.clear()
@@ -0,0 +1,353 @@
+import json
+import sqlite3
+import time
+import weakref
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+
+INDEXED_FIELDS = ("status", "type", "parent_task_id")
+
+class TaskStore:
+    """Storage backend interface for SharedMemory.
+
+    Stores are indexed by status, type and parent_task_id so filtered lookups
+    don't scan every task.
+    """
+
+    def put(self, task: BaseModel):
+        raise NotImplementedError
+
+    def put_many(self, tasks: Iterable[BaseModel]):
+        for task in tasks:
+            self.put(task)
+
+    def get(self, task_id: str) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    def get_many(self, task_ids: List[str]) -> Dict[str, BaseModel]:
+        """Return the tasks that exist among `task_ids`, keyed by id"""
+        tasks = {}
+        for task_id in task_ids:
+            task = self.get(task_id)
+            if task is not None:
+                tasks[task_id] = task
+        return tasks
+
+    def update_status(self, task_id: str, status: str):
+        raise NotImplementedError
+
+    def append_metadata(self, task_id: str, key: str, value):
+        """Append `value` to the list at `metadata[key]` without rewriting the rest of the task"""
+        task = self.get(task_id)
+        if task is not None:
+            task.metadata.setdefault(key, []).append(value)
+            self.put(task)
+
+    def get_status(self, task_id: str) -> Optional[str]:
+        """Current status, as written by any process sharing the store"""
+        task = self.get(task_id)
+        return task.status if task is not None else None
+
+    def find(self, limit: int = None, **filters) -> List[BaseModel]:
+        """Return up to `limit` tasks whose indexed fields equal every given filter"""
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+class InMemoryTaskStore(TaskStore):
+    """Dict-backed store with in-process secondary indexes"""
+
+    def __init__(self):
+        self._tasks: Dict[str, BaseModel] = {}
+        self._indexes: Dict[str, Dict[Optional[str], Set[str]]] = {
+            field: defaultdict(set) for field in INDEXED_FIELDS
+        }
+        self._indexed: Dict[str, Tuple] = {}
+
+    def put(self, task: BaseModel):
+        self._tasks[task.id] = task
+        self._reindex(task)
+
+    def get(self, task_id: str) -> Optional[BaseModel]:
+        return self._tasks.get(task_id)
+
+    def update_status(self, task_id: str, status: str):
+        task = self._tasks.get(task_id)
+        if task is not None:
+            task.status = status
+            self._reindex(task)
+
+    def find(self, limit: int = None, **filters) -> List[BaseModel]:
+        if not filters:
+            return list(islice(self._tasks.values(), limit))
+        candidates = sorted(
+            (self._indexes[field].get(value, set()) for field, value in filters.items()),
+            key=len
+        )
+        ids = candidates[0].intersection(*candidates[1:])
+        return [self._tasks[task_id] for task_id in islice(ids, limit)]
+
+    def _reindex(self, task: BaseModel):
+        values = tuple(getattr(task, field) for field in INDEXED_FIELDS)
+        previous = self._indexed.get(task.id)
+        if previous == values:
+            return
+        if previous is not None:
+            for field, value in zip(INDEXED_FIELDS, previous):
+                self._indexes[field][value].discard(task.id)
+        for field, value in zip(INDEXED_FIELDS, values):
+            self._indexes[field][value].add(task.id)
+        self._indexed[task.id] = values
+
+class SQLiteTaskStore(TaskStore):
+    """SQLite store in WAL mode with batched writes.
+
+    Writes are buffered and committed in one transaction once `batch_size`
+    changes are pending or `flush_interval` seconds have passed. Reads see
+    buffered writes, and tasks currently held by the process are returned as
+    the same object so in-place updates by agents are not lost.
+
+    Each row has a version, and writing a whole task succeeds only if the
+    row is still at the version this process last read or wrote. When
+    another process got there first, the stale write is dropped and the
+    held task is reloaded, so it can't revert e.g. a completed status.
+    `append_metadata` edits one list in place and never conflicts, though a
+    later whole-task write from a copy that missed it replaces the list.
+    """
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        path: str = None,
+        batch_size: int = None,
+        flush_interval: float = None
+    ):
+        self.model = model
+        self.batch_size = batch_size or settings.MEMORY_BATCH_SIZE
+        self.flush_interval = (
+            settings.MEMORY_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self._db = sqlite3.connect(
+            path or settings.MEMORY_DB_PATH, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id TEXT PRIMARY KEY, type TEXT NOT NULL, status TEXT NOT NULL, "
+            "parent_task_id TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "version INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(tasks)")}
+        if "version" not in columns:
+            # Databases created before rows were versioned
+            self._db.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, type)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_type ON tasks (type)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_parent ON tasks (parent_task_id)")
+        self._live = weakref.WeakValueDictionary()
+        self._pending: Dict[str, BaseModel] = {}
+        self._pending_status: Dict[str, str] = {}
+        self._pending_appends: List[Tuple[str, str, str]] = []
+        # Version of each held task's row as this process last read or wrote it
+        self._versions: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+
+    def put(self, task: BaseModel):
+        self._live[task.id] = task
+        self._pending[task.id] = task
+        self._pending_status.pop(task.id, None)
+        self._maybe_flush()
+
+    def put_many(self, tasks: Iterable[BaseModel]):
+        for task in tasks:
+            self._live[task.id] = task
+            self._pending[task.id] = task
+            self._pending_status.pop(task.id, None)
+        self._maybe_flush()
+
+    def get(self, task_id: str) -> Optional[BaseModel]:
+        task = self._pending.get(task_id) or self._live.get(task_id)
+        if task is not None:
+            return task
+        row = self._db.execute(
+            "SELECT data, status, version FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        return self._load(task_id, *row) if row else None
+
+    def get_many(self, task_ids: List[str]) -> Dict[str, BaseModel]:
+        tasks = {}
+        missing = []
+        for task_id in task_ids:
+            task = self._pending.get(task_id) or self._live.get(task_id)
+            if task is not None:
+                tasks[task_id] = task
+            else:
+                missing.append(task_id)
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT id, data, status, version FROM tasks WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for task_id, data, status, version in rows:
+                tasks[task_id] = self._load(task_id, data, status, version)
+        return tasks
+
+    def update_status(self, task_id: str, status: str):
+        task = self._pending.get(task_id) or self._live.get(task_id)
+        if task is not None:
+            task.status = status
+            self._pending[task_id] = task
+        else:
+            self._pending_status[task_id] = status
+        self._maybe_flush()
+
+    def append_metadata(self, task_id: str, key: str, value):
+        task = self._pending.get(task_id) or self._live.get(task_id)
+        if task is not None:
+            task.metadata.setdefault(key, []).append(value)
+            if task_id in self._pending:
+                # Goes out with the pending write of the whole task
+                return
+        self._pending_appends.append((task_id, f"$.metadata.{key}", json.dumps(value)))
+        self._maybe_flush()
+
+    def get_status(self, task_id: str) -> Optional[str]:
+        # Unlike get, skip the identity map: another process may have moved the task on
+        task = self._pending.get(task_id)
+        if task is not None:
+            return task.status
+        if task_id in self._pending_status:
+            return self._pending_status[task_id]
+        row = self._db.execute("SELECT status FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def find(self, limit: int = None, **filters) -> List[BaseModel]:
+        self.flush()
+        query = "SELECT id, data, status, version FROM tasks"
+        params = []
+        if filters:
+            clauses = []
+            for field, value in filters.items():
+                if field not in INDEXED_FIELDS:
+                    raise ValueError(f"Cannot filter tasks by {field}")
+                if value is None:
+                    clauses.append(f"{field} IS NULL")
+                else:
+                    clauses.append(f"{field} = ?")
+                    params.append(value)
+            query += " WHERE " + " AND ".join(clauses)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [
+            self._live.get(task_id) or self._load(task_id, data, status, version)
+            for task_id, data, status, version in self._db.execute(query, params)
+        ]
+
+    def flush(self):
+        if not self._pending and not self._pending_status and not self._pending_appends:
+            return
+        now = time.time()
+        statuses = [(status, now, task_id) for task_id, status in self._pending_status.items()]
+        appends = [(path, path, value, now, task_id) for task_id, path, value in self._pending_appends]
+        written = {}
+        stale = []
+        self._db.execute("BEGIN")
+        try:
+            for task in self._pending.values():
+                row = (task.type, task.status, task.parent_task_id, task.model_dump_json(), now)
+                version = self._versions.get(task.id)
+                if version is None:
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO tasks "
+                        "(type, status, parent_task_id, data, updated_at, id, version) "
+                        "VALUES (?, ?, ?, ?, ?, ?, 1)",
+                        row + (task.id,)
+                    )
+                else:
+                    cursor = self._db.execute(
+                        "UPDATE tasks SET type = ?, status = ?, parent_task_id = ?, data = ?, "
+                        "updated_at = ?, version = version + 1 WHERE id = ? AND version = ?",
+                        row + (task.id, version)
+                    )
+                if cursor.rowcount:
+                    written[task.id] = (version or 0) + 1
+                else:
+                    stale.append(task)
+            self._db.executemany(
+                "UPDATE tasks SET status = ?, updated_at = ?, version = version + 1 WHERE id = ?",
+                statuses
+            )
+            self._db.executemany(
+                "UPDATE tasks SET data = json_set(data, ?, json_insert("
+                "COALESCE(json_extract(data, ?), json('[]')), '$[#]', json(?))), updated_at = ? "
+                "WHERE id = ?",
+                appends
+            )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        self._versions.update(written)
+        for task in stale:
+            self._reload(task)
+        self._pending.clear()
+        self._pending_status.clear()
+        self._pending_appends.clear()
+        # Forget versions of tasks nobody holds any more
+        for task_id in [task_id for task_id in self._versions if task_id not in self._live]:
+            del self._versions[task_id]
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def _load(self, task_id: str, data: str, status: str, version: int) -> BaseModel:
+        task = self.model.model_validate_json(data)
+        # The status column is authoritative; status-only updates skip `data`
+        task.status = self._pending_status.get(task_id, status)
+        self._live[task_id] = task
+        self._versions[task_id] = version
+        return task
+
+    def _reload(self, task: BaseModel):
+        """Replace a held task's fields with the row another process wrote"""
+        row = self._db.execute(
+            "SELECT data, status, version FROM tasks WHERE id = ?", (task.id,)
+        ).fetchone()
+        print(f"Error saving task {task.id}: it was changed by another process")
+        if row is None:
+            return
+        current = self.model.model_validate_json(row[0])
+        current.status = row[1]
+        for field in self.model.model_fields:
+            setattr(task, field, getattr(current, field))
+        self._versions[task.id] = row[2]
+
+    def _maybe_flush(self):
+        pending = len(self._pending) + len(self._pending_status) + len(self._pending_appends)
+        if (pending >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+def create_task_store(model: Type[BaseModel], backend: str = None) -> TaskStore:
+    """Build the task store selected by MEMORY_BACKEND"""
+    backend = backend or settings.MEMORY_BACKEND
+    if backend == "memory":
+        return InMemoryTaskStore()
+    if backend == "sqlite":
+        return SQLiteTaskStore(model)
+    raise ValueError(f"Unknown memory backend: {backend}")
@@ -0,0 +1,94 @@
+import json
+from typing import Any, List, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+T = TypeVar("T", bound=BaseModel)
+
+class JsonArrayParser:
+    """Incremental parser for a JSON array arriving in arbitrary text chunks.
+
+    `feed` returns each top-level element as soon as it is complete: objects
+    and arrays the moment their closing bracket arrives, scalars at the next
+    comma. Elements come paired with their position in the array, so
+    references between elements survive skipped ones. Text before the
+    opening bracket (prose, a ```json fence) and after the closing one is
+    ignored. Elements that aren't valid JSON are skipped and counted in
+    `errors`.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget everything fed so far, e.g. before a retried response"""
+        self.started = False
+        self.done = False
+        self.errors = 0
+        self.count = 0  # Elements seen, valid or not
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[int, Any]]:
+        elements = []
+        for char in text:
+            if self.done:
+                break
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                    self._depth = 1
+                continue
+            if self._in_string:
+                self._element.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+                self._element.append(char)
+            elif char in "[{":
+                self._depth += 1
+                self._element.append(char)
+            elif char in "]}":
+                if self._depth == 1:
+                    self._emit(elements)
+                    self.done = True
+                    continue
+                self._depth -= 1
+                self._element.append(char)
+                if self._depth == 1:
+                    self._emit(elements)
+            elif char == "," and self._depth == 1:
+                self._emit(elements)
+            elif self._depth > 1 or not char.isspace():
+                self._element.append(char)
+        return elements
+
+    def _emit(self, elements: List[Tuple[int, Any]]):
+        text = "".join(self._element).strip()
+        self._element = []
+        if not text:
+            return
+        index = self.count
+        self.count += 1
+        try:
+            elements.append((index, json.loads(text)))
+        except ValueError:
+            self.errors += 1
+
+def validate_items(items: List[Tuple[int, Any]], model: Type[T]) -> List[Tuple[int, T]]:
+    """Validate (index, element) pairs into `model`, dropping those that don't fit"""
+    valid = []
+    for index, item in items:
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            print(f"Error validating structured output: {str(e)}")
+    return valid
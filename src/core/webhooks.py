@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from src.core.config import settings
+from src.core.events import TERMINAL_STATUSES
+from src.core.memory import SharedMemory, Task
+
+class WebhookIngestor:
+    """Turns webhook deliveries into review tasks without doing work inline.
+
+    Deliveries are dropped if their id was already seen within
+    WEBHOOK_DEDUPE_TTL. The rest are grouped by a fingerprint (for failures, a
+    hash of the normalized error), and everything arriving within
+    WEBHOOK_DEBOUNCE_WINDOW of the first event of a group becomes a single
+    review task. Events whose fingerprint already has an unfinished task are
+    attached to that task instead of starting a new one.
+    """
+
+    def __init__(self, memory: SharedMemory, submit: Callable[[Task], None], window: float = None):
+        self.memory = memory
+        self.submit = submit
+        self.window = settings.WEBHOOK_DEBOUNCE_WINDOW if window is None else window
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._pending: Dict[str, Dict] = {}
+        self._active: Dict[str, str] = {}
+
+    def ingest(
+        self,
+        delivery_id: Optional[str],
+        fingerprint: str,
+        event: Dict,
+        attach_to_active: bool = True
+    ) -> str:
+        """Accept one delivery.
+
+        `event` carries the "id", "description", "error" and "metadata" used
+        for the review task. With `attach_to_active` False an unfinished task
+        for the fingerprint doesn't absorb the event, so newer state (e.g. a
+        new pull request head) is still reviewed. Returns "duplicate",
+        "coalesced" or "accepted".
+        """
+        if delivery_id is not None:
+            if self._is_duplicate(delivery_id):
+                return "duplicate"
+            event.setdefault("metadata", {})["delivery_id"] = delivery_id
+
+        task = self._active_task(fingerprint) if attach_to_active else None
+        if task is not None:
+            self.memory.append_task_metadata(task.id, "deliveries", delivery_id)
+            return "coalesced"
+
+        bucket = self._pending.get(fingerprint)
+        if bucket is not None:
+            bucket["events"].append(event)
+            return "coalesced"
+
+        loop = asyncio.get_running_loop()
+        self._pending[fingerprint] = {
+            "events": [event],
+            "timer": loop.call_later(self.window, self._flush, fingerprint)
+        }
+        return "accepted"
+
+    def close(self):
+        """Store groups still in their debounce window as deferred tasks.
+
+        Their deliveries were already acknowledged, so they must not be lost;
+        `resume` submits them once the next process starts.
+        """
+        for fingerprint, bucket in list(self._pending.items()):
+            bucket["timer"].cancel()
+            task = self._build_task(fingerprint, bucket["events"])
+            task.metadata["deferred"] = True
+            self.memory.add_task(task)
+        self._pending.clear()
+
+    def resume(self):
+        """Submit tasks deferred by an earlier process's shutdown"""
+        for task in self.memory.find_tasks(status="pending", type="review"):
+            if not task.metadata.pop("deferred", False):
+                continue
+            self.memory.save_task(task)
+            self._submit(task.metadata["error_fingerprint"], task)
+
+    def _is_duplicate(self, delivery_id: str) -> bool:
+        now = time.monotonic()
+        while self._seen:
+            oldest, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < settings.WEBHOOK_DEDUPE_TTL and len(self._seen) <= settings.WEBHOOK_DEDUPE_SIZE:
+                break
+            del self._seen[oldest]
+        if delivery_id in self._seen:
+            return True
+        self._seen[delivery_id] = now
+        return False
+
+    def _active_task(self, fingerprint: str) -> Optional[Task]:
+        task_id = self._active.get(fingerprint)
+        if task_id is None:
+            return None
+        task = self.memory.get_task(task_id)
+        # The status may have been moved on by the process running the task
+        if task is None or self.memory.get_task_status(task_id) in TERMINAL_STATUSES:
+            del self._active[fingerprint]
+            return None
+        return task
+
+    def _flush(self, fingerprint: str):
+        events: List[Dict] = self._pending.pop(fingerprint)["events"]
+        task = self._build_task(fingerprint, events)
+        self.memory.add_task(task)
+        self._submit(fingerprint, task)
+
+    def _build_task(self, fingerprint: str, events: List[Dict]) -> Task:
+        latest = events[-1]
+        errors = list(dict.fromkeys(e["error"] for e in events if e.get("error")))
+        task_id = latest["id"]
+        if self.memory.get_task(task_id) is not None:
+            task_id = f"{task_id}_{int(time.time() * 1000)}"
+
+        return Task(
+            id=task_id,
+            type="review",
+            description=latest["description"],
+            context=[{"error_message": error} for error in errors],
+            metadata={
+                **latest.get("metadata", {}),
+                "error_fingerprint": fingerprint,
+                "deliveries": [e.get("metadata", {}).get("delivery_id") for e in events]
+            }
+        )
+
+    def _submit(self, fingerprint: str, task: Task):
+        try:
+            self.submit(task)
+        except Exception as e:
+            self.memory.add_error({"task_id": task.id, "error": str(e), "type": "webhook_error"})
+            self.memory.update_task_status(task.id, "failed")
+            return
+        self._active[fingerprint] = task.id
+        if len(self._active) > settings.WEBHOOK_DEDUPE_SIZE:
+            for stale in [fp for fp in self._active if self._active_task(fp) is None]:
+                self._active.pop(stale, None)
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from src.core.config import settings
+
+class QueueFullError(Exception):
+    """Raised when an agent's queue has no room for another task"""
+
+@dataclass
+class Claim:
+    task_id: str
+    waited: float  # Seconds between enqueue and claim
+    attempts: int = 1
+
+class WorkQueue:
+    """Transport for queued task ids, one queue per agent.
+
+    Workers `claim` the next task id for their agent and mark it `done` once
+    handled. Shared implementations let any process claim work submitted by
+    any other.
+    """
+
+    shared = False
+
+    def start(self):
+        pass
+
+    def put(self, agent: str, task_id: str):
+        """Enqueue without waiting; raises QueueFullError on backpressure"""
+        raise NotImplementedError
+
+    async def claim(self, agent: str) -> Claim:
+        """Wait for the next task id queued for `agent`"""
+        raise NotImplementedError
+
+    def done(self, agent: str, claim: Claim):
+        raise NotImplementedError
+
+    def depth(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class LocalWorkQueue(WorkQueue):
+    """Bounded asyncio queues; work stays in this process"""
+
+    def __init__(self, agents: List[str], maxsize: int = None):
+        self.maxsize = maxsize or settings.TASK_QUEUE_SIZE
+        self._agents = agents
+        self._queues: Dict[str, asyncio.Queue] = {}
+
+    def start(self):
+        # Queues are created here so they bind to the running event loop
+        self._queues = {agent: asyncio.Queue(maxsize=self.maxsize) for agent in self._agents}
+
+    def put(self, agent: str, task_id: str):
+        try:
+            self._queues[agent].put_nowait((task_id, time.monotonic()))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Queue for {agent} is full")
+
+    async def claim(self, agent: str) -> Claim:
+        task_id, enqueued_at = await self._queues[agent].get()
+        return Claim(task_id, time.monotonic() - enqueued_at)
+
+    def done(self, agent: str, claim: Claim):
+        self._queues[agent].task_done()
+
+    def depth(self) -> Dict[str, int]:
+        return {agent: queue.qsize() for agent, queue in self._queues.items()}
+
+    async def close(self):
+        self._queues = {}
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work-claiming queue in a SQLite table shared by every process using the file.
+
+    A claim takes the oldest unowned row for the agent and sets a lease of
+    TASK_LEASE_SECONDS. While the task runs, a heartbeat renews the leases
+    of everything this process holds. If a worker dies, its lease expires
+    and any process can claim the task again. `attempts` counts claims so
+    the caller can give up on tasks that keep killing workers. Idle workers
+    poll every TASK_POLL_INTERVAL, and local submissions wake them at once.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = None, maxsize: int = None, lease: float = None):
+        self.maxsize = maxsize or settings.TASK_QUEUE_SIZE
+        self.lease = lease or settings.TASK_LEASE_SECONDS
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._db = sqlite3.connect(
+            path or settings.MEMORY_DB_PATH, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS work ("
+            "task_id TEXT PRIMARY KEY, agent TEXT NOT NULL, enqueued_at REAL NOT NULL, "
+            "owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS work_agent ON work (agent, enqueued_at)")
+        self._held: Set[str] = set()
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._renew_leases())
+
+    def put(self, agent: str, task_id: str):
+        (queued,) = self._db.execute(
+            "SELECT COUNT(*) FROM work WHERE agent = ? AND owner IS NULL", (agent,)
+        ).fetchone()
+        if queued >= self.maxsize:
+            raise QueueFullError(f"Queue for {agent} is full")
+        self._db.execute(
+            "INSERT OR REPLACE INTO work (task_id, agent, enqueued_at) VALUES (?, ?, ?)",
+            (task_id, agent, time.time())
+        )
+        self._wakeup(agent).set()
+
+    async def claim(self, agent: str) -> Claim:
+        while True:
+            claim = self._try_claim(agent)
+            if claim is not None:
+                return claim
+            wakeup = self._wakeup(agent)
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=settings.TASK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def done(self, agent: str, claim: Claim):
+        self._held.discard(claim.task_id)
+        self._db.execute(
+            "DELETE FROM work WHERE task_id = ? AND owner = ?", (claim.task_id, self.owner)
+        )
+
+    def depth(self) -> Dict[str, int]:
+        return dict(self._db.execute(
+            "SELECT agent, COUNT(*) FROM work WHERE owner IS NULL GROUP BY agent"
+        ).fetchall())
+
+    async def close(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+        # Hand unfinished work back instead of waiting for the leases to expire
+        self._db.executemany(
+            "UPDATE work SET owner = NULL, lease_expires = NULL, attempts = attempts - 1 "
+            "WHERE task_id = ? AND owner = ?",
+            [(task_id, self.owner) for task_id in self._held]
+        )
+        self._held.clear()
+        self._db.close()
+
+    def _wakeup(self, agent: str) -> asyncio.Event:
+        if agent not in self._wakeups:
+            self._wakeups[agent] = asyncio.Event()
+        return self._wakeups[agent]
+
+    def _try_claim(self, agent: str) -> Optional[Claim]:
+        query = (
+            "SELECT task_id, enqueued_at, attempts FROM work "
+            "WHERE agent = ? AND (owner IS NULL OR lease_expires < ?) "
+            "ORDER BY enqueued_at LIMIT 1"
+        )
+        now = time.time()
+        # Idle polls only read, so they don't contend for the write lock
+        if self._db.execute(query, (agent, now)).fetchone() is None:
+            return None
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(query, (agent, now)).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE work SET owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE task_id = ?",
+                    (self.owner, now + self.lease, row[0])
+                )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        task_id, enqueued_at, attempts = row
+        self._held.add(task_id)
+        return Claim(task_id, max(now - enqueued_at, 0.0), attempts + 1)
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(settings.TASK_HEARTBEAT_INTERVAL)
+            try:
+                self._db.executemany(
+                    "UPDATE work SET lease_expires = ? WHERE task_id = ? AND owner = ?",
+                    [(time.time() + self.lease, task_id, self.owner) for task_id in self._held]
+                )
+            except sqlite3.Error as e:
+                print(f"Error renewing task leases: {str(e)}")
+
+def create_work_queue(agents: List[str], backend: str = None) -> WorkQueue:
+    """Build the work queue selected by TASK_QUEUE_BACKEND"""
+    backend = backend or settings.TASK_QUEUE_BACKEND
+    if backend == "memory":
+        return LocalWorkQueue(agents)
+    if backend == "sqlite":
+        if settings.MEMORY_BACKEND != "sqlite":
+            raise ValueError("TASK_QUEUE_BACKEND=sqlite needs MEMORY_BACKEND=sqlite to share tasks")
+        return SQLiteWorkQueue()
+    raise ValueError(f"Unknown task queue backend: {backend}")
@@ -1,6 +1,140 @@
-from typing import List
+import asyncio
+import base64
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
 import httpx
 from src.core.config import settings
+from src.core.metrics import InstrumentedTransport
+
+COMPARE_MAX_FILES = 300  # The compare API lists at most this many changed files
+
+@dataclass
+class CachedFile:
+    sha: str
+    content: str
+    etag: Optional[str]
+    checked_at: float
+
+class FileCache:
+    """LRU cache of file contents keyed by (path, ref), bounded by total bytes"""
+    
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes or settings.GITHUB_FILE_CACHE_BYTES
+        self._entries: "OrderedDict[Tuple[str, str], CachedFile]" = OrderedDict()
+        self._by_sha: Dict[str, Tuple[str, str]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple[str, str]) -> Optional[CachedFile]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def content_for_sha(self, sha: str) -> Optional[str]:
+        key = self._by_sha.get(sha)
+        entry = self._entries.get(key) if key else None
+        return entry.content if entry is not None and entry.sha == sha else None
+    
+    def put(self, key: Tuple[str, str], sha: str, content: str, etag: str = None):
+        if len(content) > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = CachedFile(sha, content, etag, time.monotonic())
+        self._by_sha[sha] = key
+        self._bytes += len(content)
+        while self._bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+    
+    def invalidate(self, key: Tuple[str, str]):
+        self._discard(key)
+    
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }
+    
+    def _discard(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry.content)
+        if self._by_sha.get(entry.sha) == key:
+            del self._by_sha[entry.sha]
+
+class CommitBatcher:
+    """Coalesces file changes submitted within a short window into one commit"""
+    
+    def __init__(self, push: Callable[[Dict[str, str], str], Awaitable[bool]], window: float = None):
+        self._push = push
+        self.window = settings.GITHUB_COMMIT_WINDOW if window is None else window
+        self._changes: Dict[str, str] = {}
+        self._messages: List[str] = []
+        self._waiters: List[asyncio.Future] = []
+        self._in_flight: List[Dict[str, str]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+    
+    async def submit(self, changes: Dict[str, str], message: str) -> bool:
+        """Add changes to the pending commit and wait until it is pushed"""
+        self._changes.update(changes)
+        if message not in self._messages:
+            self._messages.append(message)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await waiter
+    
+    def pending(self, path: str) -> Optional[str]:
+        """Content submitted for `path` that may not have reached the branch yet"""
+        if path in self._changes:
+            return self._changes[path]
+        for changes in reversed(self._in_flight):
+            if path in changes:
+                return changes[path]
+        return None
+    
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        changes, messages, waiters = self._changes, self._messages, self._waiters
+        self._changes, self._messages, self._waiters = {}, [], []
+        self._flush_task = None
+        self._in_flight.append(changes)
+        
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Commits from this process are serialized so they never race each other
+        async with self._lock:
+            try:
+                success = await self._push(changes, self._combine(messages))
+            except Exception as e:
+                print(f"Error pushing to GitHub: {str(e)}")
+                success = False
+            finally:
+                self._in_flight.remove(changes)
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(success)
+    
+    async def close(self):
+        """Push whatever is still waiting for the commit window"""
+        if self._flush_task is not None:
+            await self._flush_task
+    
+    @staticmethod
+    def _combine(messages: List[str]) -> str:
+        if len(messages) == 1:
+            return messages[0]
+        return f"chore: apply {len(messages)} changes\n\n" + "\n".join(f"- {m}" for m in messages)
 
 class GitHubClient:
     def __init__(self):
@@ -9,91 +143,267 @@ class GitHubClient:
             "Authorization": f"Bearer {settings.GITHUB_TOKEN}",
             "Accept": "application/vnd.github.v3+json"
         }
-        self.client = httpx.AsyncClient(headers=self.headers)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            transport=InstrumentedTransport("github", _operation)
+        )
+        self.repo_url = f"{self.base_url}/repos/{settings.REPO_OWNER}/{settings.REPO_NAME}"
+        self._batcher = CommitBatcher(self._push_commit)
+        self.file_cache = FileCache()
     
-    async def commit_and_push(self, files: List[str], message: str) -> bool:
-        """Commit and push changes to GitHub"""
-        try:
-            # Get current commit SHA
-            response = await self.client.get(
-                f"{self.base_url}/repos/{settings.REPO_OWNER}/{settings.REPO_NAME}/git/ref/heads/{settings.MAIN_BRANCH}"
-            )
-            response.raise_for_status()
-            current_sha = response.json()["object"]["sha"]
-            
-            # Create tree with modified files
-            tree_items = []
+    async def commit_and_push(self, files: Union[List[str], Dict[str, str]], message: str) -> bool:
+        """Commit and push changes to GitHub.
+
+        `files` is either a list of local paths or a mapping of repository path
+        to new content. Changes submitted within GITHUB_COMMIT_WINDOW seconds of
+        each other are pushed together as a single commit.
+        """
+        if isinstance(files, dict):
+            changes = dict(files)
+        else:
+            changes = {}
             for file_path in files:
                 with open(file_path, "r") as f:
-                    content = f.read()
-                
-                # Create blob
-                blob_data = {
-                    "content": content,
-                    "encoding": "utf-8"
-                }
-                blob_response = await self.client.post(
-                    f"{self.base_url}/repos/{settings.REPO_OWNER}/{settings.REPO_NAME}/git/blobs",
-                    json=blob_data
-                )
-                blob_response.raise_for_status()
-                
-                tree_items.append({
-                    "path": file_path,
-                    "mode": "100644",
-                    "type": "blob",
-                    "sha": blob_response.json()["sha"]
-                })
+                    changes[file_path] = f.read()
+        return await self._batcher.submit(changes, message)
+    
+    async def _push_commit(self, changes: Dict[str, str], message: str) -> bool:
+        """Create one tree and commit for all changes and fast-forward the branch"""
+        try:
+            # Blobs don't depend on the branch head, so upload them once, in parallel
+            limit = asyncio.Semaphore(settings.GITHUB_MAX_CONCURRENCY)
             
-            # Create tree
-            tree_data = {
-                "base_tree": current_sha,
-                "tree": tree_items
-            }
-            tree_response = await self.client.post(
-                f"{self.base_url}/repos/{settings.REPO_OWNER}/{settings.REPO_NAME}/git/trees",
-                json=tree_data
-            )
-            tree_response.raise_for_status()
+            async def create_blob(content: str) -> str:
+                async with limit:
+                    blob_response = await self.client.post(
+                        f"{self.repo_url}/git/blobs",
+                        json={"content": content, "encoding": "utf-8"}
+                    )
+                blob_response.raise_for_status()
+                return blob_response.json()["sha"]
             
-            # Create commit
-            commit_data = {
-                "message": message,
-                "tree": tree_response.json()["sha"],
-                "parents": [current_sha]
-            }
-            commit_response = await self.client.post(
-                f"{self.base_url}/repos/{settings.REPO_OWNER}/{settings.REPO_NAME}/git/commits",
-                json=commit_data
-            )
-            commit_response.raise_for_status()
+            paths = list(changes)
+            blob_shas = await asyncio.gather(*(create_blob(changes[path]) for path in paths))
+            tree_items = [
+                {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+                for path, sha in zip(paths, blob_shas)
+            ]
             
-            # Update reference
-            ref_data = {
-                "sha": commit_response.json()["sha"],
-                "force": True
-            }
-            ref_response = await self.client.patch(
-                f"{self.base_url}/repos/{settings.REPO_OWNER}/{settings.REPO_NAME}/git/refs/heads/{settings.MAIN_BRANCH}",
-                json=ref_data
-            )
-            ref_response.raise_for_status()
+            current_sha = await self._head_sha()
+            for attempt in range(settings.MAX_RETRIES + 1):
+                # Create tree
+                tree_response = await self.client.post(
+                    f"{self.repo_url}/git/trees",
+                    json={"base_tree": current_sha, "tree": tree_items}
+                )
+                tree_response.raise_for_status()
+                
+                # Create commit
+                commit_response = await self.client.post(
+                    f"{self.repo_url}/git/commits",
+                    json={
+                        "message": message,
+                        "tree": tree_response.json()["sha"],
+                        "parents": [current_sha]
+                    }
+                )
+                commit_response.raise_for_status()
+                
+                # Fast-forward only; 422 means the branch moved since we read it
+                ref_response = await self.client.patch(
+                    f"{self.repo_url}/git/refs/heads/{settings.MAIN_BRANCH}",
+                    json={"sha": commit_response.json()["sha"], "force": False}
+                )
+                if ref_response.status_code != 422:
+                    ref_response.raise_for_status()
+                    # Later reads in this process see the pushed content without a round trip
+                    for path, sha in zip(paths, blob_shas):
+                        self.file_cache.put((path, ""), sha, changes[path])
+                    return True
+                
+                # The blobs were edited from the old head's content, so they can
+                # only move onto the new head if the new commits left them alone
+                new_sha = await self._head_sha()
+                if await self._paths_changed(current_sha, new_sha, paths):
+                    for path in paths:
+                        self.file_cache.invalidate((path, ""))
+                    print(f"Error pushing to GitHub: {settings.MAIN_BRANCH} changed the same files meanwhile")
+                    return False
+                current_sha = new_sha
             
-            return True
+            print(f"Error pushing to GitHub: {settings.MAIN_BRANCH} kept moving, gave up")
+            return False
         except Exception as e:
             print(f"Error pushing to GitHub: {str(e)}")
             return False
     
+    async def _head_sha(self) -> str:
+        response = await self.client.get(f"{self.repo_url}/git/ref/heads/{settings.MAIN_BRANCH}")
+        response.raise_for_status()
+        return response.json()["object"]["sha"]
+    
+    async def _paths_changed(self, base: str, head: str, paths: List[str]) -> bool:
+        """Whether any of `paths` changed between two commits"""
+        response = await self.client.get(f"{self.repo_url}/compare/{base}...{head}")
+        response.raise_for_status()
+        files = response.json().get("files", [])
+        if len(files) >= COMPARE_MAX_FILES:
+            # The list is truncated, so an unlisted path may still have changed
+            return True
+        changed = set()
+        for f in files:
+            changed.add(f["filename"])
+            if f.get("previous_filename"):
+                changed.add(f["previous_filename"])
+        return not changed.isdisjoint(paths)
+    
+    def pending_content(self, file_path: str) -> Optional[str]:
+        """Content committed through this client that may not be on the branch yet"""
+        return self._batcher.pending(file_path)
+    
     async def get_file_content(self, file_path: str, ref: str = None) -> str:
-        """Get file content from GitHub"""
+        """Get decoded file content from GitHub, revalidating cached copies with ETags.
+
+        Without a ref, changes still waiting to be pushed by this client win.
+        """
+        if ref is None:
+            pending = self.pending_content(file_path)
+            if pending is not None:
+                return pending
+        key = (file_path, ref or "")
+        entry = self.file_cache.get(key)
+        if entry is not None and (
+            _is_commit_sha(ref) or time.monotonic() - entry.checked_at < settings.GITHUB_FILE_CACHE_MAX_AGE
+        ):
+            self.file_cache.hits += 1
+            return entry.content
         try:
             params = {"ref": ref} if ref else {}
+            headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
             response = await self.client.get(
-                f"{self.base_url}/repos/{settings.REPO_OWNER}/{settings.REPO_NAME}/contents/{file_path}",
-                params=params
+                f"{self.repo_url}/contents/{file_path}",
+                params=params,
+                headers=headers
             )
+            if response.status_code == 304:
+                # Conditional requests answered with 304 don't count against the rate limit
+                entry.checked_at = time.monotonic()
+                self.file_cache.revalidations += 1
+                return entry.content
+            if response.status_code == 404:
+                # Not an error for callers about to create the file
+                return ""
             response.raise_for_status()
-            return response.json()["content"]
+            data = response.json()
+            content = _decode(data["content"])
+            self.file_cache.misses += 1
+            self.file_cache.put(key, data["sha"], content, response.headers.get("ETag"))
+            return content
         except Exception as e:
             print(f"Error getting file from GitHub: {str(e)}")
-            return ""
\ No newline at end of file
+            return ""
+    
+    async def get_pull_request_files(self, number: int) -> List[Dict]:
+        """Files changed by a pull request, each with its unified diff as `patch`.
+
+        Only the first 100 files are returned.
+        """
+        try:
+            response = await self.client.get(
+                f"{self.repo_url}/pulls/{number}/files", params={"per_page": 100}
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error getting pull request files from GitHub: {str(e)}")
+            return []
+    
+    async def list_tree(self, ref: str = None, prefix: str = "") -> Dict[str, Dict]:
+        """Map each blob path under `prefix` at `ref` to its tree entry (sha, size) in one request"""
+        response = await self.client.get(
+            f"{self.repo_url}/git/trees/{ref or settings.MAIN_BRANCH}",
+            params={"recursive": "1"}
+        )
+        response.raise_for_status()
+        return {
+            item["path"]: item for item in response.json()["tree"]
+            if item["type"] == "blob" and item["path"].startswith(prefix)
+        }
+    
+    async def get_blob(self, sha: str) -> str:
+        """Get decoded blob content by SHA, from the file cache when any path holds it"""
+        content = self.file_cache.content_for_sha(sha)
+        if content is not None:
+            return content
+        response = await self.client.get(f"{self.repo_url}/git/blobs/{sha}")
+        response.raise_for_status()
+        return _decode(response.json()["content"])
+    
+    async def get_tree_file(self, item: Dict, ref: str = None) -> str:
+        """Content of a `list_tree` entry, from the file cache when it holds that blob"""
+        key = (item["path"], ref or "")
+        cached = self.file_cache.get(key)
+        if cached is not None and cached.sha == item["sha"]:
+            cached.checked_at = time.monotonic()
+            return cached.content
+        content = await self.get_blob(item["sha"])
+        self.file_cache.put(key, item["sha"], content)
+        return content
+    
+    async def prefetch_tree(self, ref: str = None, prefix: str = "") -> int:
+        """Warm the file cache with every blob under `prefix` at `ref` using the git trees API.
+        
+        Blobs whose SHA is already cached are not downloaded again. Returns the
+        number of files fetched.
+        """
+        try:
+            tree = await self.list_tree(ref, prefix)
+            blobs = [
+                item for item in tree.values()
+                if item.get("size", 0) <= self.file_cache.max_bytes // 16
+            ]
+            
+            limit = asyncio.Semaphore(settings.GITHUB_MAX_CONCURRENCY)
+            
+            async def fetch(item: Dict) -> int:
+                cached = self.file_cache.get((item["path"], ref or ""))
+                if cached is not None and cached.sha == item["sha"]:
+                    cached.checked_at = time.monotonic()
+                    return 0
+                fetched = int(self.file_cache.content_for_sha(item["sha"]) is None)
+                async with limit:
+                    await self.get_tree_file(item, ref)
+                return fetched
+            
+            return sum(await asyncio.gather(*(fetch(item) for item in blobs)))
+        except Exception as e:
+            print(f"Error prefetching GitHub tree: {str(e)}")
+            return 0
+    
+    async def connect(self):
+        """Open a pooled connection ahead of the first request (DNS, TCP and TLS)"""
+        try:
+            await self.client.head(self.base_url)
+        except httpx.HTTPError as e:
+            print(f"Error connecting to GitHub: {str(e)}")
+    
+    async def close(self):
+        """Push pending commits, then close the HTTP client"""
+        await self._batcher.close()
+        await self.client.aclose()
+
+def _operation(path: str) -> str:
+    """Metric label for a GitHub API path, such as git/blobs or contents"""
+    parts = path.split("/")[4:]
+    if not parts:
+        return path
+    if parts[0] == "git" and len(parts) > 1:
+        return f"git/{parts[1]}"
+    return parts[0]
+
+def _decode(content: str) -> str:
+    return base64.b64decode(content).decode("utf-8", errors="replace")
+
+def _is_commit_sha(ref: Optional[str]) -> bool:
+    """Full commit SHAs are immutable, so cached content for them never goes stale"""
+    return bool(ref) and len(ref) == 40 and all(c in "0123456789abcdef" for c in ref)
@@ -1,5 +1,7 @@
+from typing import AsyncIterator
 import httpx
 from src.core.config import settings
+from src.core.metrics import InstrumentedTransport
 
 class RailwayClient:
     def __init__(self):
@@ -8,7 +10,10 @@ class RailwayClient:
             "Authorization": f"Bearer {settings.RAILWAY_API_KEY}",
             "Content-Type": "application/json"
         }
-        self.client = httpx.AsyncClient(headers=self.headers)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            transport=InstrumentedTransport("railway", _operation)
+        )
     
     async def get_build_logs(self, build_id: str) -> str:
         """Get build logs from Railway"""
@@ -22,6 +27,18 @@ class RailwayClient:
             print(f"Error getting Railway build logs: {str(e)}")
             return ""
     
+    async def iter_build_log_lines(self, build_id: str) -> AsyncIterator[str]:
+        """Stream build log lines from Railway without buffering the whole log"""
+        try:
+            async with self.client.stream(
+                "GET", f"{self.base_url}/builds/{build_id}/logs"
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    yield line
+        except Exception as e:
+            print(f"Error streaming Railway build logs: {str(e)}")
+    
     async def get_deployment_status(self, deployment_id: str) -> dict:
         """Get deployment status from Railway"""
         try:
@@ -32,4 +49,21 @@ class RailwayClient:
             return response.json()
         except Exception as e:
             print(f"Error getting Railway deployment status: {str(e)}")
-            return {}
\ No newline at end of file
+            return {}
+    
+    async def connect(self):
+        """Open a pooled connection ahead of the first request (DNS, TCP and TLS)"""
+        try:
+            await self.client.head(self.base_url)
+        except httpx.HTTPError as e:
+            print(f"Error connecting to Railway: {str(e)}")
+    
+    async def close(self):
+        await self.client.aclose()
+
+def _operation(path: str) -> str:
+    """Metric label for a Railway API path, such as builds/logs or deployments"""
+    parts = [part for part in path.split("/") if part]
+    base = [part for part in httpx.URL(settings.RAILWAY_API_URL).path.split("/") if part]
+    parts = parts[len(base):]
+    return "/".join(parts[0:1] + parts[2:3]) or path
@@ -1,23 +1,57 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import asyncio
+import json
 from typing import Dict, List
 import uvicorn
 
 from src.core.config import settings
-from src.core.memory import SharedMemory, Task
-from src.agents.architect import ArchitectAgent
-from src.agents.coder import CoderAgent
-from src.agents.reviewer import ReviewerAgent
-from src.agents.devops import DevOpsAgent
+from src.core.events import TERMINAL_STATUSES
+from src.core.fingerprint import fingerprint_error
+from src.core.memory import Task
+from src.core import metrics
+from src.core.queue import QueueFullError
+from src.services import get_services
 
-app = FastAPI(title="Claude Multi-Agent System", debug=settings.DEBUG)
-memory = SharedMemory()
+# Agents and clients are built on first use; see src/services.py
+services = get_services()
 
-# Initialize agents
-architect = ArchitectAgent(memory)
-coder = CoderAgent(memory)
-reviewer = ReviewerAgent(memory)
-devops = DevOpsAgent(memory)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await services.start()
+    try:
+        yield
+    finally:
+        await services.close()
+
+app = FastAPI(title="Claude Multi-Agent System", debug=settings.DEBUG, lifespan=lifespan)
+
+def _queue_depth() -> Dict:
+    """Tasks waiting per agent, without building the queue for a scrape"""
+    if not services.built("task_queue"):
+        return {}
+    return {(agent,): depth for agent, depth in services.task_queue.depth().items()}
+
+def _cache_hits() -> Dict:
+    """Cache hits; caches that have not been built yet report 0"""
+    return {
+        ("response",): services.cache.hits + services.cache.disk_hits if services.built("cache") else 0,
+        ("github_file",): services.github.file_cache.hits + services.github.file_cache.revalidations
+        if services.built("github") else 0
+    }
+
+def _cache_misses() -> Dict:
+    """Cache misses; caches that have not been built yet report 0"""
+    return {
+        ("response",): services.cache.misses if services.built("cache") else 0,
+        ("github_file",): services.github.file_cache.misses if services.built("github") else 0
+    }
+
+metrics.QUEUE_DEPTH.set_function(_queue_depth)
+metrics.CACHE_HITS.set_function(_cache_hits)
+metrics.CACHE_MISSES.set_function(_cache_misses)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,50 +61,215 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/tasks/")
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose metrics in the Prometheus text format"""
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.post("/tasks", status_code=202)
+@app.post("/tasks/", status_code=202)
 async def create_task(task: Task):
-    """Create a new task and delegate to appropriate agent"""
-    memory.add_task(task)
+    """Queue a new task for the appropriate agent; poll GET /tasks/{task_id} for progress"""
+    if not services.task_queue.accepts(task.type):
+        raise HTTPException(status_code=400, detail="Invalid task type")
     
-    if task.type == "architecture":
-        return await architect.handle_task(task)
-    elif task.type == "code":
-        return await coder.handle_task(task)
-    elif task.type == "review":
-        return await reviewer.handle_task(task)
-    elif task.type == "fix":
-        return await devops.handle_task(task)
-    else:
-        raise HTTPException(status_code=400, message="Invalid task type")
+    services.memory.add_task(task)
+    try:
+        services.task_queue.submit(task)
+    except QueueFullError as e:
+        services.memory.update_task_status(task.id, "failed")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    return {"id": task.id, "status": task.status}
+
+@app.post("/tasks/batch", status_code=202)
+async def create_tasks(tasks: List[Task]):
+    """Queue several tasks at once; returns the id and status of each"""
+    results = []
+    accepted = []
+    seen = set()
+    for task in tasks:
+        if not services.task_queue.accepts(task.type):
+            results.append({"id": task.id, "status": "rejected", "error": "Invalid task type"})
+        elif task.id in seen:
+            results.append({"id": task.id, "status": "rejected", "error": "Duplicate task id"})
+        else:
+            seen.add(task.id)
+            result = {"id": task.id, "status": task.status}
+            accepted.append((task, result))
+            results.append(result)
+    
+    services.memory.add_tasks([task for task, _ in accepted])
+    for task, result in accepted:
+        try:
+            services.task_queue.submit(task)
+        except QueueFullError as e:
+            services.memory.update_task_status(task.id, "failed")
+            result.update(status="failed", error=str(e))
+    return results
+
+@app.get("/tasks")
+@app.get("/tasks/")
+async def list_tasks(ids: str = None, status: str = None, type: str = None, limit: int = 100):
+    """Bulk status lookup by comma-separated ids, or list tasks filtered by status/type"""
+    if ids:
+        task_ids = [task_id for task_id in ids.split(",") if task_id]
+        found = services.memory.get_tasks(task_ids)
+        return [
+            _summarize(found[task_id]) if task_id in found else {"id": task_id, "status": "not_found"}
+            for task_id in task_ids
+        ]
+    tasks = services.memory.find_tasks(status=status, type=type, limit=limit)
+    return [_summarize(task) for task in tasks]
+
+def _summarize(task: Task) -> Dict:
+    return {
+        "id": task.id,
+        "type": task.type,
+        "status": task.status,
+        "parent_task_id": task.parent_task_id,
+        "subtasks": task.subtasks
+    }
 
 @app.get("/tasks/{task_id}")
-async def get_task_status(task_id: str):
-    """Get status of a specific task"""
+async def get_task_status(task_id: str, include_content: bool = False):
+    """Get status of a specific task; context content is only included on request"""
+    task = services.memory.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task.dump(include_content=include_content)
+
+@app.get("/tasks/{task_id}/stream")
+async def stream_task(task_id: str):
+    """Stream a task's status transitions and generated tokens as server-sent events.
+
+    Tokens are only streamed when the task runs in the process serving the
+    request; otherwise status changes are picked up by polling.
+    """
+    memory = services.memory
+    shared = services.task_queue.shared
     task = memory.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task
+    
+    async def event_stream():
+        queue = memory.events.subscribe(task_id)
+        # Events are per process; with a shared queue the task may be running
+        # elsewhere, so also poll the store for status changes
+        timeout = 1 if shared else 15
+        idle = 0
+        status = memory.get_task_status(task_id)
+        try:
+            yield _sse("status", {"status": status})
+            if status in TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    idle += timeout
+                    latest = memory.get_task_status(task_id) if shared else status
+                    if latest != status:
+                        status = latest
+                        yield _sse("status", {"status": status})
+                        if status in TERMINAL_STATUSES:
+                            return
+                    elif idle >= 15:
+                        idle = 0
+                        yield ": keep-alive\n\n"
+                    continue
+                idle = 0
+                yield _sse(event["event"], event["data"])
+                if event["event"] == "status":
+                    status = event["data"]["status"]
+                    if status in TERMINAL_STATUSES:
+                        return
+        finally:
+            memory.events.unsubscribe(task_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-@app.post("/webhooks/railway")
+@app.post("/webhooks/railway", status_code=202)
 async def railway_webhook(payload: Dict):
     """Handle Railway build/deploy webhooks"""
-    if payload.get("status") == "failed":
-        # Create review task for build failure
-        task = Task(
-            id=f"fix_{payload['id']}",
-            type="review",
-            description="Review Railway build failure",
-            context=[{"error_message": payload.get("error")}]
+    if payload.get("status") != "failed":
+        return {"status": "ignored"}
+    
+    # Review build failures, one task per distinct error within the debounce window
+    error = payload.get("error") or ""
+    build_id = payload.get("build_id", payload["id"])
+    # Failures without an error message have nothing in common but their build
+    fingerprint = fingerprint_error(f"railway {error}") if error.strip() else f"railway:{build_id}"
+    status = services.webhooks.ingest(
+        delivery_id=f"railway:{payload['id']}",
+        fingerprint=fingerprint,
+        event={
+            "id": f"fix_{payload['id']}",
+            "description": "Review Railway build failure",
+            "error": error,
+            "metadata": {"source": "railway", "build_id": build_id}
+        }
+    )
+    return {"status": status}
+
+@app.post("/webhooks/github", status_code=202)
+async def github_webhook(
+    payload: Dict,
+    x_github_event: str = Header(None),
+    x_github_delivery: str = Header(None)
+):
+    """Handle GitHub workflow/check failures and pull request webhooks"""
+    delivery_id = f"github:{x_github_delivery}" if x_github_delivery else None
+    
+    if x_github_event in ("workflow_run", "check_run"):
+        run = payload.get(x_github_event, {})
+        if payload.get("action") != "completed" or run.get("conclusion") not in ("failure", "timed_out"):
+            return {"status": "ignored"}
+        output = run.get("output") or {}
+        error = "\n".join(filter(None, [
+            run.get("name"),
+            run.get("conclusion"),
+            output.get("title"),
+            output.get("summary")
+        ]))
+        status = services.webhooks.ingest(
+            delivery_id=delivery_id,
+            fingerprint=fingerprint_error(f"github {error}"),
+            event={
+                "id": f"fix_github_{run.get('id')}",
+                "description": f"Review GitHub {x_github_event.replace('_', ' ')} failure",
+                "error": error,
+                "metadata": {"source": "github", "head_sha": run.get("head_sha")}
+            }
         )
-        memory.add_task(task)
-        await reviewer.handle_task(task)
-    return {"status": "processing"}
-
-@app.post("/webhooks/github")
-async def github_webhook(payload: Dict):
-    """Handle GitHub push and PR webhooks"""
-    # Handle different GitHub event types
-    return {"status": "processing"}
+        return {"status": status}
+    
+    if x_github_event == "pull_request" and payload.get("action") in ("opened", "synchronize", "reopened"):
+        pr = payload["pull_request"]
+        # Keyed by PR so a burst of pushes yields one review of the latest head
+        status = services.webhooks.ingest(
+            delivery_id=delivery_id,
+            fingerprint=f"pr:{pr['number']}",
+            event={
+                "id": f"review_pr_{pr['number']}",
+                "description": f"Review pull request #{pr['number']}: {pr.get('title', '')}",
+                "metadata": {"source": "github", "pull_request": pr["number"], "head_sha": pr["head"]["sha"]}
+            },
+            attach_to_active=False
+        )
+        return {"status": status}
+    
+    return {"status": "ignored"}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,150 @@
+import asyncio
+import importlib
+from functools import cached_property
+from typing import Dict, List
+
+from src.core.cache import ResponseCache
+from src.core.config import settings
+from src.core.memory import SharedMemory
+from src.core.queue import TaskQueue
+from src.core.webhooks import WebhookIngestor
+from src.integrations.github import GitHubClient
+from src.integrations.railway import RailwayClient
+
+AGENTS = ["architect", "coder", "reviewer", "devops"]
+
+class Services:
+    """The app's agents and API clients, built on first use and shared.
+
+    Agents and the Claude client are imported and constructed the first time
+    a task needs them, so importing the app stays cheap. One GitHub client
+    serves the coder, the reviewer and the repository index. `start` runs the
+    background workers; `close` shuts down everything that was built and
+    resets the container so it can be started again.
+    """
+
+    def __init__(self, warm_up: bool = None):
+        self.warm_up = settings.WARM_UP if warm_up is None else warm_up
+        self._background: List[asyncio.Task] = []
+
+    @cached_property
+    def memory(self) -> SharedMemory:
+        return SharedMemory()
+
+    @cached_property
+    def cache(self) -> ResponseCache:
+        return ResponseCache(path=settings.RESPONSE_CACHE_PATH)
+
+    @cached_property
+    def claude(self):
+        # Deferred: the Anthropic SDK is the slowest import in the app
+        from src.core.claude import ClaudeClient
+        return ClaudeClient()
+
+    @cached_property
+    def github(self) -> GitHubClient:
+        return GitHubClient()
+
+    @cached_property
+    def railway(self) -> RailwayClient:
+        return RailwayClient()
+
+    def _shared(self) -> Dict:
+        # Every agent uses the same Claude client, response cache and scheduler
+        return {"client": self.claude, "cache": self.cache, "scheduler": self.task_queue.scheduler}
+
+    @cached_property
+    def architect(self):
+        from src.agents.architect import ArchitectAgent
+        return ArchitectAgent(self.memory, **self._shared())
+
+    @cached_property
+    def coder(self):
+        from src.agents.coder import CoderAgent
+        return CoderAgent(self.memory, github=self.github, **self._shared())
+
+    @cached_property
+    def reviewer(self):
+        from src.agents.reviewer import ReviewerAgent
+        return ReviewerAgent(self.memory, github=self.github, **self._shared())
+
+    @cached_property
+    def devops(self):
+        from src.agents.devops import DevOpsAgent
+        return DevOpsAgent(self.memory, railway=self.railway, **self._shared())
+
+    @cached_property
+    def task_queue(self) -> TaskQueue:
+        queue = TaskQueue(self.memory)
+        # Handlers look the agent up per task, so registering doesn't build it
+        queue.register("architect", ["architecture"], lambda task: self.architect.handle_task(task))
+        queue.register("coder", ["code"], lambda task: self.coder.handle_task(task))
+        queue.register("reviewer", ["review"], lambda task: self.reviewer.handle_task(task))
+        queue.register("devops", ["fix"], lambda task: self.devops.handle_task(task))
+        return queue
+
+    @cached_property
+    def webhooks(self) -> WebhookIngestor:
+        return WebhookIngestor(self.memory, self.task_queue.submit)
+
+    def built(self, name: str) -> bool:
+        """Whether the named service has been constructed yet"""
+        return name in self.__dict__
+
+    async def start(self):
+        """Start the task workers and background maintenance"""
+        self.task_queue.start()
+        self.webhooks.resume()
+        self._background.append(asyncio.create_task(self.memory.autoflush()))
+        if self.memory.index is not None:
+            self._background.append(
+                asyncio.create_task(self.memory.index.autorefresh(self.github))
+            )
+        if self.warm_up:
+            self._background.append(asyncio.create_task(self._warm_up()))
+
+    async def _warm_up(self):
+        """Build the agents and open API connections before the first task arrives"""
+        # Imports run in a thread so the event loop keeps serving meanwhile
+        await asyncio.to_thread(
+            lambda: [importlib.import_module(f"src.agents.{agent}") for agent in AGENTS]
+        )
+        for agent in AGENTS:
+            getattr(self, agent)
+        connects = [self.claude.connect(), self.github.connect()]
+        if settings.RAILWAY_API_KEY:
+            connects.append(self.railway.connect())
+        await asyncio.gather(*connects)
+
+    async def close(self):
+        """Stop background work and close every client that was built"""
+        if self.built("webhooks"):
+            self.webhooks.close()
+        if self.built("task_queue"):
+            await self.task_queue.stop()
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background = []
+        for name in ("claude", "github", "railway"):
+            if self.built(name):
+                try:
+                    await getattr(self, name).close()
+                except Exception as e:
+                    print(f"Error closing {name} client: {str(e)}")
+        if self.built("cache"):
+            self.cache.close()
+        if self.built("memory"):
+            self.memory.close()
+        for name, attr in vars(Services).items():
+            if isinstance(attr, cached_property):
+                self.__dict__.pop(name, None)
+
+_services = None
+
+def get_services() -> Services:
+    """Return the process-wide services container, creating it on first use"""
+    global _services
+    if _services is None:
+        _services = Services()
+    return _services
@@ -0,0 +1,5 @@
+import os
+
+# Settings requires these; tests never reach the real services
+for name in ("CLAUDE_API_KEY", "GITHUB_TOKEN", "REPO_OWNER", "REPO_NAME"):
+    os.environ.setdefault(name, "test")
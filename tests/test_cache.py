@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.cache import ResponseCache
+
+def test_concurrent_misses_create_once():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "response"
+
+    async def scenario():
+        cache = ResponseCache()
+        return await asyncio.gather(*(cache.get_or_create("k", factory) for _ in range(3)))
+    assert asyncio.run(scenario()) == ["response"] * 3
+    assert calls == [1]
+
+def test_waiters_retry_when_the_creating_request_is_cancelled():
+    async def scenario():
+        cache = ResponseCache()
+        started = asyncio.Event()
+
+        async def hangs():
+            started.set()
+            await asyncio.Event().wait()
+
+        async def answers():
+            return "response"
+
+        leader = asyncio.create_task(cache.get_or_create("k", hangs))
+        await started.wait()
+        follower = asyncio.create_task(cache.get_or_create("k", answers))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.wait_for(follower, 1), cache
+    response, cache = asyncio.run(scenario())
+    assert response == "response"
+    assert cache.get("k") == "response"
+
+def test_cancelled_waiter_does_not_cancel_the_request():
+    async def scenario():
+        cache = ResponseCache()
+        release = asyncio.Event()
+
+        async def factory():
+            await release.wait()
+            return "response"
+
+        leader = asyncio.create_task(cache.get_or_create("k", factory))
+        follower = asyncio.create_task(cache.get_or_create("k", factory))
+        await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.gather(follower, return_exceptions=True)
+        release.set()
+        return await leader, follower.cancelled()
+    assert asyncio.run(scenario()) == ("response", True)
+
+def test_errors_reach_every_waiter():
+    async def factory():
+        await asyncio.sleep(0.01)
+        raise ValueError("overloaded")
+
+    async def scenario():
+        cache = ResponseCache()
+        results = await asyncio.gather(
+            *(cache.get_or_create("k", factory) for _ in range(2)), return_exceptions=True
+        )
+        return results, cache
+    results, cache = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert cache.get("k") is None
+
+def test_rejected_response_is_not_cached():
+    async def factory():
+        return "no patch"
+
+    async def scenario():
+        cache = ResponseCache()
+        response = await cache.get_or_create("k", factory, validate=lambda text: False)
+        return response, cache
+    response, cache = asyncio.run(scenario())
+    assert response == "no patch"
+    assert cache.get("k") is None
+
+def test_entries_expire():
+    cache = ResponseCache(ttl=0.01)
+    cache.set("k", "response")
+    assert cache.get("k") == "response"
+    time.sleep(0.02)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.evictions == 1
+
+def test_memory_tier_is_bounded_by_bytes():
+    cache = ResponseCache(max_bytes=10)
+    cache.set("a", "x" * 6)
+    cache.set("b", "y" * 6)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+    # Larger than the whole tier: never stored
+    cache.set("c", "z" * 11)
+    assert cache.get("c") is None
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(path=path)
+    cache.set("k", "response")
+    cache.close()
+    reopened = ResponseCache(path=path)
+    assert reopened.get("k") == "response"
+    assert reopened.disk_hits == 1
+    reopened.close()
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(max_entries=1, path=path, disk_max_bytes=900)
+    for i in range(100):
+        cache.set(f"k{i}", f"{i:010d}")
+    assert cache.stats()["disk_bytes"] <= 900
+    cache.close()
+    reopened = ResponseCache(path=path, disk_max_bytes=900)
+    assert reopened.get("k0") is None
+    assert reopened.get("k99") == f"{99:010d}"
+    assert reopened.stats()["disk_bytes"] == cache.stats()["disk_bytes"]
+    reopened.close()
@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.core.claude import ClaudeClient
+
+class FakeMessages:
+    """Messages API whose calls to `slow` models wait until released"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.running = []
+
+    async def create(self, model, **kwargs):
+        self.running.append(model)
+        if model.startswith("slow"):
+            await self.release.wait()
+        return SimpleNamespace(usage=None)
+
+def test_busy_model_does_not_block_other_models():
+    async def scenario():
+        client = ClaudeClient(api_key="test", max_concurrency=2, max_concurrency_per_model=1)
+        client._record_usage = lambda route, model, usage: None
+        messages = client.client.messages = FakeMessages()
+        # Three calls queue on one model with a per-model limit of one
+        slow = [asyncio.create_task(client.create_message(model="slow-model")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(client.create_message(model="fast-model"), 1)
+        assert messages.running == ["slow-model", "fast-model"]
+        messages.release.set()
+        await asyncio.gather(*slow)
+        await client.close()
+        return messages
+    assert asyncio.run(scenario()).running.count("slow-model") == 3
@@ -0,0 +1,63 @@
+import asyncio
+
+from src.agents.coder import CoderAgent
+from src.core.memory import CodeContext, SharedMemory, Task
+from src.core.storage import InMemoryTaskStore
+
+APP = "def handler(request):\n    return request.body\n"
+
+class FakeGitHub:
+    def __init__(self, files):
+        self.files = dict(files)
+        self.reads = []
+        self.pushed = []
+
+    async def get_file_content(self, path, ref=None):
+        self.reads.append(path)
+        return self.files.get(path, "")
+
+    def pending_content(self, path):
+        return None
+
+    async def commit_and_push(self, files, message):
+        self.pushed.append(files)
+        return True
+
+class ScriptedCoder(CoderAgent):
+    def __init__(self, memory, github, response):
+        super().__init__(memory, github=github)
+        self.response = response
+        self.prompts = []
+
+    async def call_claude(self, messages, validate=None, context=None, **kwargs):
+        self.prompts.append((context or "") + messages[-1]["content"])
+        return self.response
+
+def run(task, files, response):
+    memory = SharedMemory(store=InMemoryTaskStore())
+    memory.add_task(task)
+    github = FakeGitHub(files)
+    coder = ScriptedCoder(memory, github, response)
+    return asyncio.run(coder.handle_task(task)), coder, github
+
+def test_edits_an_existing_file_named_only_by_path():
+    task = Task(id="t", type="code", description="Fix handler in app.py", context=[
+        CodeContext(file_path="app.py")
+    ])
+    response = "app.py\n<<<<<<< SEARCH\n    return request.body\n=======\n    return request.json()\n>>>>>>> REPLACE"
+    result, coder, github = run(task, {"app.py": APP}, response)
+    assert result == {"status": "success", "files": ["app.py"]}
+    # Claude saw the file it had to quote
+    assert "    return request.body" in coder.prompts[0]
+    assert github.pushed == [{"app.py": "def handler(request):\n    return request.json()\n"}]
+    # ... and the edit applied to that same content without fetching it again
+    assert github.reads == ["app.py"]
+
+def test_attached_content_is_not_fetched():
+    task = Task(id="t", type="code", description="Add a docstring", context=[
+        CodeContext(file_path="new.py", content="x = 1\n")
+    ])
+    response = "new.py\n<<<<<<< SEARCH\nx = 1\n=======\n'''Module.'''\nx = 1\n>>>>>>> REPLACE"
+    result, coder, github = run(task, {}, response)
+    assert result["status"] == "success"
+    assert github.pushed == [{"new.py": "'''Module.'''\nx = 1\n"}]
@@ -0,0 +1,126 @@
+from src.core.fingerprint import (
+    ErrorIndex, FixProposal, fingerprint_error, hamming, normalize_error, simhash
+)
+from src.core.memory import SharedMemory, Task
+from src.core.storage import InMemoryTaskStore
+
+BUILD_ERROR = (
+    "Traceback (most recent call last):\n"
+    "  File /app/src/main.py, line 12, in <module>\n"
+    "    import foo\n"
+    "ModuleNotFoundError: No module named 'foo'\n"
+    "Build failed at 2024-01-01T10:00:00Z step install dependencies using pip requirements file"
+)
+SIMILAR_ERROR = BUILD_ERROR.replace("using pip", "with pip")
+OTHER_ERROR = "npm ERR! code ERESOLVE unable to resolve dependency tree for react peer"
+
+def fix(task_id, description="add foo to requirements", context=None):
+    return FixProposal(task_id, description, context or [])
+
+def fixed_index(text=BUILD_ERROR, proposal=None):
+    """An index where `text` occurred once and a fix for it completed"""
+    proposal = proposal or fix("t1")
+    index = ErrorIndex(max_entries=10, max_distance=6)
+    entry = index.record(text)
+    index.link(entry, proposal)
+    index.resolve(proposal.task_id)
+    return index, entry
+
+def test_normalize_strips_volatile_parts():
+    text = "2024-05-01 12:00:01 /home/ci/build/app/main.py:42 failed id=3f2a9c1e8b7d"
+    assert normalize_error(text) == "<ts> main.py:<n> failed id=<hash>"
+
+def test_fingerprint_ignores_timestamps_and_line_numbers():
+    moved = BUILD_ERROR.replace("10:00:00", "11:22:33").replace("line 12", "line 99")
+    assert fingerprint_error(moved) == fingerprint_error(BUILD_ERROR)
+    assert fingerprint_error(SIMILAR_ERROR) != fingerprint_error(BUILD_ERROR)
+
+def test_simhash_distance_reflects_similarity():
+    assert hamming(simhash(BUILD_ERROR), simhash(SIMILAR_ERROR)) <= 6
+    assert hamming(simhash(BUILD_ERROR), simhash(OTHER_ERROR)) > 6
+
+def test_record_counts_occurrences():
+    index = ErrorIndex()
+    assert index.record(BUILD_ERROR) is index.record(BUILD_ERROR.replace("line 12", "line 13"))
+    assert index.record(BUILD_ERROR).occurrences == 3
+    assert len(index) == 1
+
+def test_unrelated_error_misses():
+    index, _ = fixed_index()
+    assert index.known_fixes(index.record(OTHER_ERROR)) == []
+
+def test_fix_is_not_reusable_until_its_task_completes():
+    index = ErrorIndex(max_distance=6)
+    index.link(index.record(BUILD_ERROR), fix("t1"))
+    assert index.known_fixes(index.record(SIMILAR_ERROR)) == []
+    index.resolve("t1")
+    assert [proposal.task_id for proposal in index.known_fixes(index.record(SIMILAR_ERROR))] == ["t1"]
+
+def test_near_match_reuses_fix():
+    index, _ = fixed_index()
+    [proposal] = index.known_fixes(index.record(SIMILAR_ERROR))
+    assert proposal.description == "add foo to requirements"
+
+def test_exact_recurrence_after_fix_marks_it_failed():
+    index, entry = fixed_index()
+    # The same error came back after its fix was applied
+    assert index.known_fixes(index.record(BUILD_ERROR)) == []
+    assert entry.fixes == []
+    assert entry.failed == {fix("t1").key}
+    # ... and the failed fix isn't borrowed back from a similar error
+    similar = index.record(SIMILAR_ERROR)
+    index.link(similar, fix("t2"))
+    index.resolve("t2")
+    assert index.known_fixes(index.record(BUILD_ERROR)) == []
+
+def test_failed_reused_fix_is_not_proposed_again():
+    index, _ = fixed_index()
+    similar = index.record(SIMILAR_ERROR)
+    [proposal] = index.known_fixes(similar)
+    index.link(similar, FixProposal("t2", proposal.description, proposal.context))
+    index.discard("t2")
+    assert index.known_fixes(index.record(SIMILAR_ERROR)) == []
+
+def test_cancelled_fix_is_forgotten_without_failing():
+    index = ErrorIndex()
+    entry = index.record(BUILD_ERROR)
+    index.link(entry, fix("t1"))
+    index.discard("t1", failed=False)
+    index.resolve("t1")
+    assert entry.fixes == []
+    assert entry.failed == set()
+
+def test_fixes_are_keyed_by_content_not_description():
+    index = ErrorIndex()
+    entry = index.record(BUILD_ERROR)
+    # Every DevOps fix has the same description; their contexts differ
+    for task_id, content_id in (("t1", "a"), ("t2", "b"), ("t3", "a")):
+        index.link(entry, fix(task_id, "Apply build failure fixes", [{"content_id": content_id}]))
+        index.resolve(task_id)
+    assert [proposal.task_id for proposal in entry.fixes] == ["t1", "t2"]
+    index.link(entry, fix("t4", "Apply build failure fixes", [{"content_id": "b"}]))
+    index.discard("t4")
+    assert [proposal.task_id for proposal in entry.fixes] == ["t1"]
+
+def test_least_recently_seen_errors_are_evicted():
+    index = ErrorIndex(max_entries=2, max_distance=6)
+    index.record(BUILD_ERROR)
+    index.record(OTHER_ERROR)
+    index.record(BUILD_ERROR)
+    index.record("something else entirely went wrong")
+    assert len(index) == 2
+    assert fingerprint_error(OTHER_ERROR) not in index._entries
+    assert all(fingerprint_error(OTHER_ERROR) not in bucket.get(key, ())
+               for bucket in index._bands for key in bucket)
+
+def test_memory_resolves_fixes_on_task_status():
+    memory = SharedMemory(store=InMemoryTaskStore())
+    entry = memory.errors.record(BUILD_ERROR)
+    for task_id in ("done", "broken"):
+        task = Task(id=task_id, type="code", description=task_id, context=[])
+        memory.add_task(task)
+        memory.link_fix(entry, task)
+    memory.update_task_status("done", "completed")
+    memory.update_task_status("broken", "failed")
+    assert [proposal.task_id for proposal in entry.fixes] == ["done"]
+    assert len(entry.failed) == 1
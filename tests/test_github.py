@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import httpx
+
+from src.integrations.github import COMPARE_MAX_FILES, CommitBatcher, GitHubClient
+
+class FakeRepo:
+    """Git data API whose branch moves once under the first push"""
+
+    def __init__(self, moved_files):
+        self.head = "head0"
+        self.moved_files = [{"filename": name} if isinstance(name, str) else name for name in moved_files]
+        self.trees = []
+        self.compared = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/git/blobs"):
+            return httpx.Response(201, json={"sha": "blob-" + json.loads(request.content)["content"]})
+        if "/git/ref/heads/" in path:
+            return httpx.Response(200, json={"object": {"sha": self.head}})
+        if path.endswith("/git/trees"):
+            self.trees.append(json.loads(request.content)["base_tree"])
+            return httpx.Response(201, json={"sha": f"tree{len(self.trees)}"})
+        if path.endswith("/git/commits"):
+            return httpx.Response(201, json={"sha": f"commit{len(self.trees)}"})
+        if "/git/refs/heads/" in path:
+            if self.head == "head0":
+                # Someone else pushed first
+                self.head = "head1"
+                return httpx.Response(422, json={"message": "Update is not a fast forward"})
+            self.head = json.loads(request.content)["sha"]
+            return httpx.Response(200, json={"object": {"sha": self.head}})
+        if "/compare/" in path:
+            self.compared.append(path.rsplit("/", 1)[1])
+            return httpx.Response(200, json={"files": self.moved_files})
+        return httpx.Response(404)
+
+def push(repo, changes):
+    github = GitHubClient()
+    github.client = httpx.AsyncClient(transport=httpx.MockTransport(repo.handle))
+
+    async def scenario():
+        try:
+            return await github._push_commit(changes, "change")
+        finally:
+            await github.client.aclose()
+    return asyncio.run(scenario()), github
+
+def test_rebases_when_the_new_commits_touch_other_files():
+    repo = FakeRepo(["docs/other.md"])
+    pushed, github = push(repo, {"src/a.py": "new"})
+    assert pushed
+    assert repo.trees == ["head0", "head1"]
+    assert repo.compared == ["head0...head1"]
+    assert repo.head == "commit2"
+    assert github.file_cache.get(("src/a.py", "")).content == "new"
+
+def test_fails_when_the_new_commits_touch_the_same_files():
+    repo = FakeRepo(["src/a.py"])
+    pushed, github = push(repo, {"src/a.py": "new", "src/b.py": "new"})
+    assert not pushed
+    assert repo.trees == ["head0"]
+    assert repo.head == "head1"
+
+def test_renamed_path_counts_as_changed():
+    repo = FakeRepo([{"filename": "src/new.py", "previous_filename": "src/a.py"}])
+    pushed, _ = push(repo, {"src/a.py": "new"})
+    assert not pushed
+
+def test_truncated_comparison_is_treated_as_a_conflict():
+    repo = FakeRepo([f"file{i}.py" for i in range(COMPARE_MAX_FILES)])
+    pushed, _ = push(repo, {"src/a.py": "new"})
+    assert not pushed
+
+def test_batcher_coalesces_changes_into_one_push():
+    pushes = []
+
+    async def scenario():
+        async def fake_push(changes, message):
+            pushes.append((dict(changes), message))
+            # Content is readable while the push is in flight
+            assert batcher.pending("a.py") == "a2"
+            return True
+        batcher = CommitBatcher(fake_push, window=0.01)
+        results = await asyncio.gather(
+            batcher.submit({"a.py": "a1"}, "first"),
+            batcher.submit({"a.py": "a2", "b.py": "b"}, "second")
+        )
+        assert batcher.pending("a.py") is None
+        return results
+    assert asyncio.run(scenario()) == [True, True]
+    [(changes, message)] = pushes
+    assert changes == {"a.py": "a2", "b.py": "b"}
+    assert message == "chore: apply 2 changes\n\n- first\n- second"
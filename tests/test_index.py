@@ -0,0 +1,109 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+from src.core.blobs import BlobStore
+from src.core.index import RepoIndex, git_blob_sha
+from src.core.memory import CodeContext, SharedMemory, Task
+from src.core.storage import InMemoryTaskStore
+from src.integrations.github import GitHubClient
+
+@pytest.fixture
+def blobs(monkeypatch):
+    store = BlobStore()
+    monkeypatch.setattr("src.core.index.get_blob_store", lambda: store)
+    return store
+
+def test_search_prefers_the_defining_chunk(blobs):
+    index = RepoIndex(chunk_lines=2)
+    index.update_file("src/parser.py", "def parse_config(path):\n    return path\n")
+    index.update_file("src/app.py", "from parser import parse_config\n\nparse_config('x')\n")
+    hits = index.search("parse_config")
+    assert hits[0].path == "src/parser.py"
+    assert index.definitions("parse_config") == [("src/parser.py", 1)]
+    assert index.references("parse_config") == ["src/app.py"]
+
+def test_reindexing_a_file_releases_its_old_content(blobs):
+    index = RepoIndex()
+    index.update_file("a.py", "x = 1\n")
+    old = blobs.blob_id("x = 1\n")
+    index.update_file("a.py", "x = 2\n")
+    assert blobs.get(old) == ""
+    assert blobs.get(blobs.blob_id("x = 2\n")) == "x = 2\n"
+    index.remove_file("a.py")
+    assert blobs.stats() == {"cached_blobs": 0, "cached_bytes": 0}
+
+def test_content_also_held_elsewhere_is_kept(blobs):
+    index = RepoIndex()
+    # A task attached the same content
+    task_blob = blobs.put("x = 1\n")
+    index.update_file("a.py", "x = 1\n")
+    index.update_file("a.py", "x = 2\n")
+    assert blobs.get(task_blob) == "x = 1\n"
+
+def test_sqlite_blobs_are_not_released(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs.db"))
+    blob_id = store.put("x = 1\n")
+    store.release(blob_id)
+    assert store.get(blob_id) == "x = 1\n"
+    store.close()
+
+class FakeTree:
+    """Trees and blobs API for a repository of small Python files"""
+
+    def __init__(self, files):
+        self.files = files
+        self.blob_requests = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if "/git/trees/" in path:
+            return httpx.Response(200, json={"tree": [
+                {"path": name, "type": "blob", "sha": git_blob_sha(content), "size": len(content)}
+                for name, content in self.files.items()
+            ]})
+        if "/git/blobs/" in path:
+            sha = path.rsplit("/", 1)[1]
+            self.blob_requests.append(sha)
+            content = next(c for c in self.files.values() if git_blob_sha(c) == sha)
+            return httpx.Response(200, json={"content": base64.b64encode(content.encode()).decode()})
+        return httpx.Response(404)
+
+def test_github_updates_go_through_the_file_cache(blobs):
+    tree = FakeTree({"src/a.py": "def a(): pass\n", "src/b.py": "def b(): pass\n"})
+    github = GitHubClient()
+    github.client = httpx.AsyncClient(transport=httpx.MockTransport(tree.handle))
+    # An agent already read src/a.py at the same version
+    github.file_cache.put(("src/a.py", ""), git_blob_sha("def a(): pass\n"), "def a(): pass\n")
+    index = RepoIndex()
+
+    async def scenario():
+        try:
+            first = await index.update_from_github(github)
+            index.remove_file("src/b.py")
+            second = await index.update_from_github(github)
+            return first, second
+        finally:
+            await github.client.aclose()
+    assert asyncio.run(scenario()) == (2, 1)
+    assert tree.blob_requests == [git_blob_sha("def b(): pass\n")]
+    assert index.definitions("b") == [("src/b.py", 1)]
+
+def test_index_is_off_by_default():
+    assert SharedMemory(store=InMemoryTaskStore()).index is None
+
+def test_related_context_keeps_files_named_only_by_path(blobs):
+    index = RepoIndex()
+    index.update_file("app.py", "def handler(request):\n    return request.body\n")
+    memory = SharedMemory(store=InMemoryTaskStore(), index=index)
+    memory.add_task(Task(id="named", type="code", description="fix handler in app.py",
+                         context=[CodeContext(file_path="app.py")]))
+    memory.add_task(Task(id="attached", type="code", description="fix handler in app.py",
+                         context=[CodeContext(file_path="app.py", content="def handler(): pass\n")]))
+    assert [ctx.file_path for ctx in memory.get_related_context("named")] == ["app.py"]
+    assert memory.get_related_context("attached") == []
+    # Once the caller has loaded the file, its chunks would only repeat it
+    loaded = [CodeContext(file_path="app.py", content="def handler(): pass\n")]
+    assert memory.get_related_context("named", contexts=loaded) == []
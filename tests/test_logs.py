@@ -0,0 +1,84 @@
+import pytest
+
+from src.core.logs import MAX_LINE_LENGTH, TAIL_LINES, LogErrorExtractor
+
+def extract(lines, **options):
+    extractor = LogErrorExtractor(**{"before": 2, "after": 2, "max_regions": 10, "max_region_lines": 100, **options})
+    for line in lines:
+        extractor.feed(line + "\n")
+    return extractor
+
+def filler(count, prefix="step"):
+    return [f"{prefix} {i} ok" for i in range(count)]
+
+@pytest.mark.parametrize("line", [
+    "Traceback (most recent call last):",
+    "ModuleNotFoundError: No module named 'foo'",
+    "ERROR: Could not find a version that satisfies the requirement",
+    "error[E0425]: cannot find value `x` in this scope",
+    "src/app.ts(3,5): error TS2304: Cannot find name 'x'.",
+    "thread 'main' panicked at src/main.rs:2:5: panic: boom",
+    "npm ERR! code ERESOLVE",
+    "Process exited with code 1",
+    "Build FAILED",
+    "the command returned a non-zero exit status"
+])
+def test_error_patterns_open_a_region(line):
+    assert len(extract(filler(5) + [line] + filler(5)).regions) == 1
+
+@pytest.mark.parametrize("line", [
+    "Exited with code 0",
+    "Collecting errors-helper==1.0",
+    "Resolved 120 packages"
+])
+def test_ordinary_lines_do_not_match(line):
+    assert extract([line]).regions == []
+
+def test_region_keeps_context_before_and_after():
+    lines = filler(10) + ["ValueError: bad"] + filler(10, "after")
+    [region] = extract(lines).regions
+    assert region["start"] == 9
+    assert region["lines"] == ["step 8 ok", "step 9 ok", "ValueError: bad", "after 0 ok", "after 1 ok"]
+
+def test_nearby_errors_extend_one_region():
+    lines = ["Error: one", "step ok", "Error: two"] + filler(5)
+    extractor = extract(lines)
+    assert len(extractor.regions) == 1
+    assert extractor.error_lines == 2
+    assert extractor.first_error == "Error: one"
+
+def test_distant_errors_get_separate_regions():
+    lines = ["Error: one"] + filler(10) + ["Error: two"]
+    assert len(extract(lines).regions) == 2
+
+def test_max_regions():
+    lines = []
+    for i in range(5):
+        lines += [f"Error: {i}"] + filler(10)
+    extractor = extract(lines, max_regions=3)
+    assert len(extractor.regions) == 3
+    assert extractor.error_lines == 5
+
+def test_region_lines_are_capped():
+    lines = [f"Error: {i}" for i in range(10)]
+    extractor = extract(lines, max_region_lines=4)
+    [region] = extractor.regions
+    assert len(region["lines"]) == 4
+    assert region["truncated"] == 6
+    assert "lines 1-10" in extractor.format()
+    assert "(6 more lines)" in extractor.format()
+
+def test_tail_is_kept_when_no_errors_match():
+    extractor = extract(filler(50))
+    output = extractor.format()
+    assert f"last {TAIL_LINES} lines" in output
+    assert "step 49 ok" in output
+    assert "step 29 ok" not in output
+
+def test_long_lines_are_truncated():
+    extractor = extract(["Error: " + "x" * (MAX_LINE_LENGTH * 2)])
+    assert len(extractor.regions[0]["lines"][0]) == MAX_LINE_LENGTH
+
+def test_summary_counts_lines_and_regions():
+    extractor = extract(filler(3) + ["Error: boom"])
+    assert extractor.summary() == "4 log lines, 1 matching error patterns in 1 region(s); first error: Error: boom"
@@ -0,0 +1,69 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src import main
+from src.core.workqueue import LocalWorkQueue
+from src.services import Services
+
+@pytest.fixture
+def services(monkeypatch):
+    services = Services(warm_up=False)
+    monkeypatch.setattr(main, "services", services)
+    return services
+
+@pytest.fixture
+def client(services):
+    # Queues without workers, so submitted tasks stay pending
+    services.task_queue.work = LocalWorkQueue(list(services.task_queue._handlers), maxsize=2)
+    services.task_queue.work.start()
+    return TestClient(main.app)
+
+def test_railway_failures_without_an_error_are_not_merged(client, services):
+    for build in ("b1", "b2"):
+        response = client.post("/webhooks/railway", json={"id": build, "status": "failed"})
+        assert response.json() == {"status": "accepted"}
+    assert sorted(services.webhooks._pending) == ["railway:b1", "railway:b2"]
+
+def test_metrics_scrape_builds_no_services(services):
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert 'codertool_cache_hits_total{cache="response"} 0' in response.text
+    assert not any(services.built(name) for name in ("task_queue", "cache", "github"))
+
+def test_batch_rejects_duplicates_and_invalid_types(client, services):
+    response = client.post("/tasks/batch", json=[
+        {"id": "a", "type": "code", "description": "x", "context": []},
+        {"id": "a", "type": "code", "description": "y", "context": []},
+        {"id": "b", "type": "poetry", "description": "z", "context": []}
+    ])
+    assert response.status_code == 202
+    assert response.json() == [
+        {"id": "a", "status": "pending"},
+        {"id": "a", "status": "rejected", "error": "Duplicate task id"},
+        {"id": "b", "status": "rejected", "error": "Invalid task type"}
+    ]
+    # The duplicate did not overwrite the accepted task
+    assert services.memory.get_task("a").description == "x"
+    assert services.memory.get_task("b") is None
+
+def test_batch_fails_tasks_the_queue_cannot_hold(client, services):
+    response = client.post("/tasks/batch", json=[
+        {"id": f"t{i}", "type": "code", "description": "x", "context": []} for i in range(3)
+    ])
+    assert [result["status"] for result in response.json()] == ["pending", "pending", "failed"]
+    assert services.memory.get_task("t2").status == "failed"
+
+def test_single_task_is_refused_when_the_queue_is_full(client):
+    for i in range(2):
+        assert client.post("/tasks", json={"id": f"t{i}", "type": "code", "description": "x", "context": []}).status_code == 202
+    response = client.post("/tasks", json={"id": "t2", "type": "code", "description": "x", "context": []})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_bulk_status_without_a_trailing_slash(client):
+    client.post("/tasks/batch", json=[{"id": "a", "type": "code", "description": "x", "context": []}])
+    response = client.get("/tasks?ids=a,missing,a", follow_redirects=False)
+    assert response.status_code == 200
+    assert [(task["id"], task["status"]) for task in response.json()] == [
+        ("a", "pending"), ("missing", "not_found"), ("a", "pending")
+    ]
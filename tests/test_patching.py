@@ -0,0 +1,148 @@
+import pytest
+
+from src.core.patching import Hunk, PatchConflict, apply_hunks, apply_patch, parse_patch
+
+SOURCE = """def f():
+    x = 1
+    return x
+
+def g():
+    return None
+"""
+
+def search_replace(path, search, replace):
+    return f"{path}\n<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+def test_parse_search_replace_blocks():
+    text = "Here you go:\n\n" + search_replace("src/a.py", "x = 1", "x = 2") + "\n" + search_replace("./src/b.py", "y", "z")
+    patches = parse_patch(text)
+    assert [patch.path for patch in patches] == ["src/a.py", "src/b.py"]
+    assert patches[0].hunks[0].before == ["x = 1"]
+    assert patches[0].hunks[0].after == ["x = 2"]
+
+def test_consecutive_blocks_reuse_path():
+    text = (
+        "src/a.py\n<<<<<<< SEARCH\na\n=======\nb\n>>>>>>> REPLACE\n"
+        "<<<<<<< SEARCH\nc\n=======\nd\n>>>>>>> REPLACE\n"
+    )
+    patches = parse_patch(text)
+    assert len(patches) == 1
+    assert len(patches[0].hunks) == 2
+
+def test_parse_unified_diff():
+    text = """--- a/src/a.py
++++ b/src/a.py
+@@ -1,3 +1,3 @@
+ def f():
+-    x = 1
++    x = 2
+     return x
+"""
+    [patch] = parse_patch(text)
+    [hunk] = patch.hunks
+    assert patch.path == "src/a.py"
+    assert hunk.line == 1
+    assert (hunk.leading, hunk.trailing) == (1, 1)
+
+def test_parse_deleted_file():
+    [patch] = parse_patch("--- a/old.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-x\n")
+    assert patch.delete
+
+def test_exact_replacement():
+    [patch] = parse_patch(search_replace("a.py", "    x = 1", "    x = 2"))
+    assert apply_patch([patch], {"a.py": SOURCE})["a.py"] == SOURCE.replace("x = 1", "x = 2")
+
+def test_whitespace_insensitive_match():
+    [patch] = parse_patch(search_replace("a.py", "  x  =  1", "    x = 2"))
+    assert "    x = 2" in apply_patch([patch], {"a.py": SOURCE})["a.py"]
+
+def test_new_file():
+    [patch] = parse_patch("new.py\n<<<<<<< SEARCH\n=======\nprint('hi')\n>>>>>>> REPLACE\n")
+    assert apply_patch([patch], {"new.py": None}) == {"new.py": "print('hi')\n"}
+
+def test_missing_hunk_conflicts():
+    [patch] = parse_patch(search_replace("a.py", "    y = 3", "    y = 4"))
+    with pytest.raises(PatchConflict, match="not found"):
+        apply_patch([patch], {"a.py": SOURCE})
+
+def test_ambiguous_without_line_number_conflicts():
+    [patch] = parse_patch(search_replace("a.py", "    return x", "    return -x"))
+    content = SOURCE + "\ndef h():\n    return x\n"
+    with pytest.raises(PatchConflict, match="more than once"):
+        apply_patch([patch], {"a.py": content})
+
+def test_line_number_picks_between_matches():
+    content = "a\nreturn x\nb\nreturn x\nc\n"
+    hunk = Hunk(["return x"], ["return y"], line=4)
+    assert apply_hunks("a.py", content, [hunk]) == "a\nreturn x\nb\nreturn y\nc\n"
+
+def test_offsets_from_earlier_hunks():
+    content = "".join(f"line {i}\n" for i in range(1, 11))
+    first = Hunk(["line 2"], ["line 2", "inserted", "inserted"], line=2, leading=1)
+    # Line 8 of the original is line 10 once the first hunk has applied
+    second = Hunk(["line 8"], ["line eight"], line=8)
+    result = apply_hunks("a.py", content, [first, second]).splitlines()
+    assert result[3] == "inserted"
+    assert result[9] == "line eight"
+
+def test_fuzz_drops_stale_context():
+    text = """--- a/a.py
++++ b/a.py
+@@ -1,5 +1,5 @@
+ def f():
+-    x = 1
++    x = 2
+     return x
+ 
+ def stale():
+"""
+    # The last context line no longer exists; trimming it lets the hunk apply
+    [patch] = parse_patch(text)
+    assert "    x = 2" in apply_patch([patch], {"a.py": SOURCE})["a.py"]
+
+def test_drifted_line_numbers_still_apply():
+    text = """--- a/a.py
++++ b/a.py
+@@ -40,3 +40,3 @@
+ def f():
+-    x = 1
++    x = 2
+     return x
+"""
+    [patch] = parse_patch(text)
+    assert "    x = 2" in apply_patch([patch], {"a.py": SOURCE})["a.py"]
+
+def test_overlapping_hunks_conflict():
+    first = Hunk(["    x = 1", "    return x"], ["    x = 2", "    return x"])
+    second = Hunk(["    x = 2"], ["    x = 3"])
+    with pytest.raises(PatchConflict, match="overlaps"):
+        apply_hunks("a.py", SOURCE, [first, second])
+
+def test_all_or_nothing_across_files():
+    good = parse_patch(search_replace("a.py", "    x = 1", "    x = 2"))
+    bad = parse_patch(search_replace("b.py", "missing", "present"))
+    with pytest.raises(PatchConflict) as info:
+        apply_patch(good + bad, {"a.py": SOURCE, "b.py": SOURCE})
+    assert len(info.value.conflicts) == 1
+    assert info.value.conflicts[0].startswith("b.py")
+
+def test_reapplying_is_idempotent():
+    [patch] = parse_patch(search_replace("a.py", "def f():\n    x = 1", "def f():\n    x = 2"))
+    once = apply_patch([patch], {"a.py": SOURCE})["a.py"]
+    assert apply_patch([patch], {"a.py": once}) == {}
+
+def test_reapplied_insertion_is_not_duplicated():
+    [patch] = parse_patch(search_replace("a.py", "def g():", "def g():\n    '''Doc'''"))
+    once = apply_patch([patch], {"a.py": SOURCE})["a.py"]
+    assert apply_patch([patch], {"a.py": once}) == {}
+
+def test_replacement_elsewhere_is_not_already_applied():
+    # `    return None` exists in g(), but not where this hunk would put it
+    [patch] = parse_patch(search_replace("a.py", "def h():\n    y = other()", "    return None"))
+    with pytest.raises(PatchConflict, match="not found"):
+        apply_patch([patch], {"a.py": SOURCE})
+
+def test_deleting_files_is_a_conflict():
+    [patch] = parse_patch("--- a/a.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-x\n")
+    with pytest.raises(PatchConflict, match="not supported"):
+        apply_patch([patch], {"a.py": "x\n"})
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.agents.base import BaseAgent
+from src.core.cache import ResponseCache
+from src.core.config import settings
+from src.core.memory import SharedMemory
+from src.core.routing import TIER_MAX_OUTPUT, TIERS, ModelRouter
+from src.core.storage import InMemoryTaskStore
+
+MESSAGES = [{"role": "user", "content": "Change x"}]
+
+class FakeClaude:
+    """Client whose smaller models always answer with an invalid patch"""
+
+    def __init__(self):
+        self.models = []
+
+    async def create_message(self, model, **kwargs):
+        self.models.append(model)
+        text = "valid patch" if model == settings.CLAUDE_MODELS["opus"] else "no patch"
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+def test_code_route_escalates_to_opus():
+    router = ModelRouter()
+    route = router.route("code", MESSAGES)
+    assert route.tier == "sonnet"
+    assert router.escalate(route).tier == "opus"
+    assert router.escalate(router.escalate(route)) is None
+
+def test_every_tier_has_a_model_price_and_output_limit():
+    for tier in TIERS:
+        assert settings.CLAUDE_MODELS[tier] and settings.CLAUDE_PRICES[tier]
+        assert TIER_MAX_OUTPUT[tier] >= settings.ROUTING_POLICY["code"]["max_tokens_cap"]
+
+def test_escalation_keeps_max_tokens():
+    router = ModelRouter()
+    route = router.route("code", MESSAGES, max_tokens=8000)
+    assert router.escalate(route).max_tokens == 8000
+
+def test_rejected_response_is_escalated_and_not_cached():
+    claude = FakeClaude()
+    cache = ResponseCache()
+    agent = BaseAgent(SharedMemory(store=InMemoryTaskStore()), client=claude, cache=cache)
+
+    def call():
+        return agent.call_claude(MESSAGES, route="code", validate=lambda text: text == "valid patch")
+    assert asyncio.run(call()) == "valid patch"
+    assert asyncio.run(call()) == "valid patch"
+    sonnet, opus = settings.CLAUDE_MODELS["sonnet"], settings.CLAUDE_MODELS["opus"]
+    # The second call asks Sonnet again and finds Opus's answer in the cache
+    assert claude.models == [sonnet, opus, sonnet]
+    assert cache.stats()["entries"] == 1
+
+class RecordingClaude:
+    def __init__(self):
+        self.requests = []
+
+    async def create_message(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text="ok")])
+
+def send(route, context):
+    claude = RecordingClaude()
+    agent = BaseAgent(SharedMemory(store=InMemoryTaskStore()), client=claude, cache=ResponseCache())
+    messages = [{"role": "system", "content": "You are a reviewer."}, {"role": "user", "content": "Task: x"}]
+    asyncio.run(agent.call_claude(messages, route=route, use_cache=False, context=context))
+    [request] = claude.requests
+    return request
+
+def breakpoints(request):
+    blocks = request["system"] + request["messages"][0]["content"]
+    return [block["text"][:10] for block in blocks if "cache_control" in block]
+
+def test_context_goes_ahead_of_the_instructions():
+    request = send("code", "Context: files")
+    assert [block["text"] for block in request["messages"][0]["content"]] == ["Context: files", "Task: x"]
+
+def test_short_prefixes_get_no_breakpoint():
+    assert breakpoints(send("code", "Context: files")) == []
+
+def test_long_context_gets_a_breakpoint_on_models_that_cache_it():
+    context = "Context: " + "def f(): pass\n" * 400  # About 1400 tokens
+    assert breakpoints(send("code", context)) == ["Context: d"]
+    # Haiku needs a longer prefix
+    assert breakpoints(send("review", context)) == []
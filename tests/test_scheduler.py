@@ -0,0 +1,161 @@
+import asyncio
+
+from src.core.memory import SharedMemory, Task
+from src.core.scheduler import DagScheduler
+from src.core.storage import InMemoryTaskStore
+
+def make_task(task_id, depends_on=(), parent_task_id="parent"):
+    return Task(id=task_id, type="code", description=task_id, context=[],
+                metadata={"depends_on": list(depends_on)}, parent_task_id=parent_task_id)
+
+class Harness:
+    """A scheduler whose handler completes tasks unless told to fail them"""
+
+    def __init__(self, fail=(), hold=()):
+        self.memory = SharedMemory(store=InMemoryTaskStore())
+        self.fail = set(fail)
+        self.hold = {task_id: asyncio.Event() for task_id in hold}
+        self.started = []
+        self.scheduler = DagScheduler(self.memory, self.execute, limit=4)
+
+    async def execute(self, task: Task):
+        self.started.append(task.id)
+        if task.id in self.hold:
+            await self.hold[task.id].wait()
+        self.memory.update_task_status(task.id, "failed" if task.id in self.fail else "completed")
+
+    def parent_with(self, *children):
+        parent = make_task("parent", parent_task_id=None)
+        self.memory.add_task(parent)
+        for child in children:
+            self.memory.add_task(child)
+            parent.subtasks.append(child.id)
+        return parent
+
+    def add(self, parent, child):
+        """Store a child and add it to the parent's open run, as agents do"""
+        self.memory.add_task(child)
+        parent.subtasks.append(child.id)
+        self.scheduler.open(parent).add(child)
+
+    def status(self, task_id):
+        return self.memory.get_task(task_id).status
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+def test_dependencies_run_in_order():
+    async def scenario():
+        harness = Harness()
+        parent = harness.parent_with(
+            make_task("c", depends_on=["b"]),
+            make_task("b", depends_on=["a"]),
+            make_task("a")
+        )
+        await harness.scheduler.run_children(parent)
+        return harness
+    harness = run(scenario())
+    assert harness.started == ["a", "b", "c"]
+    assert harness.status("parent") == "completed"
+
+def test_independent_children_run_concurrently():
+    async def scenario():
+        harness = Harness(hold=["a"])
+        parent = harness.parent_with(make_task("a"), make_task("b"))
+        runner = asyncio.create_task(harness.scheduler.run_children(parent))
+        while "b" not in harness.started:
+            await asyncio.sleep(0)
+        # b finished while a is still running
+        assert harness.status("b") == "completed"
+        harness.hold["a"].set()
+        await runner
+        return harness
+    assert run(scenario()).status("parent") == "completed"
+
+def test_failed_dependency_cancels_dependents_only():
+    async def scenario():
+        harness = Harness(fail=["a"])
+        parent = harness.parent_with(
+            make_task("a"),
+            make_task("b", depends_on=["a"]),
+            make_task("c", depends_on=["b"]),
+            make_task("d")
+        )
+        await harness.scheduler.run_children(parent)
+        return harness
+    harness = run(scenario())
+    assert harness.status("b") == "cancelled"
+    assert harness.status("c") == "cancelled"
+    assert harness.status("d") == "completed"
+    assert harness.status("parent") == "failed"
+
+def test_unknown_dependency_and_cycle_are_cancelled_at_seal():
+    async def scenario():
+        harness = Harness()
+        parent = harness.parent_with(
+            make_task("a", depends_on=["missing"]),
+            make_task("b", depends_on=["c"]),
+            make_task("c", depends_on=["b"]),
+            make_task("d")
+        )
+        await harness.scheduler.run_children(parent)
+        return harness
+    harness = run(scenario())
+    assert harness.started == ["d"]
+    assert [harness.status(task_id) for task_id in "abc"] == ["cancelled"] * 3
+    assert harness.status("parent") == "failed"
+
+def test_children_added_before_seal_start_immediately():
+    async def scenario():
+        harness = Harness()
+        parent = harness.parent_with()
+        # The dependency arrives later; until the seal, the child waits for it
+        harness.add(parent, make_task("b", depends_on=["a"]))
+        await asyncio.sleep(0.01)
+        assert harness.started == []
+        harness.add(parent, make_task("a"))
+        await asyncio.sleep(0.01)
+        assert harness.started == ["a", "b"]
+        await harness.scheduler.run_children(parent)
+        return harness
+    assert run(scenario()).status("parent") == "completed"
+
+def test_cancel_cancels_running_and_waiting_children():
+    async def scenario():
+        harness = Harness(hold=["a"])
+        parent = harness.parent_with(make_task("a"), make_task("b", depends_on=["a"]))
+        runner = asyncio.create_task(harness.scheduler.run_children(parent))
+        while "a" not in harness.started:
+            await asyncio.sleep(0)
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        return harness
+    harness = run(scenario())
+    assert harness.status("a") == "cancelled"
+    assert harness.status("b") == "cancelled"
+    assert harness.status("parent") == "cancelled"
+
+def test_discard_cancels_a_partially_built_run():
+    async def scenario():
+        harness = Harness(hold=["a"])
+        parent = harness.parent_with()
+        harness.add(parent, make_task("a"))
+        await asyncio.sleep(0)
+        harness.scheduler.discard(parent)
+        return harness
+    harness = run(scenario())
+    assert harness.status("a") == "cancelled"
+    assert harness.status("parent") == "cancelled"
+
+def test_concurrency_limit():
+    async def scenario():
+        harness = Harness(hold=["a", "b", "c", "d", "e"])
+        parent = harness.parent_with(*(make_task(task_id) for task_id in "abcde"))
+        runner = asyncio.create_task(harness.scheduler.run_children(parent))
+        await asyncio.sleep(0.01)
+        assert len(harness.started) == 4
+        for event in harness.hold.values():
+            event.set()
+        await runner
+        return harness
+    assert run(scenario()).status("parent") == "completed"
@@ -0,0 +1,182 @@
+import sqlite3
+
+import pytest
+
+from src.core.memory import Task
+from src.core.storage import InMemoryTaskStore, SQLiteTaskStore
+
+def make_task(task_id, type="code", status="pending", parent_task_id=None):
+    return Task(id=task_id, type=type, description=task_id, context=[],
+                status=status, parent_task_id=parent_task_id)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryTaskStore()
+    else:
+        store = SQLiteTaskStore(Task, path=str(tmp_path / "tasks.db"), batch_size=100, flush_interval=3600)
+        yield store
+        store.close()
+
+def ids(tasks):
+    return sorted(task.id for task in tasks)
+
+def test_put_and_get(store):
+    task = make_task("a")
+    store.put(task)
+    assert store.get("a").description == "a"
+    assert store.get("missing") is None
+
+def test_get_many_skips_missing(store):
+    store.put_many([make_task("a"), make_task("b")])
+    assert sorted(store.get_many(["a", "b", "c"])) == ["a", "b"]
+
+def test_find_by_indexed_fields(store):
+    store.put_many([
+        make_task("a", type="code"),
+        make_task("b", type="review"),
+        make_task("c", type="code", status="completed", parent_task_id="a"),
+        make_task("d", type="code", parent_task_id="a")
+    ])
+    assert ids(store.find(type="code")) == ["a", "c", "d"]
+    assert ids(store.find(status="pending", type="code")) == ["a", "d"]
+    assert ids(store.find(parent_task_id="a")) == ["c", "d"]
+    assert store.find(type="fix") == []
+    assert len(store.find()) == 4
+    assert len(store.find(type="code", limit=2)) == 2
+
+def test_status_update_moves_task_between_index_entries(store):
+    store.put(make_task("a"))
+    store.update_status("a", "completed")
+    assert store.find(status="pending") == []
+    assert ids(store.find(status="completed")) == ["a"]
+    assert store.get_status("a") == "completed"
+
+def test_reput_reindexes_changed_fields(store):
+    task = make_task("a")
+    store.put(task)
+    task.parent_task_id = "p"
+    store.put(task)
+    assert store.find(parent_task_id=None) == []
+    assert ids(store.find(parent_task_id="p")) == ["a"]
+
+def test_sqlite_rejects_unindexed_filter(tmp_path):
+    store = SQLiteTaskStore(Task, path=str(tmp_path / "tasks.db"))
+    with pytest.raises(ValueError):
+        store.find(description="a")
+    store.close()
+
+def test_sqlite_batches_writes_until_batch_size(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    store = SQLiteTaskStore(Task, path=path, batch_size=3, flush_interval=3600)
+    reader = SQLiteTaskStore(Task, path=path)
+    store.put(make_task("a"))
+    store.put(make_task("b"))
+    # Buffered writes are visible to the writer but not yet committed
+    assert store.get("a") is not None
+    assert reader.get("a") is None
+    store.put(make_task("c"))
+    assert ids(reader.get_many(["a", "b", "c"]).values()) == ["a", "b", "c"]
+    store.close()
+    reader.close()
+
+def test_sqlite_flushes_after_interval(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    store = SQLiteTaskStore(Task, path=path, batch_size=100, flush_interval=0)
+    reader = SQLiteTaskStore(Task, path=path)
+    store.put(make_task("a"))
+    assert reader.get("a") is not None
+    store.close()
+    reader.close()
+
+def test_sqlite_returns_held_task_as_same_object(tmp_path):
+    store = SQLiteTaskStore(Task, path=str(tmp_path / "tasks.db"), batch_size=1)
+    task = make_task("a")
+    store.put(task)
+    assert store.get("a") is task
+    assert store.find(type="code")[0] is task
+    # In-place edits to the held object are saved with the next write
+    task.subtasks.append("b")
+    store.update_status("a", "in_progress")
+    store.close()
+    reopened = SQLiteTaskStore(Task, path=str(tmp_path / "tasks.db"))
+    loaded = reopened.get("a")
+    assert loaded.subtasks == ["b"]
+    assert loaded.status == "in_progress"
+    reopened.close()
+
+def test_sqlite_status_only_update_of_unloaded_task(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    writer = SQLiteTaskStore(Task, path=path, batch_size=1)
+    writer.put(make_task("a"))
+    other = SQLiteTaskStore(Task, path=path, batch_size=100, flush_interval=3600)
+    other.update_status("a", "completed")
+    assert other.get_status("a") == "completed"
+    assert other.get("a").status == "completed"
+    other.flush()
+    # get_status reads the column, not the writer's held copy
+    assert writer.get_status("a") == "completed"
+    writer.close()
+    other.close()
+
+def test_sqlite_stale_write_does_not_revert_another_process(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    worker = SQLiteTaskStore(Task, path=path, batch_size=1)
+    ingestor = SQLiteTaskStore(Task, path=path, batch_size=1)
+    worker.put(make_task("a", status="in_progress"))
+    stale = ingestor.get("a")
+    running = worker.get("a")
+    running.metadata["result"] = {"status": "success"}
+    worker.update_status("a", "completed")
+    stale.description = "edited"
+    ingestor.put(stale)
+    # The stale copy was reloaded instead of overwriting the row
+    assert stale.status == "completed"
+    assert stale.metadata["result"] == {"status": "success"}
+    reader = SQLiteTaskStore(Task, path=path)
+    assert reader.get("a").status == "completed"
+    # ... and writes from the reloaded copy succeed again
+    stale.description = "edited"
+    ingestor.put(stale)
+    assert SQLiteTaskStore(Task, path=path).get("a").description == "edited"
+    for store in (worker, ingestor, reader):
+        store.close()
+
+def test_sqlite_append_metadata_keeps_status(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    worker = SQLiteTaskStore(Task, path=path, batch_size=1)
+    ingestor = SQLiteTaskStore(Task, path=path, batch_size=1)
+    worker.put(make_task("a", status="in_progress"))
+    ingestor.get("a")
+    worker.update_status("a", "completed")
+    ingestor.append_metadata("a", "deliveries", "d1")
+    ingestor.append_metadata("a", "deliveries", "d2")
+    loaded = SQLiteTaskStore(Task, path=path).get("a")
+    assert loaded.status == "completed"
+    assert loaded.metadata["deliveries"] == ["d1", "d2"]
+    # The holder's copy sees its own appends
+    assert ingestor.get("a").metadata["deliveries"] == ["d1", "d2"]
+    worker.close()
+    ingestor.close()
+
+def test_sqlite_adds_version_column_to_old_databases(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE tasks (id TEXT PRIMARY KEY, type TEXT NOT NULL, status TEXT NOT NULL, "
+        "parent_task_id TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+    )
+    db.execute("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?)",
+               ("a", "code", "pending", None, make_task("a").model_dump_json(), 0))
+    db.commit()
+    db.close()
+    store = SQLiteTaskStore(Task, path=path, batch_size=1)
+    store.update_status("a", "completed")
+    assert SQLiteTaskStore(Task, path=path).get_status("a") == "completed"
+    store.close()
+
+def test_append_metadata_in_memory():
+    store = InMemoryTaskStore()
+    store.put(make_task("a"))
+    store.append_metadata("a", "deliveries", "d1")
+    assert store.get("a").metadata == {"deliveries": ["d1"]}
@@ -0,0 +1,94 @@
+import asyncio
+
+from pydantic import BaseModel
+
+from src.agents.architect import ArchitectAgent
+from src.core.memory import SharedMemory, Task
+from src.core.scheduler import DagScheduler
+from src.core.storage import InMemoryTaskStore
+from src.core.structured import JsonArrayParser, validate_items
+
+class Item(BaseModel):
+    name: str
+
+def feed_chunks(text, size):
+    parser = JsonArrayParser()
+    elements = []
+    for i in range(0, len(text), size):
+        elements.extend(parser.feed(text[i:i + size]))
+    return parser, elements
+
+def test_elements_arrive_as_soon_as_complete():
+    parser = JsonArrayParser()
+    assert parser.feed('[{"name": "a"}, {"na') == [(0, {"name": "a"})]
+    assert parser.feed('me": "b"}') == [(1, {"name": "b"})]
+    assert parser.feed("]") == []
+    assert parser.done
+
+def test_any_chunking_gives_the_same_elements():
+    text = '```json\n[{"a": [1, {"b": "]}"}]}, "x,y", 3, true, null]\n```'
+    expected = [(0, {"a": [1, {"b": "]}"}]}), (1, "x,y"), (2, 3), (3, True), (4, None)]
+    for size in (1, 2, 7, len(text)):
+        assert feed_chunks(text, size)[1] == expected
+
+def test_escaped_quotes_and_brackets_in_strings():
+    _, elements = feed_chunks(r'[{"s": "he said \"[no]\" {ok}"}]', 3)
+    assert elements == [(0, {"s": 'he said "[no]" {ok}'})]
+
+def test_prose_around_the_array_is_ignored():
+    _, elements = feed_chunks('Here is the plan:\n[1, 2]\nLet me know [3]', 4)
+    assert elements == [(0, 1), (1, 2)]
+
+def test_invalid_elements_are_skipped_but_keep_their_index():
+    parser, elements = feed_chunks('[{"name": "a"}, {oops}, {"name": "c"}]', 5)
+    assert elements == [(0, {"name": "a"}), (2, {"name": "c"})]
+    assert parser.errors == 1
+    assert parser.count == 3
+
+def test_reset_starts_over():
+    parser = JsonArrayParser()
+    parser.feed('[{"name": "a"}, {"name": ')
+    parser.reset()
+    assert parser.feed('[{"name": "b"}]') == [(0, {"name": "b"})]
+
+def test_validate_items_drops_elements_that_dont_fit():
+    items = [(0, {"name": "a"}), (1, {"other": 1}), (2, {"name": "c"})]
+    assert validate_items(items, Item) == [(0, Item(name="a")), (2, Item(name="c"))]
+
+class ScriptedArchitect(ArchitectAgent):
+    """Architect whose Claude response is fixed and streamed in small chunks"""
+
+    def __init__(self, memory, scheduler, response):
+        super().__init__(memory, scheduler=scheduler)
+        self.response = response
+
+    async def call_claude(self, messages, on_text=None, validate=None, **kwargs):
+        for i in range(0, len(self.response), 5):
+            on_text(self.response[i:i + 5])
+        validate(self.response)
+        return self.response
+
+def test_dependencies_survive_an_invalid_subtask():
+    async def scenario():
+        memory = SharedMemory(store=InMemoryTaskStore())
+
+        async def execute(task):
+            memory.update_task_status(task.id, "completed")
+
+        scheduler = DagScheduler(memory, execute)
+        response = (
+            '[{"context": "not a list"},'
+            ' {"description": "B"},'
+            ' {"description": "C", "depends_on": [1]}]'
+        )
+        architect = ScriptedArchitect(memory, scheduler, response)
+        task = Task(id="t", type="architecture", description="plan", context=[])
+        memory.add_task(task)
+        await architect.handle_task(task)
+        await scheduler.run_children(task)
+        return memory, task
+    memory, task = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert task.subtasks == ["t_subtask_1", "t_subtask_2"]
+    assert memory.get_task("t_subtask_2").metadata["depends_on"] == ["t_subtask_1"]
+    assert memory.get_task("t_subtask_2").status == "completed"
+    assert task.status == "completed"
@@ -0,0 +1,96 @@
+import asyncio
+
+from src.agents.reviewer import ReviewerAgent
+from src.core.memory import SharedMemory, Task
+from src.core.storage import InMemoryTaskStore
+from src.core.webhooks import WebhookIngestor
+
+def failure(build_id, error="ValueError: boom"):
+    return {
+        "id": f"fix_{build_id}",
+        "description": "Review Railway build failure",
+        "error": error,
+        "metadata": {"source": "railway", "build_id": build_id}
+    }
+
+class Harness:
+    def __init__(self, window=0.01):
+        self.memory = SharedMemory(store=InMemoryTaskStore())
+        self.submitted = []
+        self.ingestor = WebhookIngestor(self.memory, self.submitted.append, window=window)
+
+def test_burst_becomes_one_task_and_redeliveries_are_dropped():
+    async def scenario():
+        harness = Harness()
+        statuses = [
+            harness.ingestor.ingest("d1", "fp", failure("b1")),
+            harness.ingestor.ingest("d1", "fp", failure("b1")),
+            harness.ingestor.ingest("d2", "fp", failure("b2", "ValueError: again"))
+        ]
+        await asyncio.sleep(0.05)
+        return harness, statuses
+    harness, statuses = asyncio.run(scenario())
+    assert statuses == ["accepted", "duplicate", "coalesced"]
+    [task] = harness.submitted
+    assert task.id == "fix_b2"
+    assert [ctx.error_message for ctx in task.context] == ["ValueError: boom", "ValueError: again"]
+    assert task.metadata["deliveries"] == ["d1", "d2"]
+
+def test_events_attach_to_an_unfinished_task():
+    async def scenario():
+        harness = Harness()
+        harness.ingestor.ingest("d1", "fp", failure("b1"))
+        await asyncio.sleep(0.05)
+        status = harness.ingestor.ingest("d2", "fp", failure("b2"))
+        return harness, status
+    harness, status = asyncio.run(scenario())
+    assert status == "coalesced"
+    assert harness.submitted[0].metadata["deliveries"] == ["d1", "d2"]
+
+def test_close_defers_acknowledged_groups_and_resume_submits_them():
+    async def scenario():
+        harness = Harness(window=60)
+        harness.ingestor.ingest("d1", "fp", failure("b1"))
+        harness.ingestor.close()
+        return harness
+    harness = asyncio.run(scenario())
+    assert harness.submitted == []
+    [task] = harness.memory.find_tasks(type="review")
+    assert task.status == "pending"
+    assert task.metadata["deferred"]
+
+    # The next process picks the task up on startup
+    restarted = WebhookIngestor(harness.memory, harness.submitted.append)
+    restarted.resume()
+    assert [submitted.id for submitted in harness.submitted] == ["fix_b1"]
+    assert "deferred" not in task.metadata
+    restarted.resume()
+    assert len(harness.submitted) == 1
+
+class FakeGitHub:
+    async def get_pull_request_files(self, number):
+        return [{"filename": "src/a.py", "status": "modified", "patch": "@@ -1 +1 @@\n-x = 1\n+x = 2"}]
+
+class ScriptedReviewer(ReviewerAgent):
+    def __init__(self, memory):
+        super().__init__(memory, github=FakeGitHub())
+        self.prompts = []
+
+    async def call_claude(self, messages, on_text=None, context=None, **kwargs):
+        self.prompts.append((context or "") + messages[-1]["content"])
+        response = '[{"description": "Change x back", "file_path": "src/a.py"}]'
+        if on_text:
+            on_text(response)
+        return response
+
+def test_pull_request_review_sees_the_diff_and_creates_no_fixes():
+    memory = SharedMemory(store=InMemoryTaskStore())
+    task = Task(id="review_pr_7", type="review", description="Review pull request #7", context=[],
+                metadata={"pull_request": 7})
+    memory.add_task(task)
+    reviewer = ScriptedReviewer(memory)
+    result = asyncio.run(reviewer.handle_task(task))
+    assert result["status"] == "success"
+    assert task.subtasks == []
+    assert task.status == "completed"
+    assert "+x = 2" in reviewer.prompts[0]
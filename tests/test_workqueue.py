@@ -0,0 +1,213 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.memory import SharedMemory, Task
+from src.core.queue import TaskQueue
+from src.core.storage import InMemoryTaskStore
+from src.core.workqueue import QueueFullError, SQLiteWorkQueue
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "work.db")
+
+def claim(queue, agent="coder"):
+    return asyncio.run(asyncio.wait_for(queue.claim(agent), 1))
+
+def test_claims_in_enqueue_order(path):
+    queue = SQLiteWorkQueue(path)
+    queue.put("coder", "a")
+    queue.put("coder", "b")
+    queue.put("reviewer", "c")
+    assert claim(queue).task_id == "a"
+    assert claim(queue).task_id == "b"
+    assert claim(queue, "reviewer").task_id == "c"
+
+def test_a_claimed_task_is_not_claimed_again(path):
+    first = SQLiteWorkQueue(path)
+    second = SQLiteWorkQueue(path)
+    first.put("coder", "a")
+    assert claim(first).task_id == "a"
+    assert second._try_claim("coder") is None
+
+def test_done_removes_the_task(path):
+    queue = SQLiteWorkQueue(path)
+    queue.put("coder", "a")
+    queue.done("coder", claim(queue))
+    assert queue._db.execute("SELECT COUNT(*) FROM work").fetchone() == (0,)
+
+def test_done_by_another_owner_is_ignored(path):
+    first = SQLiteWorkQueue(path)
+    second = SQLiteWorkQueue(path)
+    first.put("coder", "a")
+    second.done("coder", claim(first))
+    assert first._db.execute("SELECT COUNT(*) FROM work").fetchone() == (1,)
+
+def test_expired_lease_is_claimed_again_with_another_attempt(path):
+    dead = SQLiteWorkQueue(path, lease=0.01)
+    alive = SQLiteWorkQueue(path)
+    dead.put("coder", "a")
+    assert claim(dead).attempts == 1
+    time.sleep(0.02)
+    reclaimed = claim(alive)
+    assert reclaimed.task_id == "a"
+    assert reclaimed.attempts == 2
+
+def test_heartbeat_keeps_lease(path, monkeypatch):
+    monkeypatch.setattr("src.core.workqueue.settings.TASK_HEARTBEAT_INTERVAL", 0.01)
+    holder = SQLiteWorkQueue(path, lease=0.05)
+    other = SQLiteWorkQueue(path)
+    holder.put("coder", "a")
+
+    async def scenario():
+        holder.start()
+        await holder.claim("coder")
+        await asyncio.sleep(0.15)
+        stolen = other._try_claim("coder")
+        await holder.close()
+        return stolen
+    assert asyncio.run(scenario()) is None
+
+def test_close_releases_claims_without_counting_an_attempt(path):
+    first = SQLiteWorkQueue(path)
+    second = SQLiteWorkQueue(path)
+    first.put("coder", "a")
+    claim(first)
+    asyncio.run(first.close())
+    reclaimed = claim(second)
+    assert reclaimed.task_id == "a"
+    assert reclaimed.attempts == 1
+
+def test_put_raises_when_full(path):
+    queue = SQLiteWorkQueue(path, maxsize=2)
+    queue.put("coder", "a")
+    queue.put("coder", "b")
+    with pytest.raises(QueueFullError):
+        queue.put("coder", "c")
+    # Claimed tasks don't count towards the limit, and other agents have their own
+    claim(queue)
+    queue.put("coder", "c")
+    queue.put("reviewer", "d")
+
+def test_depth_counts_unclaimed_tasks(path):
+    queue = SQLiteWorkQueue(path)
+    for task_id in "abc":
+        queue.put("coder", task_id)
+    queue.put("devops", "d")
+    claim(queue)
+    assert queue.depth() == {"coder": 2, "devops": 1}
+
+def test_claim_waits_for_a_put(path, monkeypatch):
+    monkeypatch.setattr("src.core.workqueue.settings.TASK_POLL_INTERVAL", 10)
+    queue = SQLiteWorkQueue(path)
+
+    async def scenario():
+        waiting = asyncio.create_task(queue.claim("coder"))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        # A local put wakes the worker without waiting for the next poll
+        queue.put("coder", "a")
+        return await asyncio.wait_for(waiting, 1)
+    assert asyncio.run(scenario()).task_id == "a"
+
+def test_task_queue_fails_a_task_after_max_attempts(path, monkeypatch):
+    monkeypatch.setattr("src.core.queue.settings.TASK_MAX_ATTEMPTS", 2)
+    memory = SharedMemory(store=InMemoryTaskStore())
+    memory.add_task(Task(id="a", type="code", description="a", context=[]))
+    handled = []
+
+    async def handler(task):
+        handled.append(task.id)
+        return {}
+
+    # Two workers died holding the task
+    SQLiteWorkQueue(path).put("coder", "a")
+    for _ in range(2):
+        claim(SQLiteWorkQueue(path, lease=0.01))
+        time.sleep(0.02)
+
+    async def scenario():
+        queue = TaskQueue(memory)
+        queue.register("coder", ["code"], handler)
+        queue.work = SQLiteWorkQueue(path)
+        worker = asyncio.create_task(queue._worker("coder"))
+        while memory.get_task("a").status == "pending":
+            await asyncio.sleep(0.01)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+    asyncio.run(asyncio.wait_for(scenario(), 1))
+    assert handled == []
+    assert memory.get_task("a").status == "failed"
+
+def test_parent_claim_is_held_until_its_subtasks_finish(path):
+    memory = SharedMemory(store=InMemoryTaskStore())
+    release = asyncio.Event()
+
+    async def plan(task):
+        child = Task(id="child", type="code", description="child", context=[], parent_task_id=task.id)
+        memory.add_task(child)
+        task.subtasks.append(child.id)
+        return {}
+
+    async def code(task):
+        await release.wait()
+        memory.update_task_status(task.id, "completed")
+        return {}
+
+    async def scenario():
+        queue = TaskQueue(memory)
+        queue.register("architect", ["architecture"], plan)
+        queue.register("coder", ["code"], code)
+        queue.work = SQLiteWorkQueue(path)
+        memory.add_task(Task(id="parent", type="architecture", description="plan", context=[]))
+        queue.work.put("architect", "parent")
+        worker = asyncio.create_task(queue._worker("architect"))
+        while getattr(memory.get_task("child"), "status", None) != "in_progress":
+            await asyncio.sleep(0.01)
+        held = queue.work._db.execute("SELECT owner FROM work WHERE task_id = 'parent'").fetchone()
+        release.set()
+        while memory.get_task("parent").status != "completed":
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0)
+        remaining = queue.work._db.execute("SELECT COUNT(*) FROM work").fetchone()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return held, remaining
+    held, remaining = asyncio.run(asyncio.wait_for(scenario(), 1))
+    assert held is not None and held[0] is not None
+    assert remaining == (0,)
+
+def test_subtasks_resume_after_the_parent_worker_died(path):
+    memory = SharedMemory(store=InMemoryTaskStore())
+    memory.add_task(Task(id="parent", type="architecture", description="plan", context=[],
+                         status="in_progress", subtasks=["done", "todo"],
+                         metadata={"result": {"status": "success"}}))
+    for child_id, status in (("done", "completed"), ("todo", "in_progress")):
+        memory.add_task(Task(id=child_id, type="code", description=child_id, context=[],
+                             parent_task_id="parent", status=status))
+    handled = []
+
+    async def handler(task):
+        handled.append(task.id)
+        memory.update_task_status(task.id, "completed")
+        return {}
+
+    # The worker that ran the parent's handler died holding its claim
+    SQLiteWorkQueue(path).put("architect", "parent")
+    claim(SQLiteWorkQueue(path, lease=0.01), "architect")
+    time.sleep(0.02)
+
+    async def scenario():
+        queue = TaskQueue(memory)
+        queue.register("architect", ["architecture"], handler)
+        queue.register("coder", ["code"], handler)
+        queue.work = SQLiteWorkQueue(path)
+        worker = asyncio.create_task(queue._worker("architect"))
+        while memory.get_task("parent").status != "completed":
+            await asyncio.sleep(0.01)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+    asyncio.run(asyncio.wait_for(scenario(), 1))
+    # Only the unfinished subtask ran again, not the parent's handler
+    assert handled == ["todo"]